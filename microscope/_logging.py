@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+## Copyright (C) 2020 David Miguel Susano Pinto <carandraug@gmail.com>
+##
+## This file is part of Microscope.
+##
+## Microscope is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## Microscope is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with Microscope.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Logging utilities for hot code paths.
+
+Logging on every iteration of a loop that handles images, such as
+the ones in :class:`microscope.abc.DataDevice`, changes the timing of
+the loop.  The classes here limit the cost of logging so that turning
+on debug messages does not change what is being debugged.
+
+"""
+
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+class RateLimitedLogger:
+    """Log each message at most once per time interval.
+
+    Messages are identified by their format string, not the final
+    message, so that the same message with different arguments is
+    still rate limited.  When a message is finally logged, the number
+    of times it was suppressed is appended to it.
+
+    Args:
+        logger: the logger to log to.
+        interval: minimum time, in seconds, between each time a
+            message is logged.
+
+    .. code-block:: python
+
+        _logger = logging.getLogger(__name__)
+        _hot_logger = RateLimitedLogger(_logger, interval=1.0)
+
+        while acquiring:
+            # Logged at most once per second.
+            _hot_logger.debug("fetched image %d", image_number)
+
+    """
+
+    def __init__(self, logger: logging.Logger, interval: float) -> None:
+        self._logger = logger
+        self._interval = interval
+        self._lock = threading.Lock()
+        # Map of message to time it was last logged and number of
+        # times it was suppressed since then.
+        self._last: Dict[str, float] = {}
+        self._suppressed: Dict[str, int] = {}
+
+    def log(self, level: int, msg: str, *args) -> None:
+        # Checking the level first is what makes this cheap when
+        # the level is disabled, which is most of the time.
+        if not self._logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last.get(msg, -self._interval) < self._interval:
+                self._suppressed[msg] = self._suppressed.get(msg, 0) + 1
+                return
+            self._last[msg] = now
+            suppressed = self._suppressed.pop(msg, 0)
+        if suppressed:
+            self._logger.log(
+                level,
+                msg + " (%d similar messages suppressed)",
+                *args,
+                suppressed,
+            )
+        else:
+            self._logger.log(level, msg, *args)
+
+    def debug(self, msg: str, *args) -> None:
+        self.log(logging.DEBUG, msg, *args)
+
+    def info(self, msg: str, *args) -> None:
+        self.log(logging.INFO, msg, *args)
+
+
+class QueueLogging:
+    """Write log records to handlers on a separate thread.
+
+    The handler returned by :attr:`handler` only puts log records in
+    a queue.  The actual handlers, such as a `logging.FileHandler`,
+    are called on a separate thread so that logging does not block on
+    IO.
+
+    .. code-block:: python
+
+        queue_logging = QueueLogging()
+        logging.getLogger().addHandler(queue_logging.handler)
+        queue_logging.add_handler(logging.StreamHandler())
+        try:
+            ...
+        finally:
+            # Make sure that all queued records are written.
+            queue_logging.stop()
+
+    """
+
+    def __init__(self) -> None:
+        self._queue: queue.Queue = queue.Queue()
+        self._handlers: List[logging.Handler] = []
+        self._listener: Optional[logging.handlers.QueueListener] = None
+        self.handler = logging.handlers.QueueHandler(self._queue)
+
+    def add_handler(self, handler: logging.Handler) -> None:
+        """Add handler and start, or restart, the writing thread."""
+        self.stop()
+        self._handlers.append(handler)
+        self._listener = logging.handlers.QueueListener(
+            self._queue, *self._handlers, respect_handler_level=True
+        )
+        self._listener.start()
+
+    def stop(self) -> None:
+        """Write all queued records and stop the writing thread."""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+
+## Copyright (C) 2020 David Miguel Susano Pinto <carandraug@gmail.com>
+##
+## This file is part of Microscope.
+##
+## Microscope is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## Microscope is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with Microscope.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Metrics in the Prometheus text exposition format.
+
+This is a minimal implementation of counters, gauges, and histograms
+to monitor a device server.  It does not depend on the
+``prometheus_client`` package, and only implements what the device
+server needs.  The metrics are served over HTTP by
+:class:`MetricsServer`.
+
+"""
+
+import bisect
+import http.server
+import logging
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+_logger = logging.getLogger(__name__)
+
+
+# Latency buckets, in seconds, for remote calls.  Most calls to a
+# device should complete in less than a millisecond but some, such
+# as a stage move, can take several seconds.
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    elif math.isnan(value):
+        return "NaN"
+    else:
+        return repr(float(value))
+
+
+def _escape_label_value(value: str) -> str:
+    return (
+        str(value)
+        .replace("\\", r"\\")
+        .replace("\n", r"\n")
+        .replace('"', r"\"")
+    )
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return (
+        "{"
+        + ",".join(
+            '%s="%s"' % (n, _escape_label_value(v))
+            for n, v in zip(names, values)
+        )
+        + "}"
+    )
+
+
+class _Value:
+    """A single value of a counter or gauge metric."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Compute the value with `function` each time it is read.
+
+        This is useful for values that are already tracked somewhere
+        else, such as the length of a queue.
+        """
+        self._function = function
+
+    def get(self) -> float:
+        if self._function is not None:
+            return self._function()
+        with self._lock:
+            return self._value
+
+
+class _HistogramValue:
+    """Observations of a single histogram metric."""
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self._lock = threading.Lock()
+        self._upper_bounds = list(buckets)
+        # The last count is for observations above the last bucket,
+        # i.e., the implicit "+Inf" bucket.
+        self._counts = [0] * (len(self._upper_bounds) + 1)
+        self._sum = 0.0
+
+    def observe(self, value: float) -> None:
+        idx = bisect.bisect_left(self._upper_bounds, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+
+    def get(self) -> Tuple[List[Tuple[float, int]], float, int]:
+        """Return the cumulative bucket counts, sum, and count."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = []
+        accumulated = 0
+        for bound, count in zip(self._upper_bounds + [math.inf], counts):
+            accumulated += count
+            cumulative.append((bound, accumulated))
+        return cumulative, total, accumulated
+
+
+class _MetricFamily:
+    """Base class for a metric with zero or more labels."""
+
+    _type = ""
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def _new_child(self):
+        raise NotImplementedError()
+
+    def labels(self, *labelvalues: str):
+        """Return the metric for the given label values.
+
+        The metric is created on first use.
+        """
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(
+                "%s expects %d label values but got %d"
+                % (self.name, len(self.labelnames), len(labelvalues))
+            )
+        key = tuple(str(v) for v in labelvalues)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._new_child()
+                self._children[key] = child
+        return child
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError()
+
+    def expose(self) -> List[str]:
+        """Return lines of the metric in the text exposition format."""
+        lines = [
+            "# HELP %s %s"
+            % (self.name, self.documentation.replace("\n", " ")),
+            "# TYPE %s %s" % (self.name, self._type),
+        ]
+        lines.extend(self._samples())
+        return lines
+
+    def _items(self):
+        with self._lock:
+            return list(self._children.items())
+
+
+class Counter(_MetricFamily):
+    """A value that only goes up, such as the number of calls."""
+
+    _type = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def _samples(self) -> List[str]:
+        return [
+            "%s%s %s"
+            % (
+                self.name,
+                _format_labels(self.labelnames, key),
+                _format_value(child.get()),
+            )
+            for key, child in self._items()
+        ]
+
+
+class Gauge(Counter):
+    """A value that can go up and down, such as a queue length."""
+
+    _type = "gauge"
+
+
+class Histogram(_MetricFamily):
+    """Distribution of observations, such as latencies, in buckets."""
+
+    _type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._buckets = sorted(buckets)
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self._buckets)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        bucket_labelnames = self.labelnames + ("le",)
+        for key, child in self._items():
+            cumulative, total, count = child.get()
+            for bound, bound_count in cumulative:
+                lines.append(
+                    "%s_bucket%s %d"
+                    % (
+                        self.name,
+                        _format_labels(
+                            bucket_labelnames, key + (_format_value(bound),)
+                        ),
+                        bound_count,
+                    )
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(
+                "%s_sum%s %s" % (self.name, labels, _format_value(total))
+            )
+            lines.append("%s_count%s %d" % (self.name, labels, count))
+        return lines
+
+
+class Registry:
+    """Collection of metrics to be exposed together."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._families: Dict[str, _MetricFamily] = {}
+
+    def _register(self, family: _MetricFamily) -> _MetricFamily:
+        with self._lock:
+            if family.name in self._families:
+                raise ValueError(
+                    "metric '%s' is already registered" % family.name
+                )
+            self._families[family.name] = family
+        return family
+
+    def counter(self, *args, **kwargs) -> Counter:
+        return self._register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs) -> Gauge:
+        return self._register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        return self._register(Histogram(*args, **kwargs))
+
+    def get(self, name: str) -> _MetricFamily:
+        with self._lock:
+            return self._families[name]
+
+    def exposition(self) -> str:
+        """Return all metrics in the Prometheus text format."""
+        with self._lock:
+            families = list(self._families.values())
+        lines = []
+        for family in families:
+            try:
+                lines.extend(family.expose())
+            except Exception as ex:
+                # A failure in a function computing a value, e.g., a
+                # device that has been shutdown, should not prevent
+                # the other metrics from being served.
+                _logger.debug("failed to expose %s", family.name, exc_info=ex)
+        return "\n".join(lines) + "\n"
+
+
+def _resident_memory_bytes() -> float:
+    """Return the resident set size of the current process.
+
+    Only implemented on systems with procfs, i.e., Linux.
+    """
+    with open("/proc/self/statm", "r") as fh:
+        rss_pages = int(fh.read().split()[1])
+    return float(rss_pages * os.sysconf("SC_PAGE_SIZE"))
+
+
+def add_process_metrics(registry: Registry) -> None:
+    """Add metrics about the current process to `registry`."""
+    registry.counter(
+        "process_cpu_seconds_total",
+        "Total user and system CPU time spent in seconds.",
+    ).labels().set_function(time.process_time)
+    if os.path.exists("/proc/self/statm"):
+        registry.gauge(
+            "process_resident_memory_bytes",
+            "Resident memory size in bytes.",
+        ).labels().set_function(_resident_memory_bytes)
+
+
+class _MetricsRequestHandler(http.server.BaseHTTPRequestHandler):
+    # The registry is set on the class created by MetricsServer.
+    registry: Registry
+
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.registry.exposition().encode("utf-8")
+        self.send_response(200)
+        self.send_header(
+            "Content-Type", "text/plain; version=0.0.4; charset=utf-8"
+        )
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        # By default, BaseHTTPRequestHandler writes to stderr.  A
+        # scraper requests the metrics every few seconds so only log
+        # that on debug.
+        _logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class MetricsServer:
+    """Serve the metrics in a registry over HTTP on a separate thread.
+
+    Args:
+        registry: the metrics to serve.
+        host: hostname or ip address to listen on.
+        port: port number to listen on.
+
+    """
+
+    def __init__(self, registry: Registry, host: str, port: int) -> None:
+        handler = type(
+            "MetricsRequestHandler",
+            (_MetricsRequestHandler,),
+            {"registry": registry},
+        )
+        self._server = http.server.ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        )
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def shutdown(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
@@ -0,0 +1,660 @@
+#!/usr/bin/env python3
+
+## Copyright (C) 2020 David Miguel Susano Pinto <carandraug@gmail.com>
+##
+## This file is part of Microscope.
+##
+## Microscope is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## Microscope is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with Microscope.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Serial communication with devices.
+
+Most serial devices are controlled by sending a command and reading
+its reply.  Doing that behind a lock means that a command has to wait
+for the whole round trip of the previous one, even if it is for
+another device on the same daisy chain.  :class:`SerialEngine` reads
+the replies on a separate thread and matches them to the commands
+waiting for them so that multiple commands can be in flight.  This
+is used for the Zaber daisy chain.  Controllers that are the only
+device on their port, such as ASI and Ludl, answer one command at a
+time and keep reading each response, with :class:`ResponseFormat`,
+behind a lock.
+
+:class:`InstrumentedSerial` wraps a serial port to record the round
+trip time of each command, and the time lost waiting for reads to
+time out, in a :class:`SerialStats`.
+
+Some responses have no fixed length or end marker and reading them
+until the serial port times out costs the whole timeout on each
+command.  :class:`ResponseFormat` describes how a response ends, so
+that it can be read as soon as it is complete.
+
+"""
+
+import collections
+import concurrent.futures
+import logging
+import threading
+import time
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+)
+
+import serial
+
+import microscope
+
+_logger = logging.getLogger(__name__)
+
+
+def command_name(data: bytes) -> str:
+    """Name of a command, for :class:`SerialStats`.
+
+    This is the first word of the command, without its arguments,
+    e.g., ``"WHERE"`` for ``b"WHERE X Y\\r"`` and ``"pos"`` for
+    ``b"pos=2\\r"``.
+    """
+    words = data.replace(b"=", b" ").split(maxsplit=1)
+    if not words:
+        return ""
+    return words[0].decode("ascii", errors="replace")
+
+
+class _CommandStats:
+    def __init__(self) -> None:
+        self.count = 0
+        self.round_trip_time = 0.0
+        self.max_round_trip_time = 0.0
+        self.bytes_written = 0
+        self.bytes_read = 0
+        self.timeouts = 0
+        self.timeout_time = 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "round_trip_time": self.round_trip_time,
+            "mean_round_trip_time": (
+                self.round_trip_time / self.count if self.count else 0.0
+            ),
+            "max_round_trip_time": self.max_round_trip_time,
+            "bytes_written": self.bytes_written,
+            "bytes_read": self.bytes_read,
+            "timeouts": self.timeouts,
+            "timeout_time": self.timeout_time,
+        }
+
+
+class SerialStats:
+    """Statistics of the commands sent to a serial device.
+
+    The statistics are kept for each command name.  The round trip
+    time of a command is the time from starting to write it until
+    the end of the last read before the next command.  Reads that end
+    because the serial port timed out, instead of because the reply
+    was complete, are counted as timeouts.  Their duration, up to the
+    serial timeout, is the time lost to timeouts.
+
+    Reads before any command was written are recorded under the empty
+    command name.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._commands: Dict[str, _CommandStats] = {}
+
+    def _get(self, name: str) -> _CommandStats:
+        stats = self._commands.get(name)
+        if stats is None:
+            stats = _CommandStats()
+            self._commands[name] = stats
+        return stats
+
+    def record_command(
+        self, name: str, n_bytes: int, round_trip_time: float
+    ) -> None:
+        """Record a command that was just written.
+
+        Args:
+            name: name of the command.
+            n_bytes: number of bytes written.
+            round_trip_time: time taken to write the command.
+        """
+        with self._lock:
+            stats = self._get(name)
+            stats.count += 1
+            stats.bytes_written += n_bytes
+            stats.round_trip_time += round_trip_time
+            stats.max_round_trip_time = max(
+                stats.max_round_trip_time, round_trip_time
+            )
+
+    def record_read(
+        self,
+        name: str,
+        n_bytes: int,
+        added_time: float,
+        round_trip_time: float,
+        timeout_time: Optional[float] = None,
+    ) -> None:
+        """Record a read of the reply to a command.
+
+        Args:
+            name: name of the command being replied to.
+            n_bytes: number of bytes read.
+            added_time: time by which this read extends the round
+                trip of the command.
+            round_trip_time: round trip time of the command so far.
+            timeout_time: if the read timed out, the time lost to the
+                timeout.
+        """
+        with self._lock:
+            stats = self._get(name)
+            stats.bytes_read += n_bytes
+            stats.round_trip_time += added_time
+            stats.max_round_trip_time = max(
+                stats.max_round_trip_time, round_trip_time
+            )
+            if timeout_time is not None:
+                stats.timeouts += 1
+                stats.timeout_time += timeout_time
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        """Statistics by command name.
+
+        For each command, a map with its ``count``, total, mean, and
+        maximum round trip times (``round_trip_time``,
+        ``mean_round_trip_time``, and ``max_round_trip_time``) in
+        seconds, the ``bytes_written`` and ``bytes_read``, the number
+        of reads that timed out (``timeouts``), and the time lost to
+        them (``timeout_time``) in seconds.
+        """
+        with self._lock:
+            return {
+                name: stats.as_dict() for name, stats in self._commands.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._commands.clear()
+
+
+class InstrumentedSerial:
+    """Serial port that records statistics of its commands.
+
+    This wraps a `serial.Serial` instance and records, in
+    :attr:`stats`, the round trip time of each command, the number of
+    bytes written and read, and the time lost to reads that timed
+    out.  Each write is the start of a new command and the reads that
+    follow it are its reply.  All other attributes, and methods, are
+    those of the wrapped serial port.
+
+    .. code-block:: python
+
+        self.connection = InstrumentedSerial(serial.Serial(port))
+        self._serial_stats = self.connection.stats
+
+    Args:
+        serial: the serial port to wrap.
+        command_name: function that returns the name of a command,
+            from the bytes written, under which it is recorded.
+        stats: where to record the statistics.  If `None`, a new
+            :class:`SerialStats` is created.
+
+    """
+
+    def __init__(
+        self,
+        serial: serial.SerialBase,
+        command_name: Callable[[bytes], str] = command_name,
+        stats: Optional[SerialStats] = None,
+    ) -> None:
+        self._serial = serial
+        self._command_name = command_name
+        self._stats = SerialStats() if stats is None else stats
+        self._current_lock = threading.Lock()
+        # Name of the command being replied to, the time it started,
+        # and the time of the end of its last read.
+        self._current: Optional[Tuple[str, float, float]] = None
+
+    @property
+    def stats(self) -> SerialStats:
+        return self._stats
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes that are not found on the
+        # wrapper, i.e., those of the serial port.
+        return getattr(self._serial, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name.startswith("_"):
+            super().__setattr__(name, value)
+        else:
+            setattr(self._serial, name, value)
+
+    def write(self, data: bytes) -> Optional[int]:
+        start = time.perf_counter()
+        n_bytes = self._serial.write(data)
+        end = time.perf_counter()
+        name = self._command_name(bytes(data))
+        with self._current_lock:
+            self._current = (name, start, end)
+        self._stats.record_command(name, len(data), end - start)
+        return n_bytes
+
+    def _record_read(
+        self, data: bytes, start: float, end: float, timed_out: bool
+    ) -> None:
+        with self._current_lock:
+            if self._current is None:
+                name, command_start, last_end = ("", start, start)
+            else:
+                name, command_start, last_end = self._current
+            self._current = (name, command_start, end)
+        if timed_out and self._serial.timeout is not None:
+            timeout_time: Optional[float] = min(
+                end - start, self._serial.timeout
+            )
+        else:
+            timeout_time = None
+        self._stats.record_read(
+            name,
+            len(data),
+            end - last_end,
+            end - command_start,
+            timeout_time,
+        )
+
+    def read(self, size: int = 1) -> bytes:
+        start = time.perf_counter()
+        data = self._serial.read(size)
+        self._record_read(data, start, time.perf_counter(), len(data) < size)
+        return data
+
+    def readline(self, size: int = -1) -> bytes:
+        start = time.perf_counter()
+        data = self._serial.readline(size)
+        timed_out = not data.endswith(b"\n") and (size < 0 or len(data) < size)
+        self._record_read(data, start, time.perf_counter(), timed_out)
+        return data
+
+    def readlines(self, hint: int = -1) -> List[bytes]:
+        # Like pySerial, read lines until a read times out.
+        lines = []
+        n_bytes = 0
+        while hint <= 0 or n_bytes < hint:
+            line = self.readline()
+            if not line:
+                break
+            lines.append(line)
+            n_bytes += len(line)
+        return lines
+
+    # Beware: pySerial 3.5 changed the named of its first argument
+    # from terminator to expected.  See issue #233.
+    def read_until(
+        self, expected: bytes = b"\n", size: Optional[int] = None
+    ) -> bytes:
+        start = time.perf_counter()
+        data = self._serial.read_until(expected, size=size)
+        timed_out = not data.endswith(expected) and (
+            size is None or len(data) < size
+        )
+        self._record_read(data, start, time.perf_counter(), timed_out)
+        return data
+
+
+def read_until_idle(port: Any, idle_timeout: float) -> bytes:
+    """Read until no data arrives for `idle_timeout` seconds.
+
+    This is useful to clear the input of a device in an unknown
+    state, without waiting for the whole serial timeout.
+    """
+    previous = port.timeout
+    port.timeout = idle_timeout
+    try:
+        data = bytearray()
+        while True:
+            chunk = port.read(max(1, port.in_waiting))
+            if not chunk:
+                return bytes(data)
+            data.extend(chunk)
+    finally:
+        port.timeout = previous
+
+
+class ResponseFormat:
+    """How the response to a command ends.
+
+    A response is one or more lines, each ending with `terminator`.
+    It is complete when it has `n_lines` lines, or when `end` returns
+    `True` for a line.  For responses without either, such as a list
+    of faults, set `idle_timeout` to consider the response complete
+    when no new line starts within that time.  The first line is
+    always read with the serial port timeout, to give the device time
+    to process the command.
+
+    .. code-block:: python
+
+        # Read lines until one starts with ":A" or ":N".
+        multiline = ResponseFormat(
+            terminator=b"\\r",
+            end=lambda line: line.startswith((b":A", b":N")),
+            idle_timeout=0.05,
+        )
+        port.write(b"INFO X\\r")
+        lines = multiline.read(port)
+
+    Args:
+        terminator: bytes at the end of each line.
+        n_lines: number of lines in the response, if always the same.
+        end: function called with each line, without its terminator,
+            that returns `True` if it is the last line.
+        idle_timeout: time, in seconds, after which the response is
+            complete if no new line starts.  If `None`, only the
+            serial port timeout is used.
+
+    """
+
+    def __init__(
+        self,
+        terminator: bytes = b"\r\n",
+        n_lines: Optional[int] = None,
+        end: Optional[Callable[[bytes], bool]] = None,
+        idle_timeout: Optional[float] = None,
+    ) -> None:
+        self.terminator = terminator
+        self.n_lines = n_lines
+        self.end = end
+        self.idle_timeout = idle_timeout
+
+    def _read_line(self, port: Any, idle: bool) -> Tuple[bytes, bool]:
+        data = port.read_until(self.terminator)
+        if idle:
+            # The idle timeout may be shorter than the time to read a
+            # whole line so keep reading while there is data.
+            while data and not data.endswith(self.terminator):
+                chunk = port.read_until(self.terminator)
+                if not chunk:
+                    break
+                data += chunk
+        if data.endswith(self.terminator):
+            return data[: -len(self.terminator)], True
+        else:
+            return data, False
+
+    def read(self, port: Any) -> List[bytes]:
+        """Read a response.
+
+        Args:
+            port: the serial port, or anything with the same
+                ``read_until`` method and ``timeout`` attribute.
+
+        Returns:
+            The lines of the response, without their terminator.  If
+            the response is not complete when the port times out,
+            the last line is what was read until then, possibly
+            empty.
+        """
+        lines: List[bytes] = []
+        previous_timeout = port.timeout
+        try:
+            while self.n_lines is None or len(lines) < self.n_lines:
+                idle = bool(lines) and self.idle_timeout is not None
+                if idle and len(lines) == 1:
+                    port.timeout = self.idle_timeout
+                line, complete = self._read_line(port, idle)
+                lines.append(line)
+                if not complete or (self.end is not None and self.end(line)):
+                    break
+        finally:
+            port.timeout = previous_timeout
+        return lines
+
+
+class _PendingCommand:
+    """Command sent by :class:`SerialEngine` waiting for its reply."""
+
+    def __init__(self, name: str, timeout: float) -> None:
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+        self.name = name
+        # Time, on the monotonic clock, when the command times out.
+        self.deadline = time.monotonic() + timeout
+        self.start = time.perf_counter()
+        self.written = self.start
+
+
+class SerialEngine:
+    """Send commands and read their replies on a separate thread.
+
+    Replies are split into lines at `terminator` and matched to the
+    commands waiting for them by key.  Replies with the same key are
+    matched in the order that the commands were sent.  For protocols
+    where the replies are always in the same order as the commands,
+    use the default `reply_key` which gives the same key to all
+    replies.  For daisy chains, the key is usually the device address
+    which is part of each reply.
+
+    A reply that arrives after its command timed out is taken as the
+    reply to the next command with the same key.  If the protocol can
+    tag commands, such as with a message ID that the device includes
+    in the reply, make it part of the key so that each command has
+    its own key and late replies are discarded.
+
+    .. code-block:: python
+
+        engine = SerialEngine(
+            serial.Serial(port, timeout=0.1),
+            terminator=b"\\r\\n",
+            reply_key=lambda line: line[1:3],
+        )
+        # Send a command to device 1 and another to device 2 without
+        # waiting for the first reply.
+        reply1 = engine.submit(b"/01 get pos\\n", key=b"01")
+        reply2 = engine.submit(b"/02 get pos\\n", key=b"02")
+        print(reply1.result(), reply2.result())
+
+    Args:
+        serial: the serial port.  Its timeout sets the maximum time
+            that the reader thread takes to notice that the engine has
+            been closed.
+        terminator: bytes at the end of each reply.  The lines passed
+            to `reply_key` and `unsolicited`, and the results of the
+            futures, include it.
+        reply_key: function that returns the key of a reply line.
+        unsolicited: function called with each reply line before
+            matching it.  It returns `True` if the line is not a reply
+            to a command, such as an alert sent by the device, and
+            was handled.
+        timeout: time, in seconds, to wait for a reply before failing
+            the command with :class:`microscope.DeviceError`.
+        stats: where to record the round trip time of each command,
+            and its timeouts.  If `None`, a new :class:`SerialStats`
+            is created.
+        command_name: function that returns the name of a command,
+            from the bytes written, under which it is recorded.
+
+    """
+
+    def __init__(
+        self,
+        serial: serial.SerialBase,
+        terminator: bytes = b"\n",
+        reply_key: Callable[[bytes], Hashable] = lambda line: None,
+        unsolicited: Optional[Callable[[bytes], bool]] = None,
+        timeout: float = 1.0,
+        stats: Optional[SerialStats] = None,
+        command_name: Callable[[bytes], str] = command_name,
+    ) -> None:
+        self._serial = serial
+        self._terminator = terminator
+        self._reply_key = reply_key
+        self._unsolicited = unsolicited
+        self._timeout = timeout
+        self._stats = SerialStats() if stats is None else stats
+        self._command_name = command_name
+        self._write_lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+        # Map of reply key to the commands waiting for a reply.
+        self._pending: Dict[Hashable, Deque[_PendingCommand]] = {}
+        self._closed = False
+        self._reader = threading.Thread(
+            target=self._read_replies, name="serial-engine", daemon=True
+        )
+        self._reader.start()
+
+    @property
+    def stats(self) -> SerialStats:
+        return self._stats
+
+    def submit(
+        self, data: bytes, key: Hashable = None, expect_reply: bool = True
+    ) -> concurrent.futures.Future:
+        """Send a command without waiting for its reply.
+
+        Args:
+            data: the whole command, including its terminator.
+            key: the key of the reply to this command, as returned by
+                `reply_key`.
+            expect_reply: whether the device replies to this command.
+
+        Returns:
+            A future for the reply line.  If `expect_reply` is
+            `False`, the future is already done once the command is
+            sent.
+        """
+        entry = _PendingCommand(self._command_name(data), self._timeout)
+        with self._write_lock:
+            if expect_reply:
+                with self._pending_lock:
+                    if self._closed:
+                        raise microscope.DeviceError("serial engine closed")
+                    # Add the command before sending it so that the
+                    # reply can't be read before it.
+                    queue = self._pending.setdefault(key, collections.deque())
+                    queue.append(entry)
+            try:
+                self._serial.write(data)
+            except Exception:
+                if expect_reply:
+                    with self._pending_lock:
+                        queue.remove(entry)
+                raise
+            entry.written = time.perf_counter()
+        self._stats.record_command(
+            entry.name, len(data), entry.written - entry.start
+        )
+        if not expect_reply:
+            entry.future.set_result(b"")
+        return entry.future
+
+    def command(self, data: bytes, key: Hashable = None) -> bytes:
+        """Send a command and wait for its reply."""
+        # The reader thread fails the future if there's no reply in
+        # time, the timeout here is only in case the reader died.
+        return self.submit(data, key).result(timeout=2 * self._timeout)
+
+    def n_pending(self) -> int:
+        """Number of commands waiting for a reply."""
+        with self._pending_lock:
+            return sum(len(q) for q in self._pending.values())
+
+    def _read_replies(self) -> None:
+        buffer = bytearray()
+        while not self._closed:
+            try:
+                data = self._serial.read(max(1, self._serial.in_waiting))
+            except Exception as ex:
+                if not self._closed:
+                    _logger.error("failed to read serial port", exc_info=ex)
+                    self._fail_pending(ex)
+                    self._closed = True
+                break
+            if data:
+                buffer.extend(data)
+                while True:
+                    end = buffer.find(self._terminator)
+                    if end < 0:
+                        break
+                    end += len(self._terminator)
+                    line = bytes(buffer[:end])
+                    del buffer[:end]
+                    self._dispatch(line)
+            self._expire_pending()
+
+    def _dispatch(self, line: bytes) -> None:
+        if self._unsolicited is not None:
+            try:
+                if self._unsolicited(line):
+                    return
+            except Exception:
+                _logger.exception("failed to handle %s", line)
+                return
+        key = self._reply_key(line)
+        with self._pending_lock:
+            queue = self._pending.get(key)
+            if not queue:
+                _logger.warning("discarding unexpected reply %s", line)
+                return
+            entry = queue.popleft()
+        end = time.perf_counter()
+        self._stats.record_read(
+            entry.name, len(line), end - entry.written, end - entry.start
+        )
+        entry.future.set_result(line)
+
+    def _expire_pending(self) -> None:
+        now = time.monotonic()
+        expired: List[_PendingCommand] = []
+        with self._pending_lock:
+            for queue in self._pending.values():
+                while queue and queue[0].deadline < now:
+                    expired.append(queue.popleft())
+        end = time.perf_counter()
+        for entry in expired:
+            self._stats.record_read(
+                entry.name,
+                0,
+                end - entry.written,
+                end - entry.start,
+                timeout_time=end - entry.written,
+            )
+            entry.future.set_exception(
+                microscope.DeviceError(
+                    "no reply after %f seconds" % self._timeout
+                )
+            )
+
+    def _fail_pending(self, exception: Exception) -> None:
+        with self._pending_lock:
+            entries = [e for q in self._pending.values() for e in q]
+            self._pending.clear()
+        for entry in entries:
+            entry.future.set_exception(exception)
+
+    def close(self) -> None:
+        """Stop reading replies and fail the commands still waiting.
+
+        This does not close the serial port.
+        """
+        with self._pending_lock:
+            self._closed = True
+        self._reader.join()
+        self._fail_pending(microscope.DeviceError("serial engine closed"))
@@ -19,10 +19,15 @@
 
 import ctypes
 import os
+import socket
 import sys
 import threading
-from typing import List, Optional, Type
+import time
+from typing import Any, Callable, List, Optional, Type
 
+import Pyro4
+import Pyro4.socketserver.threadpool
+import Pyro4.socketserver.threadpoolserver
 import serial
 
 import microscope
@@ -75,6 +80,132 @@ def library_loader(
     return dlltype(libname, **winmode_kwargs, **kwargs)
 
 
+class _ThreadPool(Pyro4.socketserver.threadpool.Pool):
+    """Pyro thread pool with its own size instead of `Pyro4.config`'s.
+
+    Pyro's pool reads its maximum and minimum size from the global
+    configuration each time it handles a job.  This pool only
+    changes the sizing and leaves the rest to Pyro's pool, using its
+    public `idle`, `busy`, and `closed` attributes.  It starts a
+    worker if one is needed and allowed by its own maximum before
+    Pyro's pool looks for one, and stops idle workers above its own
+    minimum after Pyro's pool is done with them.
+    """
+
+    def __init__(self, size: int, size_min: int) -> None:
+        self.size = size
+        self.size_min = size_min
+        super().__init__()
+        while self.num_workers() < self.size_min:
+            worker = Pyro4.socketserver.threadpool.Worker(self)
+            self.idle.add(worker)
+            worker.start()
+        while len(self.idle) > self.size_min:
+            self.idle.pop().process(None)
+
+    def process(self, job) -> None:
+        if not self.closed and not self.idle:
+            if self.num_workers() >= self.size:
+                raise Pyro4.socketserver.threadpool.NoFreeWorkersError(
+                    "no free workers available, increase thread pool size"
+                )
+            worker = Pyro4.socketserver.threadpool.Worker(self)
+            self.idle.add(worker)
+            worker.start()
+        super().process(job)
+
+    def notify_done(self, worker) -> None:
+        if not self.closed and len(self.idle) < self.size_min:
+            # Keep the worker even if Pyro's minimum is lower.
+            self.busy.discard(worker)
+            self.idle.add(worker)
+            return
+        super().notify_done(worker)
+        if worker in self.idle and len(self.idle) > self.size_min:
+            # Pyro's minimum is higher, stop the worker.
+            self.idle.discard(worker)
+            worker.process(None)
+
+
+def create_pyro_daemon(
+    host: Optional[str] = None,
+    port: int = 0,
+    servertype: Optional[str] = None,
+    threadpool_size: Optional[int] = None,
+    threadpool_size_min: Optional[int] = None,
+    sock_nodelay: Optional[bool] = None,
+    sndbuf: Optional[int] = None,
+    rcvbuf: Optional[int] = None,
+) -> Pyro4.Daemon:
+    """Create Pyro daemon with specific transport options.
+
+    Options that are `None` are left to the Pyro defaults, or
+    whatever is currently on `Pyro4.config`.
+
+    Args:
+        host: hostname or ip address to listen on.
+        port: port number to listen on.  If zero, a random port is
+            picked.
+        servertype: either ``"thread"`` for a pool of threads, each
+            handling one connection, or ``"multiplex"`` for a single
+            thread handling all connections.
+        threadpool_size: maximum number of threads, and so of
+            concurrent connections, for the ``"thread"`` server type.
+        threadpool_size_min: number of threads kept in the pool
+            even when idle.
+        sock_nodelay: disable Nagle's algorithm (set ``TCP_NODELAY``)
+            on the sockets.  This reduces the latency of small
+            messages.
+        sndbuf: size, in bytes, of the socket send buffer.
+        rcvbuf: size, in bytes, of the socket receive buffer.
+
+    Pyro configuration is global to the whole process.  The options
+    are only set on `Pyro4.config` while the daemon is constructed
+    and the previous values are restored afterwards, so they do not
+    affect other daemons in the process.
+
+    """
+    overrides = {
+        name: value
+        for name, value in [
+            ("SERVERTYPE", servertype),
+            ("THREADPOOL_SIZE", threadpool_size),
+            ("THREADPOOL_SIZE_MIN", threadpool_size_min),
+            ("SOCK_NODELAY", sock_nodelay),
+        ]
+        if value is not None
+    }
+    previous = {name: getattr(Pyro4.config, name) for name in overrides}
+    try:
+        for name, value in overrides.items():
+            setattr(Pyro4.config, name, value)
+        daemon = Pyro4.Daemon(host=host, port=port)
+        # Pyro's thread pool reads its size from the global
+        # configuration every time it handles a connection so this
+        # daemon gets a pool with its own size.
+        server = daemon.transportServer
+        if isinstance(
+            server, Pyro4.socketserver.threadpoolserver.SocketServer_Threadpool
+        ):
+            server.pool.close()
+            server.pool = _ThreadPool(
+                Pyro4.config.THREADPOOL_SIZE, Pyro4.config.THREADPOOL_SIZE_MIN
+            )
+    finally:
+        for name, value in previous.items():
+            setattr(Pyro4.config, name, value)
+
+    # Sockets for new connections inherit the buffer sizes from the
+    # listening socket.
+    for option, value in [
+        (socket.SO_SNDBUF, sndbuf),
+        (socket.SO_RCVBUF, rcvbuf),
+    ]:
+        if value is not None:
+            daemon.sock.setsockopt(socket.SOL_SOCKET, option, value)
+    return daemon
+
+
 class OnlyTriggersOnceOnSoftwareMixin(microscope.abc.TriggerTargetMixin):
     """Utility mixin for devices that only trigger "once" with software.
 
@@ -170,3 +301,42 @@ class SharedSerial:
     def write(self, data: bytes) -> int:
         with self._lock:
             return self._serial.write(data)
+
+
+class ExpiringCache:
+    """Value read from a device that is reused for a short time.
+
+    Reads within `max_age` seconds of the previous read return the
+    same value.  Reads that arrive while the value is being read wait
+    for it instead of reading again.  This coalesces reads, such as of
+    a stage position, from several clients polling at the same time
+    into a single request to the hardware.
+
+    Args:
+        read: function that reads the value from the device.
+        max_age: time, in seconds, during which a value is reused.
+
+    """
+
+    def __init__(self, read: Callable[[], Any], max_age: float) -> None:
+        self._read = read
+        self._max_age = max_age
+        self._lock = threading.Lock()
+        self._value: Any = None
+        # Time, on the monotonic clock, when the value expires.
+        self._expires = -float("inf")
+
+    def get(self) -> Any:
+        with self._lock:
+            if time.monotonic() >= self._expires:
+                self._value = self._read()
+                self._expires = time.monotonic() + self._max_age
+            return self._value
+
+    def invalidate(self) -> None:
+        """Read the value again on the next call to `get`.
+
+        Call this after any change to the value, such as a move.
+        """
+        with self._lock:
+            self._expires = -float("inf")
@@ -23,6 +23,7 @@
 
 import abc
 import functools
+import inspect
 import itertools
 import logging
 import queue
@@ -30,12 +31,22 @@ import threading
 import time
 from enum import EnumMeta
 from threading import Thread
-from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 import numpy as np
 import Pyro4
 
 import microscope
+import microscope._logging
 
 _logger = logging.getLogger(__name__)
 
@@ -283,6 +294,10 @@ class TriggerTargetMixin(metaclass=abc.ABCMeta):
 class Device(metaclass=abc.ABCMeta):
     """A base device class. All devices should subclass this class."""
 
+    # Devices controlled via serial set this to the SerialStats of
+    # their connection, see get_serial_stats().
+    _serial_stats: Optional["microscope._serial.SerialStats"] = None
+
     def __init__(self) -> None:
         self.enabled = False
         self._settings: Dict[str, _Setting] = {}
@@ -519,6 +534,22 @@ class Device(metaclass=abc.ABCMeta):
             results[key] = self._settings[key].get()
         return results
 
+    def get_serial_stats(self) -> Dict[str, Dict[str, float]]:
+        """Statistics of the commands sent to the device via serial.
+
+        This shows how much time the device spends waiting on serial
+        communication, in particular on reads that only end when the
+        serial port times out.
+
+        Returns:
+            A map of command name to the statistics of that command,
+            see :meth:`microscope._serial.SerialStats.as_dict`.  Empty
+            if the device is not controlled via serial.
+        """
+        if self._serial_stats is None:
+            return {}
+        return self._serial_stats.as_dict()
+
 
 def keep_acquiring(func):
     """Wrapper to preserve acquiring state of data capture devices."""
@@ -575,6 +606,20 @@ class DataDevice(Device, metaclass=abc.ABCMeta):
         self._acquiring = False
         # A condition to signal arrival of a new data and unblock grab_next_data
         self._new_data_condition = threading.Condition()
+        # Number of data put into the dispatch buffer, sent to a
+        # client, and dropped (no live client or failed to send).
+        # These are only for monitoring, e.g., the device server
+        # metrics, and are never reset.
+        self._n_acquired = 0
+        self._n_sent = 0
+        self._n_dropped = 0
+        # For the loops that handle each image.  Logging each
+        # iteration, even at debug level, slows them enough to change
+        # their timing.  It is per device so that the messages of one
+        # device do not suppress the same messages from another.
+        self._hot_logger = microscope._logging.RateLimitedLogger(
+            _logger, interval=1.0
+        )
 
     def __del__(self):
         self.disable()
@@ -664,7 +709,7 @@ class DataDevice(Device, metaclass=abc.ABCMeta):
 
     def _send_data(self, client, data, timestamp):
         """Dispatch data to the client."""
-        _logger.debug("sending data to client")
+        self._hot_logger.debug("sending data to client")
         try:
             # Cockpit will send a client with receiveData and expects
             # two arguments (data and timestamp).  But we really want
@@ -676,11 +721,13 @@ class DataDevice(Device, metaclass=abc.ABCMeta):
                 client.put(data)
             else:
                 client.receiveData(data, timestamp)
+            self._n_sent += 1
         except (
             Pyro4.errors.ConnectionClosedError,
             Pyro4.errors.CommunicationError,
         ):
             # Client not listening
+            self._n_dropped += 1
             _logger.info(
                 "Removing %s from client stack: disconnected.", client._pyroUri
             )
@@ -690,10 +737,13 @@ class DataDevice(Device, metaclass=abc.ABCMeta):
     def _dispatch_loop(self) -> None:
         """Process data and send results to any client."""
         while True:
-            _logger.debug("Getting data from dispatch buffer")
+            self._hot_logger.debug("Getting data from dispatch buffer")
             client, data, timestamp = self._dispatch_buffer.get(block=True)
             if client not in self._liveClients:
-                _logger.debug("Client not in liveClients so ignoring data.")
+                self._hot_logger.debug(
+                    "Client not in liveClients so ignoring data."
+                )
+                self._n_dropped += 1
                 continue
             err = None
             if isinstance(data, Exception):
@@ -713,6 +763,7 @@ class DataDevice(Device, metaclass=abc.ABCMeta):
                 # Raising an exception will kill the dispatch loop. We need
                 # another way to notify the client that there was a problem.
                 _logger.error("in _dispatch_loop:", exc_info=err)
+                self._n_dropped += 1
             self._dispatch_buffer.task_done()
 
     def _fetch_loop(self) -> None:
@@ -720,7 +771,7 @@ class DataDevice(Device, metaclass=abc.ABCMeta):
         self._fetch_thread_run = True
 
         while self._fetch_thread_run:
-            _logger.debug("Fetching data from device.")
+            self._hot_logger.debug("Fetching data from device.")
             try:
                 data = self._fetch_data()
             except Exception as e:
@@ -731,12 +782,14 @@ class DataDevice(Device, metaclass=abc.ABCMeta):
                 self._put(e, timestamp)
                 data = None
             if data is not None:
-                _logger.debug("Fetch data to be put into dispatch buffer.")
+                self._hot_logger.debug(
+                    "Fetch data to be put into dispatch buffer."
+                )
                 # TODO Add support for timestamp from hardware.
                 timestamp = time.time()
                 self._put(data, timestamp)
             else:
-                _logger.debug("Fetched no data from device.")
+                self._hot_logger.debug("Fetched no data from device.")
                 time.sleep(0.001)
 
     @property
@@ -756,6 +809,7 @@ class DataDevice(Device, metaclass=abc.ABCMeta):
     def _put(self, data, timestamp) -> None:
         """Put data and timestamp into dispatch buffer with target dispatch client."""
         self._dispatch_buffer.put((self._client, data, timestamp))
+        self._n_acquired += 1
 
     def set_client(self, new_client) -> None:
         """Set up a connection to our client.
@@ -1322,11 +1376,379 @@ class Controller(Device, metaclass=abc.ABCMeta):
         """Map of names to the controlled devices."""
         raise NotImplementedError()
 
+    def execute_batch(
+        self, calls: Sequence[Tuple[str, str, Sequence[Any]]]
+    ) -> List[Any]:
+        """Call methods of multiple controlled devices at once.
+
+        With a remote controller, each call to a controlled device is
+        a separate request.  This method makes all the calls with a
+        single request.  For example, to set the power of two light
+        sources and read back their status::
+
+            controller.execute_batch(
+                [
+                    ("405", "power", [0.5]),
+                    ("488", "power", [0.2]),
+                    ("405", "get_status", []),
+                    ("488", "get_status", []),
+                ]
+            )
+
+        The calls are made in order and, if one of them raises an
+        exception, the remaining calls are not made.
+
+        Args:
+            calls: sequence of `(device_name, name, args)` tuples.
+                `device_name` is the name of the controlled device, as
+                in :attr:`devices`.  `name` is the name of a method to
+                call with `args`, or the name of a property.  A
+                property is read if `args` is empty and set if `args`
+                has one value.
+
+        Returns:
+            The results of each call, in the same order.  Setting a
+            property returns `None`.
+
+        """
+        devices = self.devices
+        results = []
+        for device_name, name, args in calls:
+            if name.startswith("_"):
+                raise ValueError("can't access private attribute '%s'" % name)
+            try:
+                device = devices[device_name]
+            except KeyError:
+                raise KeyError("no device named '%s'" % device_name)
+            if isinstance(inspect.getattr_static(device, name), property):
+                if len(args) == 0:
+                    results.append(getattr(device, name))
+                elif len(args) == 1:
+                    setattr(device, name, args[0])
+                    results.append(None)
+                else:
+                    raise ValueError(
+                        "can't set property '%s' to %d values"
+                        % (name, len(args))
+                    )
+            else:
+                results.append(getattr(device, name)(*args))
+        return results
+
     def _do_shutdown(self) -> None:
         for d in self.devices.values():
             d.shutdown()
 
 
+class StageMove:
+    """Handle to a stage move that runs in the background.
+
+    Instances are returned by the ``move_by_async`` and
+    ``move_to_async`` methods of :class:`Stage` and :class:`StageAxis`
+    which start a move and return without waiting for it to finish.
+
+    .. code-block:: python
+
+        move = stage.move_to_async({'x': 1000, 'y': 500})
+        # ... do something else while the stage moves ...
+        if not move.wait(timeout=5.0):
+            move.cancel()
+
+    When the stage is served by the device server, the handle is
+    registered with the same Pyro daemon and clients get a proxy to
+    it.  Only the handles of the most recent moves are kept
+    registered.
+
+    Args:
+        owner: the stage, stage axis, or any other object, that
+            started the move.
+        is_moving: function that returns whether the stage is still
+            moving.
+        stop: function that stops the move.  If `None`, the move can
+            not be cancelled.
+        poll_interval: time, in seconds, between calls to `is_moving`
+            while waiting for the move to finish.
+
+    """
+
+    # Number of moves that stay registered with the Pyro daemon for
+    # each owner.  Older ones are unregistered when new moves start.
+    _max_registered = 64
+
+    def __init__(
+        self,
+        owner: Any,
+        is_moving: Callable[[], bool],
+        stop: Optional[Callable[[], None]] = None,
+        poll_interval: float = 0.01,
+    ) -> None:
+        self._is_moving = is_moving
+        self._stop = stop
+        self._poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._done = False
+        self._cancelled = False
+        self._exception: Optional[BaseException] = None
+        self._register_with(owner)
+
+    def _register_with(self, owner: Any) -> None:
+        daemon = getattr(owner, "_pyroDaemon", None)
+        if daemon is None:
+            return
+        daemon.register(self)
+        registered = owner.__dict__.setdefault("_registered_stage_moves", [])
+        registered.append(self)
+        while len(registered) > self._max_registered:
+            daemon.unregister(registered.pop(0))
+
+    def _set_exception(self, exception: BaseException) -> None:
+        with self._lock:
+            self._exception = exception
+
+    def done(self) -> bool:
+        """Whether the move has finished or was cancelled."""
+        with self._lock:
+            if not self._done and not self._is_moving():
+                self._done = True
+            return self._done
+
+    def cancelled(self) -> bool:
+        """Whether the move was cancelled."""
+        return self._cancelled
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the move to finish.
+
+        Args:
+            timeout: maximum time, in seconds, to wait.  If `None`,
+                wait until the move finishes.
+
+        Returns:
+            Whether the move finished, `False` if it timed out.
+
+        Raises:
+            Any exception raised while moving the stage.
+        """
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+        while not self.done():
+            if timeout is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0.0:
+                    return False
+                time.sleep(min(self._poll_interval, remaining))
+            else:
+                time.sleep(self._poll_interval)
+        if self._exception is not None:
+            raise self._exception
+        return True
+
+    def cancel(self) -> bool:
+        """Stop the move.
+
+        The stage stops wherever it is, it does not go back to where
+        it started.
+
+        Returns:
+            Whether the move was cancelled.  `False` if the move has
+            already finished or if it can not be cancelled.
+        """
+        with self._lock:
+            if self._done or self._stop is None:
+                return False
+            if not self._is_moving():
+                self._done = True
+                return False
+            self._stop()
+            self._done = True
+            self._cancelled = True
+        return True
+
+
+def _start_threaded_move(
+    owner: Any, function: Callable, *args: Any
+) -> StageMove:
+    """Call a blocking move function on a separate thread.
+
+    This is the fallback for stages that do not implement
+    asynchronous moves.  The move can not be cancelled.
+    """
+
+    def run_move() -> None:
+        try:
+            function(*args)
+        except Exception as ex:
+            _logger.error("failed to move stage", exc_info=ex)
+            move._set_exception(ex)
+
+    thread = threading.Thread(target=run_move, daemon=True)
+    move = StageMove(owner, thread.is_alive)
+    thread.start()
+    return move
+
+
+class StageSequence(StageMove):
+    """Handle to a list of positions that a stage moves through.
+
+    Instances are returned by :meth:`Stage.run_positions`.  The stage
+    moves through the whole list on the device side and progress is
+    reported in batches: each call to :meth:`get_progress` returns all
+    positions reached since the previous call.  This avoids a request
+    from the client for each position in, for example, a tile scan
+    with thousands of tiles.
+
+    .. code-block:: python
+
+        sequence = stage.run_positions(tiles, dwell=0.1)
+        while not sequence.wait(timeout=1.0):
+            for index, timestamp in sequence.get_progress():
+                print("reached tile %d" % index)
+
+    Args:
+        owner: the stage that runs through the positions.
+        n_positions: number of positions in the list.
+        is_running: function that returns whether the stage is still
+            moving through the list.
+        stop: function that stops the stage.  If `None`, the sequence
+            can not be cancelled.
+        software_trigger: whether :meth:`trigger` advances the stage
+            to the next position.
+        poll_interval: time, in seconds, between calls to `is_running`
+            while waiting for the sequence to finish.
+
+    """
+
+    def __init__(
+        self,
+        owner: Any,
+        n_positions: int,
+        is_running: Callable[[], bool],
+        stop: Optional[Callable[[], None]] = None,
+        software_trigger: bool = False,
+        poll_interval: float = 0.01,
+    ) -> None:
+        self._n_positions = n_positions
+        self._software_trigger = software_trigger
+        self._advance = threading.Semaphore(0)
+        self._progress_lock = threading.Lock()
+        self._progress: List[Tuple[int, float]] = []
+        self._n_reached = 0
+        super().__init__(owner, is_running, stop, poll_interval)
+
+    @property
+    def n_positions(self) -> int:
+        """Number of positions in the list."""
+        return self._n_positions
+
+    @property
+    def n_reached(self) -> int:
+        """Number of positions reached so far."""
+        with self._progress_lock:
+            return self._n_reached
+
+    def _record(self, index: int) -> None:
+        with self._progress_lock:
+            self._progress.append((index, time.time()))
+            self._n_reached += 1
+
+    def get_progress(self) -> List[Tuple[int, float]]:
+        """Positions reached since the previous call.
+
+        Returns:
+            List of tuples with the index of the position reached and
+            the time, as seconds since the epoch, when it was reached.
+        """
+        with self._progress_lock:
+            progress = self._progress
+            self._progress = []
+        return progress
+
+    def trigger(self) -> None:
+        """Advance the stage to the next position.
+
+        Triggers sent before the stage is ready are queued.
+
+        Raises:
+            microscope.IncompatibleStateError: if the sequence is not
+                advanced by software triggers.
+        """
+        if not self._software_trigger:
+            raise microscope.IncompatibleStateError(
+                "sequence is not advanced by software triggers"
+            )
+        self._advance.release()
+
+    def _wait_for_advance(self, stopped: threading.Event) -> bool:
+        """Wait for a trigger, return `False` if stopped first."""
+        while not self._advance.acquire(timeout=self._poll_interval):
+            if stopped.is_set():
+                return False
+        return not stopped.is_set()
+
+
+def _start_threaded_sequence(
+    owner: Any,
+    move_to: Callable[[Mapping[str, float]], None],
+    positions: Sequence[Mapping[str, float]],
+    dwell: float,
+    trigger_type: Optional[microscope.TriggerType],
+    stop: Optional[Callable[[], None]] = None,
+    on_finish: Optional[Callable[[], None]] = None,
+) -> StageSequence:
+    """Run through a list of positions on a separate thread.
+
+    Args:
+        owner: the stage that runs through the positions.
+        move_to: function that moves the stage to a position and only
+            returns once the stage is there.
+        positions: list of positions to move to.
+        dwell: time, in seconds, to stay at each position.
+        trigger_type: `None` to not wait for triggers, any other type
+            to wait for the sequence to be advanced.  Only
+            `TriggerType.SOFTWARE` enables :meth:`StageSequence.trigger`.
+        stop: function to stop the stage when the sequence is
+            cancelled.  If `None`, the current move finishes.
+        on_finish: function called once the sequence is over.
+    """
+    positions = [dict(p) for p in positions]
+    stopped = threading.Event()
+
+    def run_sequence() -> None:
+        try:
+            for index, position in enumerate(positions):
+                if trigger_type is not None:
+                    if not sequence._wait_for_advance(stopped):
+                        return
+                elif stopped.is_set():
+                    return
+                move_to(position)
+                sequence._record(index)
+                if dwell > 0.0 and stopped.wait(dwell):
+                    return
+        except Exception as ex:
+            _logger.error("failed to run stage sequence", exc_info=ex)
+            sequence._set_exception(ex)
+        finally:
+            if on_finish is not None:
+                on_finish()
+
+    def stop_sequence() -> None:
+        stopped.set()
+        if stop is not None:
+            stop()
+
+    thread = threading.Thread(target=run_sequence, daemon=True)
+    sequence = StageSequence(
+        owner,
+        len(positions),
+        thread.is_alive,
+        stop_sequence,
+        software_trigger=trigger_type == microscope.TriggerType.SOFTWARE,
+    )
+    thread.start()
+    return sequence
+
+
 class StageAxis(metaclass=abc.ABCMeta):
     """A single dimension axis for a :class:`StageDevice`.
 
@@ -1350,10 +1772,33 @@ class StageAxis(metaclass=abc.ABCMeta):
         """Move axis to specified position."""
         raise NotImplementedError()
 
+    def move_by_async(self, delta: float) -> StageMove:
+        """Start moving axis by given amount and return immediately.
+
+        Returns:
+            A :class:`StageMove` handle to wait for, or cancel, the
+            move.
+        """
+        return _start_threaded_move(self, self.move_by, delta)
+
+    def move_to_async(self, pos: float) -> StageMove:
+        """Start moving axis to specified position and return immediately.
+
+        Returns:
+            A :class:`StageMove` handle to wait for, or cancel, the
+            move.
+        """
+        return _start_threaded_move(self, self.move_to, pos)
+
     @property
     @abc.abstractmethod
     def position(self) -> float:
-        """Current axis position."""
+        """Current axis position.
+
+        This does not wait for a move to finish.  During a move, it
+        is the position of the axis on its way to the target, as
+        returned for the axis by :attr:`Stage.position`.
+        """
         raise NotImplementedError()
 
     @property
@@ -1485,6 +1930,12 @@ class Stage(Device, metaclass=abc.ABCMeta):
         The units of the position is the same as the ones being
         currently used for the absolute move (:func:`move_to`)
         operations.
+
+        Like :attr:`StageAxis.position`, this does not wait for a
+        move to finish.  Concrete classes may read all axes with a
+        single request and reuse the reading for a few milliseconds,
+        so that many clients polling the position during a move do
+        not flood the device.
         """
         return {name: axis.position for name, axis in self.axes.items()}
 
@@ -1557,6 +2008,107 @@ class Stage(Device, metaclass=abc.ABCMeta):
         """
         raise NotImplementedError()
 
+    def move_by_async(self, delta: Mapping[str, float]) -> StageMove:
+        """Start moving axes by the corresponding amounts.
+
+        This is the same as :meth:`move_by` except that it returns
+        as soon as the move starts, without waiting for the stage to
+        stop moving.
+
+        .. code-block:: python
+
+            move = stage.move_by_async({'x': 10.2, 'y': -5})
+            # ... do something else while the stage moves ...
+            move.wait()
+
+        Returns:
+            A :class:`StageMove` handle to wait for, or cancel, the
+            move.
+
+        The default implementation calls :meth:`move_by` on a
+        separate thread and the move can not be cancelled.  Concrete
+        classes should implement it with the hardware commands that
+        start a move without waiting for it to finish.
+
+        """
+        return _start_threaded_move(self, self.move_by, delta)
+
+    def move_to_async(self, position: Mapping[str, float]) -> StageMove:
+        """Start moving axes to the corresponding positions.
+
+        This is the same as :meth:`move_to` except that it returns
+        as soon as the move starts.  See :meth:`move_by_async`.
+
+        Returns:
+            A :class:`StageMove` handle to wait for, or cancel, the
+            move.
+
+        """
+        return _start_threaded_move(self, self.move_to, position)
+
+    def run_positions(
+        self,
+        positions: Sequence[Mapping[str, float]],
+        dwell: float = 0.0,
+        trigger_type: Optional[microscope.TriggerType] = None,
+    ) -> StageSequence:
+        """Move through a list of positions.
+
+        The stage runs through the whole list on the device side,
+        without a request from the client for each position, and
+        returns immediately.
+
+        .. code-block:: python
+
+            # Visit each tile and wait for a software trigger to move
+            # on to the next one.
+            tiles = [{'x': x, 'y': y} for y in ys for x in xs]
+            sequence = stage.run_positions(
+                tiles, trigger_type=TriggerType.SOFTWARE
+            )
+            for _ in tiles:
+                sequence.trigger()
+                # ... acquire image ...
+
+        Args:
+            positions: list of maps of axis name to position, as
+                passed to :meth:`move_to`.
+            dwell: time, in seconds, to stay at each position before
+                moving to the next, or before waiting for the next
+                trigger.  With hardware triggers, the triggers set
+                the timing and stages may require a zero dwell.
+            trigger_type: `None` to move to the next position once
+                the dwell time is over.  `TriggerType.SOFTWARE` to
+                wait for :meth:`StageSequence.trigger` before each
+                move.  Other trigger types wait for a hardware
+                trigger, if the stage supports it.
+
+        Returns:
+            A :class:`StageSequence` handle to follow the progress,
+            trigger, or cancel, the sequence.
+
+        Raises:
+            microscope.UnsupportedFeatureError: if the stage does not
+                support `trigger_type`.
+            ValueError: if `dwell` is not supported with
+                `trigger_type`.
+
+        The default implementation calls :meth:`move_to` for each
+        position on a separate thread and does not support hardware
+        triggers.  Concrete classes for controllers that can store a
+        list of positions, such as in a ring buffer, should upload
+        the list to the controller instead.
+
+        """
+        if trigger_type not in (None, microscope.TriggerType.SOFTWARE):
+            raise microscope.UnsupportedFeatureError(
+                "%s does not support %s triggers"
+                % (type(self).__name__, trigger_type)
+            )
+        return _start_threaded_sequence(
+            self, self.move_to, positions, dwell, trigger_type
+        )
+
 
 class DigitalIO(DataDevice, metaclass=abc.ABCMeta):
     """ABC for digital IO devices.
@@ -20,56 +20,318 @@
 """TODO: complete this docstring
 """
 
+import concurrent.futures
 import inspect
-import itertools
 import queue
 import socket
 import threading
+import weakref
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
 
 import Pyro4
 
+import microscope._utils
+
 # Pyro configuration. Use pickle because it can serialize numpy ndarrays.
 Pyro4.config.SERIALIZERS_ACCEPTED.add("pickle")
 Pyro4.config.SERIALIZER = "pickle"
 
 LISTENERS = {}
+_LISTENERS_LOCK = threading.Lock()
+
+# Metadata (names of methods and attributes) of remote objects, by
+# URI.  With it, a proxy can be created without a round trip to the
+# remote object.  It is updated each time a proxy connects, since the
+# device served on a URI may change, for example, when the device
+# server configuration is reloaded.
+_METADATA: Dict[str, dict] = {}
+_METADATA_LOCK = threading.Lock()
+
+# Names of the methods and properties defined by each Client class.
+# These are not passed through to the remote object.
+_CLIENT_MEMBERS: Dict[type, Tuple[FrozenSet[str], FrozenSet[str]]] = {}
+
+
+def _get_client_members(cls: type) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    members = _CLIENT_MEMBERS.get(cls)
+    if members is None:
+        methods = frozenset(
+            m[0] for m in inspect.getmembers(cls, predicate=inspect.isroutine)
+        )
+        properties = frozenset(
+            m[0]
+            for m in inspect.getmembers(
+                cls, predicate=inspect.isdatadescriptor
+            )
+        )
+        members = (methods, properties)
+        _CLIENT_MEMBERS[cls] = members
+    return members
+
+
+class _Proxy(Pyro4.Proxy):
+    """Pyro proxy that updates the metadata cache when it connects.
+
+    Pyro sends the metadata of the remote object as part of the
+    connection handshake so keeping the cache up to date is free.
+    """
+
+    def _pyroValidateHandshake(self, response) -> None:
+        super()._pyroValidateHandshake(response)
+        metadata = {
+            "methods": frozenset(self._pyroMethods),
+            "attrs": frozenset(self._pyroAttrs),
+            "oneway": frozenset(self._pyroOneway),
+        }
+        key = str(self._pyroUri)
+        with _METADATA_LOCK:
+            # Keep the same dict if nothing changed, so that clients
+            # can check for changes by identity.
+            if _METADATA.get(key) != metadata:
+                _METADATA[key] = metadata
+
+
+def _get_metadata(proxy: Pyro4.Proxy) -> None:
+    """Set the metadata of a proxy, from the cache if available."""
+    key = str(proxy._pyroUri)
+    with _METADATA_LOCK:
+        metadata = _METADATA.get(key)
+    if metadata is not None:
+        proxy._pyroGetMetadata(known_metadata=metadata)
+    else:
+        # The metadata is added to the cache when connecting.
+        proxy._pyroGetMetadata()
+
+
+def clear_metadata_cache(url: Optional[str] = None) -> None:
+    """Forget the cached methods and attributes of remote devices.
+
+    Clients cache the names of the methods and attributes of the
+    remote devices, by URI.  If the device served on a URI changes,
+    for example, after changing the device server configuration, the
+    cache needs to be cleared.
+
+    Args:
+        url: URI of the device to forget.  If `None`, forget all
+            devices.
+    """
+    with _METADATA_LOCK:
+        if url is None:
+            _METADATA.clear()
+        else:
+            _METADATA.pop(str(url), None)
 
 
 class Client:
-    """Base Client object that makes methods on proxy available locally."""
+    """Base Client object that makes methods on proxy available locally.
+
+    The names of the remote methods and attributes are cached, so
+    creating a client for a device that was already connected does not
+    make any request to the remote device.  They are updated when the
+    client reconnects, such as after the device server restarted with
+    a different device.  Remote attributes are read and written on the
+    remote device each time they are accessed.
+
+    A Pyro proxy makes one call at a time.  So that a client can be
+    used from multiple threads concurrently, each thread uses its own
+    proxy, and connection, to the remote device.
+    """
 
     def __init__(self, url):
         self._url = url
         self._proxy = None
+        # Metadata from which the remote members were set.
+        self._metadata = None
+        self._remote_methods = frozenset()
+        self._remote_attrs = frozenset()
+        # Proxy for each thread.  They are also kept by thread, so
+        # that they can be released.  Proxies to the same URI compare
+        # equal so they can't be kept in a set.
+        self._local = threading.local()
+        self._proxies = weakref.WeakKeyDictionary()
+        self._proxies_lock = threading.Lock()
         self._connect()
 
     def _connect(self):
         """Connect to a proxy and set up self passthrough to proxy methods."""
-        self._proxy = Pyro4.Proxy(self._url)
-        self._proxy._pyroGetMetadata()
+        self._proxy = self._get_proxy()
+        self._update_members()
 
+    def _update_members(self) -> None:
+        """Set up the remote members if the metadata cache changed."""
+        with _METADATA_LOCK:
+            metadata = _METADATA.get(str(self._proxy._pyroUri))
+        if metadata is None or metadata is self._metadata:
+            return
+        for method in self._remote_methods:
+            self.__dict__.pop(method, None)
         # Derived classes may over-ride some methods. Leave these alone.
-        my_methods = [
-            m[0] for m in inspect.getmembers(self, predicate=inspect.ismethod)
-        ]
-        methods = set(self._proxy._pyroMethods).difference(my_methods)
-        # But in the case of propertyes, we need to inspect the class.
-        my_properties = [
-            m[0]
-            for m in inspect.getmembers(
-                self.__class__, predicate=inspect.isdatadescriptor
-            )
-        ]
-        properties = set(self._proxy._pyroAttrs).difference(my_properties)
+        my_methods, my_properties = _get_client_members(type(self))
+        self._remote_methods = metadata["methods"].difference(my_methods)
+        for method in self._remote_methods:
+            setattr(self, method, self._make_remote_method(method))
+        self._remote_attrs = metadata["attrs"].difference(my_properties)
+        self._metadata = metadata
 
-        for attr in itertools.chain(methods, properties):
-            setattr(self, attr, getattr(self._proxy, attr))
+    def _get_proxy(self) -> Pyro4.Proxy:
+        """Return the proxy for the current thread."""
+        proxy = getattr(self._local, "proxy", None)
+        if proxy is None:
+            proxy = _Proxy(self._url)
+            _get_metadata(proxy)
+            self._local.proxy = proxy
+            with self._proxies_lock:
+                # Release the connections of finished threads.
+                for thread in list(self._proxies.keys()):
+                    if not thread.is_alive():
+                        self._proxies.pop(thread)._pyroRelease()
+                self._proxies[threading.current_thread()] = proxy
+        return proxy
+
+    def _release_thread_proxy(self) -> None:
+        """Release the proxy of the current thread, if it has one."""
+        proxy = getattr(self._local, "proxy", None)
+        if proxy is None:
+            return
+        del self._local.proxy
+        with self._proxies_lock:
+            self._proxies.pop(threading.current_thread(), None)
+        proxy._pyroRelease()
+
+    def _make_remote_method(self, name: str):
+        def remote_method(*args, **kwargs):
+            # Getting a method from the proxy does not call the remote.
+            try:
+                return getattr(self._get_proxy(), name)(*args, **kwargs)
+            finally:
+                # The call may have reconnected to a different device.
+                self._update_members()
+
+        remote_method.__name__ = name
+        return remote_method
+
+    def _release(self) -> None:
+        """Release the connections of the proxies of all threads."""
+        with self._proxies_lock:
+            proxies = list(self._proxies.values())
+        # The thread that created the client may have finished.
+        proxies.append(self._proxy)
+        for proxy in proxies:
+            proxy._pyroRelease()
+
+    def __getattr__(self, name):
+        # Only called if the attribute was not found the normal way.
+        # Use __dict__ to avoid recursion before _remote_attrs is set.
+        if name in self.__dict__.get("_remote_attrs", ()):
+            try:
+                return getattr(self._get_proxy(), name)
+            finally:
+                self._update_members()
+        raise AttributeError(
+            "'%s' object has no attribute '%s'" % (type(self).__name__, name)
+        )
+
+    def __setattr__(self, name, value):
+        if name in self.__dict__.get("_remote_attrs", ()):
+            try:
+                setattr(self._get_proxy(), name, value)
+            finally:
+                self._update_members()
+        else:
+            super().__setattr__(name, value)
+
+
+class ClientPool:
+    """Clients to remote devices, created in advance and reused.
+
+    Creating a client for a device that has not been connected before
+    requires a round trip to get the names of the remote methods.  A
+    pool creates the clients in parallel and keeps them so that they
+    can be reused.
+
+    Args:
+        urls: URIs of the devices to connect to in advance.
+        cls: the type of client to create.
+        max_workers: maximum number of connections to make in
+            parallel.
+
+    """
+
+    def __init__(
+        self,
+        urls: Iterable[str] = (),
+        cls: type = Client,
+        max_workers: int = 8,
+    ) -> None:
+        self._cls = cls
+        self._lock = threading.Lock()
+        self._clients: Dict[str, Client] = {}
+        self.connect(urls, max_workers=max_workers)
+
+    def connect(self, urls: Iterable[str], max_workers: int = 8) -> None:
+        """Create clients for the devices, in parallel, in the pool."""
+        urls = [str(url) for url in urls if str(url) not in self._clients]
+        if not urls:
+            return
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            clients = list(executor.map(self._create_client, urls))
+        with self._lock:
+            for url, client in zip(urls, clients):
+                self._clients.setdefault(url, client)
+
+    def _create_client(self, url: str) -> Client:
+        client = self._cls(url)
+        # The client is created on a worker thread which finishes
+        # once the pool is connected.  Release the proxy of this
+        # thread, the threads using the client get their own.
+        client._release_thread_proxy()
+        return client
+
+    def get(self, url: str) -> Client:
+        """Get the client for a device, connecting to it if needed."""
+        url = str(url)
+        with self._lock:
+            client = self._clients.get(url)
+        if client is None:
+            client = self._cls(url)
+            with self._lock:
+                client = self._clients.setdefault(url, client)
+        return client
+
+    def close(self) -> None:
+        """Release the connections of all clients in the pool."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            client._release()
+
+    def __enter__(self) -> "ClientPool":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
 
 
 class DataClient(Client):
-    """A client that can receive and buffer data."""
+    """A client that can receive and buffer data.
 
-    def __init__(self, url):
+    Data is received on a Pyro daemon, a listener, shared by all
+    `DataClient` instances on the same network interface.
+
+    Args:
+        url: URI of the remote device.
+        daemon_options: keyword arguments to tune the Pyro daemon
+            that receives the data, such as the server type and
+            socket buffer sizes.  See
+            :func:`microscope._utils.create_pyro_daemon` for the
+            available options.  These are only used if this is the
+            first `DataClient` on the interface, which creates the
+            listener.
+
+    """
+
+    def __init__(self, url, daemon_options=None):
         super().__init__(url)
         self._buffer = queue.Queue()
         # Register self with a listener.
@@ -79,17 +341,23 @@ class DataClient(Client):
             # TODO: support multiple interfaces. Could use ifaddr.get_adapters() to
             # query ip addresses then pick first interface on the same subnet.
             iface = socket.gethostbyname(socket.gethostname())
-        if iface not in LISTENERS:
-            LISTENERS[iface] = Pyro4.Daemon(host=iface)
-            lthread = threading.Thread(target=LISTENERS[iface].requestLoop)
-            lthread.daemon = True
-            lthread.start()
-        self._client_uri = LISTENERS[iface].register(self)
+        with _LISTENERS_LOCK:
+            if iface not in LISTENERS:
+                if daemon_options is None:
+                    daemon_options = {}
+                LISTENERS[iface] = microscope._utils.create_pyro_daemon(
+                    iface, **daemon_options
+                )
+                lthread = threading.Thread(target=LISTENERS[iface].requestLoop)
+                lthread.daemon = True
+                lthread.start()
+            listener = LISTENERS[iface]
+        self._client_uri = listener.register(self)
 
     def enable(self):
         """Set the client on the remote and enable it."""
         self.set_client(self._client_uri)
-        self._proxy.enable()
+        self._get_proxy().enable()
 
     @Pyro4.expose
     @Pyro4.oneway
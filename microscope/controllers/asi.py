@@ -28,10 +28,11 @@ import re
 import threading
 import time
 import typing
-from typing import Dict, List, Mapping, Optional
+from typing import Dict, List, Mapping, Optional, Sequence
 
 import serial
 
+import microscope._serial
 import microscope._utils
 import microscope.abc
 from microscope import InitialiseError
@@ -53,21 +54,44 @@ _logger = logging.getLogger(__name__)
 # HERE H Writes a position to an axis position buffer
 # HOME ! Tells stage to go to physical limit switches
 # INFO I Returns a screen full of information about the axis
+# LOAD LD Loads a position into the ring buffer
 # MOTCTRL MC Enables/Disables motor control for axis
 # MOVE M Writes a position to an axis target buffer
 # MOVREL R Writes a relative position to target buffer
 # RDSBYTE RB Returns a Status Information byte for an axis
+# RBMODE RM Sets up the ring buffer
 # RDSTAT RS Same as RDSBYTE, in decimal ASCII format.
 # RESET ~ Resets the MFC-2000 and MS-2000 controller
 # SPEED S Sets the maximum velocity/speed of axis
 # SPIN @ Causes axis to spin motor at given DAC rate
 # STATUS / Returns B-Busy, N-Not Busy
+# TTL TTL Sets the function of the TTL input, X=1 for ring buffer moves
 # UNITS UN Toggles LCD units – mm or in – when DIP switch 2 is down
 # WHERE W Returns current position
 # ZERO Z Sets all axes to zero/set position to origin
 
 # command set based on the Ludl control so module copied from the ludl driver
 
+# The ring buffer stores positions that the stage moves to, in turn,
+# on each TTL input pulse.  The axes that the ring buffer moves are
+# selected with a byte, one bit per axis.
+_RING_BUFFER_SIZE = 50
+_RING_BUFFER_AXIS_BIT = {"X": 1, "Y": 2, "Z": 4}
+
+# Time, in seconds, without new data after which a response with no
+# end marker, such as to the INFO command, is complete.  Lines of a
+# response are sent together so this is much shorter than the serial
+# timeout.
+_IDLE_TIMEOUT = 0.05
+
+# Responses of multiple lines end on a line with "N" or ":A", if at
+# all.  Lines end with \r only, without the \n of other replies.
+_MULTILINE_RESPONSE = microscope._serial.ResponseFormat(
+    terminator=b"\r",
+    end=lambda line: line.strip() == b"N" or line.strip()[0:2] == b":A",
+    idle_timeout=_IDLE_TIMEOUT,
+)
+
 # ASI error codes
 # Error Codes for MS-2000 Diagnostics
 # Error codes are dumped to the screen with the last error code shown first using the ‘DU Y‘
@@ -211,16 +235,18 @@ class _ASIController:
         # From the technical datasheet: 8 bit word 1 stop bit, no
         # parity no handshake, baudrate options of 9600, 19200, 38400,
         # 57600 and 115200.
-        self._serial = serial.Serial(
-            port=port,
-            baudrate=baudrate,
-            timeout=timeout,
-            bytesize=serial.EIGHTBITS,
-            stopbits=serial.STOPBITS_ONE,
-            parity=serial.PARITY_NONE,
-            xonxoff=False,
-            rtscts=False,
-            dsrdtr=False,
+        self._serial = microscope._serial.InstrumentedSerial(
+            serial.Serial(
+                port=port,
+                baudrate=baudrate,
+                timeout=timeout,
+                bytesize=serial.EIGHTBITS,
+                stopbits=serial.STOPBITS_ONE,
+                parity=serial.PARITY_NONE,
+                xonxoff=False,
+                rtscts=False,
+                dsrdtr=False,
+            )
         )
         self._lock = threading.RLock()
 
@@ -244,6 +270,14 @@ class _ASIController:
                 f"Unable to read configuration. Is ASI controller connected?: {e}"
             )
 
+        # The position of all axes is read with a single command and
+        # reused for a few milliseconds, so that multiple clients
+        # polling the position share the same request.
+        self._positions_cache = microscope._utils.ExpiringCache(
+            lambda: self.get_absolute_positions(self.axis_list),
+            max_age=0.005,
+        )
+
         # As for this version, some MS2000 controllers have integrated control for 2 LEDs
         self.led_list = [b"X", b"Y"]
 
@@ -272,32 +306,22 @@ class _ASIController:
             #            _logger.warning
             return line
 
-    def read_multiline(self):
-        output = []
-        line = True
-        while line:
-            line = self.readline()
-            output.append(line.strip(b"\r"))
-            if line:
-                # was there any data on this line?
-                if line == b"N" or line[0:2] == b":A":
-                    # this means an end of command strings doesnt require an
-                    # additional timeout before it returns
-                    return output
-                elif line[0] == b"N":
-                    # this is an error string
-                    error = line[2:].strip()
-                    raise (
-                        f"ASI controller error: {error},{_ASI_ERRORS[error]}"
-                    )
-        return output
+    def read_multiline(self) -> List[bytes]:
+        """Read a response of multiple lines.
+
+        If the response does not end with an ``N`` or ``:A`` line, it
+        ends once no new line arrives, without waiting for the serial
+        timeout.  If there is no response at all, returns ``[b""]``.
+        """
+        with self._lock:
+            lines = _MULTILINE_RESPONSE.read(self._serial)
+        return [line.strip(b"\r") for line in lines]
 
     def read_until_timeout(self) -> None:
-        """Read until timeout; used to clean buffer if in an unknown state."""
+        """Read until idle; used to clean buffer if in an unknown state."""
         with self._lock:
             self._serial.flushInput()
-            while self._serial.readline():
-                continue
+            microscope._serial.read_until_idle(self._serial, _IDLE_TIMEOUT)
 
     def wait_until_idle(self) -> None:
         """Keep sending the ``STATUS`` command until it responds ``0\\r``"""
@@ -310,7 +334,10 @@ class _ASIController:
                 # wait for move to stop
                 while self.get_command(b"STATUS") != expected:
                     time.sleep(0.01)
-            return answer
+        # Outside the lock, since reading the positions takes the
+        # cache lock before the connection lock.
+        self._positions_cache.invalidate()
+        return answer
 
     def get_command(self, command: bytes) -> bytes:
         """Send get command and return the answer."""
@@ -378,12 +405,86 @@ class _ASIController:
         if wait:
             self.wait_for_motor_stop(axis)
 
+    def start_move_command(self, command: bytes) -> None:
+        """Send a move command without waiting for the move to finish."""
+        answer = self.get_command(command)
+        self._positions_cache.invalidate()
+        if answer.strip()[0:2] != b":A":
+            raise microscope.DeviceError(
+                "failed to start move with %s: %s" % (command, answer)
+            )
+
+    def start_move_by_relative_position(self, axis: str, delta: float) -> None:
+        """Start a relative move of an axis and return immediately."""
+        if axis not in self.axis_list:
+            raise ValueError(
+                f"Axis {axis} not present. Verify the name of the axis or your configuration files."
+            )
+        self.start_move_command(bytes(f"MOVREL {axis}={str(delta)}", "ascii"))
+
+    def start_move_to_absolute_position(self, axis: str, pos: float) -> None:
+        """Start an absolute move of an axis and return immediately."""
+        if axis not in self.axis_list:
+            raise ValueError(
+                f"Axis {axis} not present. Verify the name of the axis or your configuration files."
+            )
+        self.start_move_command(bytes(f"MOVE {axis}={str(pos)}", "ascii"))
+
+    def is_moving(self) -> bool:
+        """Whether any axis is moving, from the ``STATUS`` command."""
+        return self.get_command(b"STATUS").strip() == b"B"
+
+    def halt(self) -> None:
+        """Stop all axes with the ``HALT`` command."""
+        self.get_command(b"HALT")
+        self._positions_cache.invalidate()
+
+    def load_ring_buffer(
+        self, positions: Sequence[Mapping[str, float]]
+    ) -> None:
+        """Clear the ring buffer and load a list of positions on it."""
+        if len(positions) > _RING_BUFFER_SIZE:
+            raise ValueError(
+                f"ring buffer only holds {_RING_BUFFER_SIZE} positions"
+            )
+        axes = set()
+        for position in positions:
+            axes.update(position.keys())
+        for axis in axes:
+            if axis not in self.axis_list:
+                raise ValueError(
+                    f"Axis {axis} not present. Verify the name of the axis or your configuration files."
+                )
+            if axis not in _RING_BUFFER_AXIS_BIT:
+                raise ValueError(f"ring buffer can't move axis {axis}")
+        axis_byte = sum(_RING_BUFFER_AXIS_BIT[axis] for axis in axes)
+        self.get_command(b"RM X=0")
+        self.get_command(bytes(f"RM Y={axis_byte}", "ascii"))
+        for position in positions:
+            values = " ".join(f"{a}={int(p)}" for a, p in position.items())
+            self.get_command(bytes(f"LD {values}", "ascii"))
+
+    def get_ring_buffer_pointer(self) -> int:
+        """Index of the next position on the ring buffer."""
+        reply = self.get_command(b"RM Z?")
+        match = re.search(rb"(\d+)\s*$", reply)
+        if match is None:
+            raise microscope.DeviceError(
+                f"failed to parse ring buffer pointer from {reply}"
+            )
+        return int(match.group(1))
+
+    def set_ttl_ring_buffer(self, enabled: bool) -> None:
+        """Set the TTL input to move to the next ring buffer position."""
+        self.get_command(b"TTL X=1" if enabled else b"TTL X=0")
+
     def move_to_limit(self, axis: str, speed: int):
         if axis not in self.axis_list:
             raise ValueError(
                 f"Axis {axis} not present. Verify the name of the axis or your configuration files."
             )
         self.get_command(bytes(f"SPIN {axis}={speed}", "ascii"))
+        self._positions_cache.invalidate()
 
     def motor_moving(self, axis: str) -> int:
         if axis not in self.axis_list:
@@ -418,6 +519,7 @@ class _ASIController:
         time.sleep(0.2)
         while self.motor_moving(axis):
             time.sleep(0.1)
+        self._positions_cache.invalidate()
 
     def reset_position(self, axis: str):
         if axis not in self.axis_list:
@@ -425,6 +527,7 @@ class _ASIController:
                 f"Axis {axis} not present. Verify the name of the axis or your configuration files."
             )
         self.get_command(bytes(f"HERE {axis}=0", "ascii"))
+        self._positions_cache.invalidate()
 
     def get_absolute_position(self, axis: str) -> float:
         if axis not in self.axis_list:
@@ -437,6 +540,27 @@ class _ASIController:
         else:
             return float(position.strip()[2:])
 
+    def get_absolute_positions(self, axes: Sequence[str]) -> List[float]:
+        """Current position of multiple axes with a single command."""
+        for axis in axes:
+            if axis not in self.axis_list:
+                raise ValueError(
+                    f"Axis {axis} not present. Verify the name of the axis or your configuration files."
+                )
+        reply = self.get_command(bytes("WHERE " + " ".join(axes), "ascii"))
+        values = reply.strip().split()
+        if not values or values[0] != b":A":
+            raise microscope.DeviceError(f"failed to read positions: {reply}")
+        return [float(v) for v in values[1:]]
+
+    def get_all_positions(self) -> Dict[str, float]:
+        """Current position of all axes.
+
+        Calls within a few milliseconds of each other share the same
+        reading.
+        """
+        return dict(zip(self.axis_list, self._positions_cache.get()))
+
     # Light related methods #
     def is_led_on(self, channel):
         return bool(self.get_led_power(channel))
@@ -472,12 +596,26 @@ class _ASIStageAxis(microscope.abc.StageAxis):
         self._dev_conn.move_to_absolute_position(self._axis, int(pos))
         print("got to ", self.position)
 
+    def _start_move(self) -> microscope.abc.StageMove:
+        # There is no command to stop a single axis, HALT stops them
+        # all.
+        return microscope.abc.StageMove(
+            self,
+            lambda: bool(self._dev_conn.motor_moving(self._axis)),
+            self._dev_conn.halt,
+        )
+
+    def move_by_async(self, delta: float) -> microscope.abc.StageMove:
+        self._dev_conn.start_move_by_relative_position(self._axis, int(delta))
+        return self._start_move()
+
+    def move_to_async(self, pos: float) -> microscope.abc.StageMove:
+        self._dev_conn.start_move_to_absolute_position(self._axis, int(pos))
+        return self._start_move()
+
     @property
     def position(self) -> float:
-        if self._dev_conn.is_busy():
-            _logger.warning("querying stage axis position but device is busy")
-            self._dev_conn.wait_until_idle()
-        return float(self._dev_conn.get_absolute_position(self._axis))
+        return self._dev_conn.get_all_positions()[self._axis]
 
     @property
     def limits(self) -> microscope.AxisLimits:
@@ -648,6 +786,10 @@ class _ASIStage(microscope.abc.Stage):
     def axes(self) -> Mapping[str, microscope.abc.StageAxis]:
         return self._axes
 
+    @property
+    def position(self) -> Mapping[str, float]:
+        return self._dev_conn.get_all_positions()
+
     def move_by(self, delta: Mapping[str, float]) -> None:
         """Move specified axes by the specified distance."""
         for axis_name, axis_delta in delta.items():
@@ -665,6 +807,107 @@ class _ASIStage(microscope.abc.Stage):
             )
         self._dev_conn.wait_until_idle()
 
+    def run_positions(
+        self,
+        positions: Sequence[Mapping[str, float]],
+        dwell: float = 0.0,
+        trigger_type: Optional[microscope.TriggerType] = None,
+    ) -> microscope.abc.StageSequence:
+        """Move through a list of positions.
+
+        With rising edge triggers, the positions are loaded on the
+        controller ring buffer and each pulse on the TTL input moves
+        the stage to the next position without involving the
+        computer.  The ring buffer holds up to 50 positions and,
+        since the triggers set the timing, `dwell` must be zero.
+        Other trigger types are handled as described in
+        :meth:`microscope.abc.Stage.run_positions`.
+        """
+        if trigger_type != microscope.TriggerType.RISING_EDGE:
+            return super().run_positions(positions, dwell, trigger_type)
+        if dwell != 0.0:
+            raise ValueError("dwell must be zero with hardware triggers")
+        positions = [dict(p) for p in positions]
+        if len(positions) > _RING_BUFFER_SIZE:
+            raise microscope.UnsupportedFeatureError(
+                f"ring buffer only holds {_RING_BUFFER_SIZE} positions"
+            )
+        self._dev_conn.load_ring_buffer(positions)
+        # Read the pointer before enabling the TTL input, otherwise
+        # the moves of early pulses would be missed.
+        initial_pointer = self._dev_conn.get_ring_buffer_pointer()
+        self._dev_conn.set_ttl_ring_buffer(True)
+        stopped = threading.Event()
+
+        def follow_ring_buffer(pointer: int) -> None:
+            try:
+                n_positions = len(positions)
+                index = 0
+                moved = False
+                while index < n_positions and not stopped.is_set():
+                    # Read the pointer before the status so that a
+                    # pulse in between is seen as a move.
+                    new_pointer = self._dev_conn.get_ring_buffer_pointer()
+                    if self._dev_conn.is_moving():
+                        moved = True
+                        time.sleep(0.01)
+                        continue
+                    n_moves = (new_pointer - pointer) % n_positions
+                    if n_moves == 0:
+                        if not moved:
+                            time.sleep(0.01)
+                            continue
+                        # The stage moved but the pointer is back
+                        # where it was so it went through the whole
+                        # ring buffer.  With a single position, this
+                        # is the only way to see the move.
+                        n_moves = n_positions
+                    pointer = new_pointer
+                    moved = False
+                    for _ in range(min(n_moves, n_positions - index)):
+                        sequence._record(index)
+                        index += 1
+            except Exception as ex:
+                _logger.error("failed to follow ring buffer", exc_info=ex)
+                sequence._set_exception(ex)
+            finally:
+                self._dev_conn.set_ttl_ring_buffer(False)
+
+        def stop() -> None:
+            stopped.set()
+            self._dev_conn.halt()
+
+        thread = threading.Thread(
+            target=follow_ring_buffer, args=(initial_pointer,), daemon=True
+        )
+        sequence = microscope.abc.StageSequence(
+            self, len(positions), thread.is_alive, stop
+        )
+        thread.start()
+        return sequence
+
+    def move_by_async(
+        self, delta: Mapping[str, float]
+    ) -> microscope.abc.StageMove:
+        for axis_name, axis_delta in delta.items():
+            self._dev_conn.start_move_by_relative_position(
+                axis_name, int(axis_delta)
+            )
+        return microscope.abc.StageMove(
+            self, self._dev_conn.is_moving, self._dev_conn.halt
+        )
+
+    def move_to_async(
+        self, position: Mapping[str, float]
+    ) -> microscope.abc.StageMove:
+        for axis_name, axis_position in position.items():
+            self._dev_conn.start_move_to_absolute_position(
+                axis_name, int(axis_position)
+            )
+        return microscope.abc.StageMove(
+            self, self._dev_conn.is_moving, self._dev_conn.halt
+        )
+
 
 class _ASILED(
     microscope._utils.OnlyTriggersBulbOnSoftwareMixin,
@@ -768,6 +1011,7 @@ class ASIMS2000(microscope.abc.Controller):
     ) -> None:
         super().__init__()
         self._conn = _ASIController(port, baudrate, timeout)
+        self._serial_stats = self._conn._serial.stats
         self._devices: Mapping[str, microscope.abc.Device] = {}
         self._devices["stage"] = _ASIStage(self._conn)
         for light_ch, light in enumerate(kwargs["lights"]):
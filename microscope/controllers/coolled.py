@@ -26,6 +26,7 @@ from typing import Dict, List
 import serial
 
 import microscope
+import microscope._serial
 import microscope._utils
 import microscope.abc
 
@@ -305,7 +306,11 @@ class CoolLED(microscope.abc.Controller):
             rtscts=False,
             dsrdtr=False,
         )
-        shared_serial = microscope._utils.SharedSerial(serial_conn)
+        instrumented_serial = microscope._serial.InstrumentedSerial(
+            serial_conn
+        )
+        self._serial_stats = instrumented_serial.stats
+        shared_serial = microscope._utils.SharedSerial(instrumented_serial)
         connection = _CoolLEDConnection(shared_serial)
         for name in connection.get_channels():
             self._channels[name] = _CoolLEDChannel(connection, name)
@@ -25,10 +25,12 @@
 import re
 import threading
 import time
-from typing import Mapping
+from typing import Dict, List, Mapping, Sequence
 
 import serial
 
+import microscope._serial
+import microscope._utils
 import microscope.abc
 
 # so far very basic support for stages
@@ -71,6 +73,20 @@ LUDL_ERRORS = {
     -17: "Initialization error",
 }
 
+# Time, in seconds, without new data after which a response with no
+# end marker, such as to the RCONFIG command, is complete.  Lines of
+# a response are sent together so this is much shorter than the
+# serial timeout.
+_IDLE_TIMEOUT = 0.05
+
+# Responses of multiple lines end on a line with "N" or ":A", if at
+# all.
+_MULTILINE_RESPONSE = microscope._serial.ResponseFormat(
+    terminator=b"\n",
+    end=lambda line: line.strip() == b"N" or line.strip()[0:2] == b":A",
+    idle_timeout=_IDLE_TIMEOUT,
+)
+
 AXIS_MAPPER = {
     1: "X",
     2: "Y",
@@ -95,18 +111,29 @@ class _LudlController:
         # From the technical datasheet: 8 bit word 1 stop bit, no
         # parity no handshake, baudrate options of 9600, 19200, 38400,
         # 57600 and 115200.
-        self._serial = serial.Serial(
-            port=port,
-            baudrate=baudrate,
-            timeout=timeout,
-            bytesize=serial.EIGHTBITS,
-            stopbits=serial.STOPBITS_TWO,
-            parity=serial.PARITY_NONE,
-            xonxoff=False,
-            rtscts=False,
-            dsrdtr=False,
+        self._serial = microscope._serial.InstrumentedSerial(
+            serial.Serial(
+                port=port,
+                baudrate=baudrate,
+                timeout=timeout,
+                bytesize=serial.EIGHTBITS,
+                stopbits=serial.STOPBITS_TWO,
+                parity=serial.PARITY_NONE,
+                xonxoff=False,
+                rtscts=False,
+                dsrdtr=False,
+            )
         )
         self._lock = threading.RLock()
+        # The position of all axes is read with a single command and
+        # reused for a few milliseconds, so that multiple clients
+        # polling the position share the same request.
+        self._positions_cache = microscope._utils.ExpiringCache(
+            lambda: self.get_absolute_positions(
+                range(1, self.get_number_axes() + 1)
+            ),
+            max_age=0.005,
+        )
 
         with self._lock:
             # We do not use the general get_description() here because
@@ -148,31 +175,22 @@ class _LudlController:
         with self._lock:
             return self._serial.read_until(b"\n")
 
-    def read_multiline(self):
-        output = []
-        line = True
-        while line:
-            line = self.readline()
-            output.append(line.strip())
-            if line == b"N" or line[0:2] == b":A":
-                # thins means an end of command strings doesn require an
-                # additional timeout before it returns
-                return output
-            elif line[0] == b"N":
-                # this is an error string
-                error = line[2:].strip()
-                raise (
-                    "Ludl controller error: %s,%s"
-                    % (error, LUDL_ERRORS[error])
-                )
-        return output
+    def read_multiline(self) -> List[bytes]:
+        """Read a response of multiple lines.
+
+        If the response does not end with an ``N`` or ``:A`` line, it
+        ends once no new line arrives, without waiting for the serial
+        timeout.  The last line is then empty.
+        """
+        with self._lock:
+            lines = _MULTILINE_RESPONSE.read(self._serial)
+        return [line.strip() for line in lines]
 
     def read_until_timeout(self) -> None:
-        """Read until timeout; used to clean buffer if in an unknown state."""
+        """Read until idle; used to clean buffer if in an unknown state."""
         with self._lock:
             self._serial.flushInput()
-            while self._serial.readline():
-                continue
+            microscope._serial.read_until_idle(self._serial, _IDLE_TIMEOUT)
 
     def wait_until_idle(self) -> None:
         """Keep sending the ``STATUS`` comand until it responds ``0\\r``"""
@@ -185,7 +203,10 @@ class _LudlController:
                 # wait for move to stop
                 while self.get_command(b"STATUS") != expected:
                     time.sleep(0.01)
-            return answer
+        # Outside the lock, since reading the positions takes the
+        # cache lock before the connection lock.
+        self._positions_cache.invalidate()
+        return answer
 
     def get_command(self, command: bytes) -> bytes:
         """Send get command and return the answer."""
@@ -220,11 +241,44 @@ class _LudlController:
             bytes("MOVE {0}={1}".format(axisname, str(pos)), "ascii")
         )
 
+    def start_move_command(self, command: bytes) -> None:
+        """Send a move command without waiting for the move to finish."""
+        answer = self.get_command(command)
+        self._positions_cache.invalidate()
+        if answer.strip()[0:2] != b":A":
+            raise microscope.DeviceError(
+                "failed to start move with %s: %s" % (command, answer)
+            )
+
+    def start_move_by_relative_position(self, axis: int, delta: float) -> None:
+        """Start a relative move of an axis and return immediately."""
+        axisname = AXIS_MAPPER[axis]
+        self.start_move_command(
+            bytes("MOVREL {0}={1}".format(axisname, str(delta)), "ascii")
+        )
+
+    def start_move_to_absolute_position(self, axis: int, pos: float) -> None:
+        """Start an absolute move of an axis and return immediately."""
+        axisname = AXIS_MAPPER[axis]
+        self.start_move_command(
+            bytes("MOVE {0}={1}".format(axisname, str(pos)), "ascii")
+        )
+
+    def is_moving(self) -> bool:
+        """Whether any axis is moving, from the ``STATUS`` command."""
+        return self.get_command(b"STATUS").strip() == b"B"
+
+    def halt(self) -> None:
+        """Stop all axes with the ``HALT`` command."""
+        self.get_command(b"HALT")
+        self._positions_cache.invalidate()
+
     def move_to_limit(self, axis: bytes, speed: int):
         axisname = AXIS_MAPPER[axis]
         self.get_command(
             bytes("SPIN {0}={1}".format(axisname, speed), "ascii")
         )
+        self._positions_cache.invalidate()
 
     def motor_moving(self, axis: bytes) -> int:
         axisname = AXIS_MAPPER[axis]
@@ -241,10 +295,12 @@ class _LudlController:
     def wait_for_motor_stop(self, axis: bytes):
         while self.motor_moving(axis):
             time.sleep(0.1)
+        self._positions_cache.invalidate()
 
     def reset_position(self, axis: bytes):
         axisname = AXIS_MAPPER[axis]
         self.get_command(bytes("HERE {0}=0".format(axisname), "ascii"))
+        self._positions_cache.invalidate()
 
     def get_absolute_position(self, axis: bytes) -> float:
         axisname = AXIS_MAPPER[axis]
@@ -260,6 +316,30 @@ class _LudlController:
         else:
             return float(position.strip()[2:])
 
+    def get_absolute_positions(self, axes: Sequence[int]) -> List[float]:
+        """Current position of multiple axes with a single command."""
+        axisnames = " ".join(AXIS_MAPPER[axis] for axis in axes)
+        reply = self.get_command(bytes("WHERE {0}".format(axisnames), "ascii"))
+        values = reply.strip().split()
+        if not values or values[0] != b":A":
+            raise microscope.DeviceError(
+                "failed to read positions: {0}".format(reply)
+            )
+        return [float(v) for v in values[1:]]
+
+    def get_all_positions(self) -> Dict[int, float]:
+        """Current position of all axes.
+
+        Calls within a few milliseconds of each other share the same
+        reading.
+        """
+        return dict(
+            zip(
+                range(1, self.get_number_axes() + 1),
+                self._positions_cache.get(),
+            )
+        )
+
     def set_command(self, command: bytes) -> None:
         """Send a set command and check return value."""
         # Property type commands that set certain status respond with
@@ -300,12 +380,26 @@ class _LudlStageAxis(microscope.abc.StageAxis):
     def move_to(self, pos: float) -> None:
         self._dev_conn.move_to_absolute_position(self._axis, int(pos))
 
+    def _start_move(self) -> microscope.abc.StageMove:
+        # There is no command to stop a single axis, HALT stops them
+        # all.
+        return microscope.abc.StageMove(
+            self,
+            lambda: bool(self._dev_conn.motor_moving(self._axis)),
+            self._dev_conn.halt,
+        )
+
+    def move_by_async(self, delta: float) -> microscope.abc.StageMove:
+        self._dev_conn.start_move_by_relative_position(self._axis, int(delta))
+        return self._start_move()
+
+    def move_to_async(self, pos: float) -> microscope.abc.StageMove:
+        self._dev_conn.start_move_to_absolute_position(self._axis, int(pos))
+        return self._start_move()
+
     @property
     def position(self) -> float:
-        if self._dev_conn.is_busy():
-            _logger.warning("querying stage axis position but device is busy")
-            self._dev_conn.wait_until_idle()
-        return float(self._dev_conn.get_absolute_position(self._axis))
+        return self._dev_conn.get_all_positions()[self._axis]
 
     @property
     def limits(self) -> microscope.AxisLimits:
@@ -373,6 +467,11 @@ class _LudlStage(microscope.abc.Stage):
     def axes(self) -> Mapping[str, microscope.abc.StageAxis]:
         return self._axes
 
+    @property
+    def position(self) -> Mapping[str, float]:
+        positions = self._dev_conn.get_all_positions()
+        return {name: positions[int(name)] for name in self._axes}
+
     def move_by(self, delta: Mapping[str, float]) -> None:
         """Move specified axes by the specified distance."""
         for axis_name, axis_delta in delta.items():
@@ -392,6 +491,30 @@ class _LudlStage(microscope.abc.Stage):
             )
         self._dev_conn.wait_until_idle()
 
+    def move_by_async(
+        self, delta: Mapping[str, float]
+    ) -> microscope.abc.StageMove:
+        for axis_name, axis_delta in delta.items():
+            self._dev_conn.start_move_by_relative_position(
+                int(axis_name),
+                int(axis_delta),
+            )
+        return microscope.abc.StageMove(
+            self, self._dev_conn.is_moving, self._dev_conn.halt
+        )
+
+    def move_to_async(
+        self, position: Mapping[str, float]
+    ) -> microscope.abc.StageMove:
+        for axis_name, axis_position in position.items():
+            self._dev_conn.start_move_to_absolute_position(
+                int(axis_name),
+                int(axis_position),
+            )
+        return microscope.abc.StageMove(
+            self, self._dev_conn.is_moving, self._dev_conn.halt
+        )
+
 
 #    def assert_filterwheel_number(self, number: int) -> None:
 #        assert number > 0 and number < 4
@@ -454,6 +577,7 @@ class LudlMC2000(microscope.abc.Controller):
     ) -> None:
         super().__init__(**kwargs)
         self._conn = _LudlController(port, baudrate, timeout)
+        self._serial_stats = self._conn._serial.stats
         self._devices: Mapping[str, microscope.abc.Device] = {}
         self._devices["stage"] = _LudlStage(self._conn)
 
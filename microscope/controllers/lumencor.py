@@ -34,6 +34,7 @@ from typing import List, Mapping, Tuple
 import serial
 
 import microscope
+import microscope._serial
 import microscope._utils
 import microscope.abc
 
@@ -185,7 +186,11 @@ class SpectraIIILightEngine(microscope.abc.Controller):
             rtscts=False,
             dsrdtr=False,
         )
-        shared_serial = microscope._utils.SharedSerial(serial_conn)
+        instrumented_serial = microscope._serial.InstrumentedSerial(
+            serial_conn
+        )
+        self._serial_stats = instrumented_serial.stats
+        shared_serial = microscope._utils.SharedSerial(instrumented_serial)
         connection = _SpectraIIIConnection(shared_serial)
 
         for index, name in connection.get_channel_map():
@@ -26,8 +26,13 @@ from typing import Mapping
 
 import serial
 
+import microscope._serial
 import microscope.abc
 
+# Time, in seconds, without new data after which the input is
+# considered clear.  Much shorter than the serial timeout.
+_IDLE_TIMEOUT = 0.05
+
 
 class _ProScanIIIConnection:
     """Connection to a Prior ProScanIII and wrapper to its commands.
@@ -47,16 +52,18 @@ class _ProScanIIIConnection:
         # From the technical datasheet: 8 bit word 1 stop bit, no
         # parity no handshake, baudrate options of 9600, 19200, 38400,
         # 57600 and 115200.
-        self._serial = serial.Serial(
-            port=port,
-            baudrate=baudrate,
-            timeout=timeout,
-            bytesize=serial.EIGHTBITS,
-            stopbits=serial.STOPBITS_ONE,
-            parity=serial.PARITY_NONE,
-            xonxoff=False,
-            rtscts=False,
-            dsrdtr=False,
+        self._serial = microscope._serial.InstrumentedSerial(
+            serial.Serial(
+                port=port,
+                baudrate=baudrate,
+                timeout=timeout,
+                bytesize=serial.EIGHTBITS,
+                stopbits=serial.STOPBITS_ONE,
+                parity=serial.PARITY_NONE,
+                xonxoff=False,
+                rtscts=False,
+                dsrdtr=False,
+            )
         )
         self._lock = threading.RLock()
 
@@ -88,11 +95,10 @@ class _ProScanIIIConnection:
             return self._serial.read_until(b"\r")
 
     def read_until_timeout(self) -> None:
-        """Read until timeout; used to clean buffer if in an unknown state."""
+        """Read until idle; used to clean buffer if in an unknown state."""
         with self._lock:
             self._serial.flushInput()
-            while self._serial.readline():
-                continue
+            microscope._serial.read_until_idle(self._serial, _IDLE_TIMEOUT)
 
     def _command_and_validate(self, command: bytes, expected: bytes) -> None:
         """Send command and raise exception if answer is unexpected"""
@@ -213,6 +219,7 @@ class ProScanIII(microscope.abc.Controller):
     ) -> None:
         super().__init__(**kwargs)
         self._conn = _ProScanIIIConnection(port, baudrate, timeout)
+        self._serial_stats = self._conn._serial.stats
         self._devices: Mapping[str, microscope.abc.Device] = {}
 
         # Can have up to three filter wheels, numbered 1 to 3.
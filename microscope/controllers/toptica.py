@@ -23,6 +23,7 @@ from typing import Dict, List
 import serial
 
 import microscope
+import microscope._serial
 import microscope._utils
 import microscope.abc
 
@@ -273,7 +274,11 @@ class iChromeMLE(microscope.abc.Controller):
             rtscts=False,
             dsrdtr=False,
         )
-        shared_serial = microscope._utils.SharedSerial(serial_conn)
+        instrumented_serial = microscope._serial.InstrumentedSerial(
+            serial_conn
+        )
+        self._serial_stats = instrumented_serial.stats
+        shared_serial = microscope._utils.SharedSerial(instrumented_serial)
         ichrome_connection = _iChromeConnection(shared_serial)
 
         _LOGGER.info("Connected to %s", ichrome_connection.get_serial_number())
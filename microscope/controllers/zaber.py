@@ -39,15 +39,20 @@ protocol.
 
 """
 
+import collections
+import concurrent.futures
 import enum
+import itertools
 import logging
+import math
 import threading
 import time
-from typing import Dict, List, Mapping
+from typing import Dict, List, Mapping, Optional, Tuple
 
 import serial
 
 import microscope
+import microscope._serial
 import microscope._utils
 import microscope.abc
 
@@ -56,6 +61,66 @@ _logger = logging.getLogger(__name__)
 _AT_CODE = ord(b"@")
 _SPACE_CODE = ord(b" ")
 
+# Interval, in seconds, between polls of a busy device.  Polling
+# starts at the minimum interval, so that short moves are detected
+# soon after they finish, and doubles up to the maximum, to reduce
+# the traffic on the daisy chain during long moves.
+_MIN_POLL_INTERVAL = 0.002
+_MAX_POLL_INTERVAL = 0.1
+
+# The Zaber maxspeed and accel settings are in device units: speed is
+# microsteps per second times 1.6384 and acceleration is microsteps
+# per second squared times 1.6384 / 10.
+_SPEED_UNIT = 1.6384
+_ACCEL_UNIT = 1.6384 / 10.0
+
+
+# Commands are tagged with a message ID, which the device includes in
+# its reply, so that a reply that arrives after its command timed out
+# is not taken as the reply to the next command.  Zaber devices accept
+# message IDs from 0 to 99.
+_N_MESSAGE_IDS = 100
+
+
+def _reply_key(line: bytes) -> bytes:
+    """Device address, axis number, and message ID of a reply.
+
+    For example, ``b"01 1 42"`` for ``b"@01 1 42 OK IDLE -- 0\\r\\n"``.
+    """
+    return b" ".join(line[1:].split(b" ", 3)[:3])
+
+
+def _strip_message_id(line: bytes) -> bytes:
+    """Reply without its message ID, as parsed by `_ZaberReply`."""
+    end = line.index(b" ", 6)
+    return line[:6] + line[end + 1 :]
+
+
+def _command_name(data: bytes) -> str:
+    """Command without device address, axis, message ID, and numbers.
+
+    For example, ``"move abs"`` for ``b"/01 1 42 move abs 1000\\n"``.
+    """
+    words = []
+    for word in data.split()[3:]:
+        if word.lstrip(b"-").isdigit():
+            break
+        words.append(word.decode("ascii", errors="replace"))
+    return " ".join(words)
+
+
+def _travel_time(distance: float, speed: float, accel: float) -> float:
+    """Time to move a distance with a trapezoidal velocity profile."""
+    if distance <= 0.0 or speed <= 0.0:
+        return 0.0
+    if accel <= 0.0:
+        return distance / speed
+    if distance >= speed**2 / accel:
+        return distance / speed + speed / accel
+    else:
+        # Never reaches maximum speed.
+        return 2.0 * math.sqrt(distance / accel)
+
 
 class _ZaberReply:
     """Wraps a Zaber reply to easily index its multiple fields."""
@@ -109,13 +174,13 @@ class _ZaberReply:
 
 
 class _ZaberConnection:
-    """Wraps a serial connection with a reentrant lock.
+    """Serial connection shared by all devices on a daisy chain.
 
-    This class is just the wrap to :class:`serial.Serial`.  The class
-    exposing the Zaber commands interface is
+    Replies are read on a separate thread and matched to the
+    commands by device address, axis, and message ID, so that
+    commands to different devices, or different axes, do not wait for
+    each other.  The class exposing the Zaber commands interface is
     :class:`_ZaberDeviceConnection`.
-
-    .. todo: replace with microscope._utils.SharedSerial
     """
 
     def __init__(self, port: str, baudrate: int, timeout: float) -> None:
@@ -130,29 +195,94 @@ class _ZaberConnection:
             rtscts=False,
             dsrdtr=False,
         )
-        self._lock = threading.RLock()
-        with self._lock:
-            # The command / does nothing other than getting a response
-            # from all devices in the chain.  This seems to be the
-            # most innocent command we can use.
-            self._serial.write(b"/\n")
-            lines = self._serial.readlines()
+        self._message_ids = itertools.cycle(range(_N_MESSAGE_IDS))
+        self._message_ids_lock = threading.Lock()
+        # Count of alert messages received from each device address.
+        self._alert_counts: Dict[bytes, int] = collections.Counter()
+        self._alert_condition = threading.Condition()
+        # The command / does nothing other than getting a response
+        # from all devices in the chain.  This seems to be the most
+        # innocent command we can use.
+        self._serial.write(b"/\n")
+        lines = self._serial.readlines()
         if not all([l.startswith(b"@") for l in lines]):
             raise RuntimeError(
                 "'%s' does not respond like a Zaber device" % port
             )
+        # From now on the serial timeout only sets how long the
+        # reader thread takes to notice that the connection closed.
+        self._serial.timeout = min(timeout, 0.05)
+        self._engine = microscope._serial.SerialEngine(
+            self._serial,
+            terminator=b"\r\n",
+            reply_key=_reply_key,
+            unsolicited=self._handle_unsolicited,
+            timeout=timeout,
+            command_name=_command_name,
+        )
 
     @property
-    def lock(self) -> threading.RLock:
-        return self._lock
+    def stats(self) -> microscope._serial.SerialStats:
+        return self._engine.stats
+
+    def submit(
+        self, address: bytes, axis: int, command: bytes
+    ) -> concurrent.futures.Future:
+        """Send a command and return a future for its reply line.
+
+        The reply line includes the message ID, see
+        :func:`_strip_message_id`.
+        """
+        with self._message_ids_lock:
+            message_id = next(self._message_ids)
+        return self._engine.submit(
+            b"/%s %1d %d %s\n" % (address, axis, message_id, command),
+            key=b"%s %1d %d" % (address, axis, message_id),
+        )
+
+    def close(self) -> None:
+        self._engine.close()
+        self._serial.close()
+
+    def _handle_unsolicited(self, line: bytes) -> bool:
+        if line.startswith(b"!"):
+            # Alerts are sent by the devices, without a command, when
+            # an axis becomes idle.  They look like "!01 1 IDLE --".
+            _logger.debug("received alert %s", line)
+            with self._alert_condition:
+                self._alert_counts[line[1:3]] += 1
+                self._alert_condition.notify_all()
+            return True
+        elif line.startswith(b"#"):
+            # Info messages, such as the extra lines of a reply.
+            _logger.debug("received info message %s", line)
+            return True
+        else:
+            return False
+
+    def alert_count(self, address: bytes) -> int:
+        """Number of alerts received so far from a device."""
+        with self._alert_condition:
+            return self._alert_counts[address]
+
+    def wait_for_alert(
+        self, address: bytes, count: int, timeout: float
+    ) -> bool:
+        """Wait for a device to send an alert.
 
-    def write(self, data: bytes) -> int:
-        with self.lock:
-            return self._serial.write(data)
+        Args:
+            address: the address of the device, as in the replies.
+            count: the value of :meth:`alert_count` before waiting.
+                Returns as soon as more alerts have been received.
+            timeout: maximum time, in seconds, to wait.
 
-    def readline(self, size: int = -1) -> bytes:
-        with self.lock:
-            return self._serial.readline(size)
+        Returns:
+            `False` if no alert was received in time.
+        """
+        with self._alert_condition:
+            return self._alert_condition.wait_for(
+                lambda: self._alert_counts[address] > count, timeout
+            )
 
 
 class _ZaberDeviceConnection:
@@ -172,6 +302,24 @@ class _ZaberDeviceConnection:
     def __init__(self, conn: _ZaberConnection, device_address: int) -> None:
         self._conn = conn
         self._address_bytes = b"%02d" % device_address
+        # Whether the device sends alerts when axes become idle.
+        # `None` until we try to enable them on the first move or
+        # wait.
+        self._alerts: Optional[bool] = None
+        # Value of comm.alert before we enabled alerts, to restore it
+        # on shutdown.
+        self._previous_alert: Optional[bytes] = None
+        # Expected time, on the monotonic clock, when the moves
+        # started since the last wait will be finished.
+        self._expected_idle = 0.0
+        # Map of axis to its speed and acceleration, in microsteps.
+        self._motion_settings: Dict[int, Tuple[float, float]] = {}
+        # The position of all axes is read with a single command and
+        # reused for a few milliseconds, so that multiple clients
+        # polling the position share the same request.
+        self._positions_cache = microscope._utils.ExpiringCache(
+            self._read_absolute_positions, max_age=0.005
+        )
 
     def _validate_reply(self, reply: _ZaberReply) -> None:
         if reply.address != self._address_bytes:
@@ -194,34 +342,143 @@ class _ZaberDeviceConnection:
             axis: the axis number to send the command.  If zero, the
                 command is executed by all axis in the device.
         """
+        return self.command_async(command, axis).result()
+
+    def command_async(
+        self, command: bytes, axis: int = 0
+    ) -> concurrent.futures.Future:
+        """Send command and return a future for its reply.
+
+        The reply is validated before setting the future result, see
+        :meth:`command`.
+        """
         # We do not need to check whether axis number is valid because
         # the device will reject the command with BADAXIS if so.
-        with self._conn.lock:
-            self._conn.write(
-                b"/%s %1d %s\n" % (self._address_bytes, axis, command)
+        if command.startswith((b"move ", b"home", b"stop")):
+            # Do not reuse a position read before the move started.
+            # The position is invalidated again once the device
+            # replies, since it may have been read in the meantime.
+            self._positions_cache.invalidate()
+        if command.startswith((b"set maxspeed ", b"set accel ")):
+            if axis == 0:
+                self._motion_settings.clear()
+            else:
+                self._motion_settings.pop(axis, None)
+        line_future = self._conn.submit(self._address_bytes, axis, command)
+        reply_future: concurrent.futures.Future = concurrent.futures.Future()
+
+        def parse_reply(future: concurrent.futures.Future) -> None:
+            try:
+                reply = _ZaberReply(_strip_message_id(future.result()))
+                self._validate_reply(reply)
+            except Exception as ex:
+                reply_future.set_exception(ex)
+            else:
+                reply_future.set_result(reply)
+
+        line_future.add_done_callback(parse_reply)
+        return reply_future
+
+    def is_busy(self, axis: int = 0) -> bool:
+        """True if the axis, or any axis if zero, is busy."""
+        return self.command(b"", axis).status == b"BUSY"
+
+    def stop(self, axis: int = 0) -> None:
+        """Decelerate the axis, or all axes if zero, to a stop."""
+        self.command(b"stop", axis)
+        self._positions_cache.invalidate()
+
+    def enable_alerts(self) -> bool:
+        """Make the device send an alert when an axis becomes idle.
+
+        The previous setting is restored by :meth:`restore_alerts`.
+
+        Returns:
+            `False` if the device does not support alerts.
+        """
+        try:
+            previous = self.command(b"get comm.alert").response
+            if previous != b"1":
+                self.command(b"set comm.alert 1")
+        except RuntimeError:
+            _logger.info(
+                "device %s does not support alerts, polling instead",
+                self._address_bytes.decode(),
+            )
+            return False
+        self._previous_alert = previous
+        return True
+
+    def restore_alerts(self) -> None:
+        """Restore the alerts setting from before :meth:`enable_alerts`."""
+        previous = self._previous_alert
+        self._previous_alert = None
+        self._alerts = None
+        if previous is not None and previous != b"1":
+            self.command(b"set comm.alert %s" % previous)
+
+    def _use_alerts(self) -> bool:
+        """Whether to wait for alerts, enabling them if not yet tried."""
+        if self._alerts is None:
+            self._alerts = self.enable_alerts()
+        return self._alerts
+
+    def _get_motion_settings(self, axis: int) -> Tuple[float, float]:
+        if axis not in self._motion_settings:
+            speed = int(self.command(b"get maxspeed", axis).response)
+            accel = int(self.command(b"get accel", axis).response)
+            self._motion_settings[axis] = (
+                speed / _SPEED_UNIT,
+                accel / _ACCEL_UNIT,
             )
-            data = self._conn.readline()
-        reply = _ZaberReply(data)
-        self._validate_reply(reply)
-        return reply
+        return self._motion_settings[axis]
 
-    def is_busy(self) -> bool:
-        return self.command(b"").status == b"BUSY"
+    def _expect_move(self, axis: int, distance: float) -> None:
+        """Update the expected end of moves for a move that started."""
+        speed, accel = self._get_motion_settings(axis)
+        end = time.monotonic() + _travel_time(abs(distance), speed, accel)
+        self._expected_idle = max(self._expected_idle, end)
 
     def wait_until_idle(self, timeout: float = 10.0) -> None:
         """Wait, or error, until device is idle.
 
         A device is busy if *any* of its axis is busy.
+
+        If the device supports alerts, wait for the alert that an
+        axis is idle.  Otherwise, wait for the time that the moves
+        are expected to take, from their distance and the axes speed
+        and acceleration, and then poll the device with an interval
+        that starts short and doubles up to 100 milliseconds.
         """
-        sleep_interval = 0.1
-        for _ in range(int(timeout / sleep_interval)):
+        deadline = time.monotonic() + timeout
+        alerts = self._use_alerts()
+        expected_idle = self._expected_idle
+        self._expected_idle = 0.0
+        poll_interval = _MIN_POLL_INTERVAL
+        while True:
+            alert_count = self._conn.alert_count(self._address_bytes)
             if not self.is_busy():
                 break
-            time.sleep(sleep_interval)
-        else:
-            raise microscope.DeviceError(
-                "device still busy after %f seconds" % timeout
-            )
+            now = time.monotonic()
+            if now >= deadline:
+                raise microscope.DeviceError(
+                    "device still busy after %f seconds" % timeout
+                )
+            if alerts:
+                # There is one alert per axis so check again after
+                # each alert.  We still poll, with the longest
+                # interval, in case an alert is lost.
+                self._conn.wait_for_alert(
+                    self._address_bytes,
+                    alert_count,
+                    min(deadline - now, _MAX_POLL_INTERVAL),
+                )
+            elif now < expected_idle:
+                time.sleep(min(expected_idle, deadline) - now)
+            else:
+                time.sleep(min(poll_interval, deadline - now))
+                poll_interval = min(2 * poll_interval, _MAX_POLL_INTERVAL)
+        self._positions_cache.invalidate()
 
     def get_number_axes(self) -> int:
         """Reports the number of axes in the device."""
@@ -235,6 +492,7 @@ class _ZaberDeviceConnection:
     def home(self, axis: int = 0) -> None:
         """Move the axis to the home position."""
         self.command(b"home", axis)
+        self._positions_cache.invalidate()
 
     def get_rotation_length(self, axis: int) -> int:
         """Number of microsteps needed to complete one full rotation.
@@ -254,17 +512,51 @@ class _ZaberDeviceConnection:
 
     def move_to_index(self, axis: int, index: int) -> None:
         self.command(b"move index %d" % index, axis)
+        self._positions_cache.invalidate()
 
     def move_to_absolute_position(self, axis: int, position: int) -> None:
-        self.command(b"move abs %d" % position, axis)
+        if self._use_alerts():
+            self.command(b"move abs %d" % position, axis)
+            self._positions_cache.invalidate()
+        else:
+            # Without alerts, the distance sets how long to wait
+            # before polling.
+            start = self.get_absolute_positions()[axis - 1]
+            self.command(b"move abs %d" % position, axis)
+            self._positions_cache.invalidate()
+            self._expect_move(axis, position - start)
 
     def move_by_relative_position(self, axis: int, position: int) -> None:
         self.command(b"move rel %d" % position, axis)
+        self._positions_cache.invalidate()
+        if not self._use_alerts():
+            self._expect_move(axis, position)
 
     def get_absolute_position(self, axis: int) -> int:
         """Current absolute position of an axis, in microsteps."""
         return int(self.command(b"get pos", axis).response)
 
+    def _read_absolute_positions(self) -> List[int]:
+        return [int(x) for x in self.command(b"get pos").response.split()]
+
+    def get_absolute_positions(self) -> List[int]:
+        """Current absolute position of all axes, in microsteps.
+
+        All axes are read with a single command.  Calls within a few
+        milliseconds of each other share the same reading.
+        """
+        return list(self._positions_cache.get())
+
+    def get_limits_max(self) -> List[int]:
+        """The maximum position of all axes, in microsteps."""
+        reply = self.command(b"get limit.max")
+        return [int(x) for x in reply.response.split()]
+
+    def get_limits_min(self) -> List[int]:
+        """The minimum position of all axes, in microsteps."""
+        reply = self.command(b"get limit.min")
+        return [int(x) for x in reply.response.split()]
+
     def get_limit_max(self, axis: int) -> int:
         """The maximum position the device can move to, in microsteps."""
         return int(self.command(b"get limit.max", axis).response)
@@ -309,12 +601,25 @@ class _ZaberStageAxis(microscope.abc.StageAxis):
         self._dev_conn.move_to_absolute_position(self._axis, int(pos))
         self._dev_conn.wait_until_idle()
 
+    def _start_move(self) -> microscope.abc.StageMove:
+        return microscope.abc.StageMove(
+            self,
+            lambda: self._dev_conn.is_busy(self._axis),
+            lambda: self._dev_conn.stop(self._axis),
+        )
+
+    def move_by_async(self, delta: float) -> microscope.abc.StageMove:
+        self._dev_conn.move_by_relative_position(self._axis, int(delta))
+        return self._start_move()
+
+    def move_to_async(self, pos: float) -> microscope.abc.StageMove:
+        self._dev_conn.move_to_absolute_position(self._axis, int(pos))
+        return self._start_move()
+
     @property
     def position(self) -> float:
-        if self._dev_conn.is_busy():
-            _logger.warning("querying stage axis position but device is busy")
-            self._dev_conn.wait_until_idle()
-        return float(self._dev_conn.get_absolute_position(self._axis))
+        positions = self._dev_conn.get_absolute_positions()
+        return float(positions[self._axis - 1])
 
     @property
     def limits(self) -> microscope.AxisLimits:
@@ -335,7 +640,7 @@ class _ZaberStage(microscope.abc.Stage):
         }
 
     def _do_shutdown(self) -> None:
-        pass
+        self._dev_conn.restore_alerts()
 
     def _do_enable(self) -> bool:
         # Before a device can moved, it first needs to establish a
@@ -352,6 +657,22 @@ class _ZaberStage(microscope.abc.Stage):
     def axes(self) -> Mapping[str, microscope.abc.StageAxis]:
         return self._axes
 
+    @property
+    def position(self) -> Mapping[str, float]:
+        positions = self._dev_conn.get_absolute_positions()
+        return {name: float(positions[int(name) - 1]) for name in self._axes}
+
+    @property
+    def limits(self) -> Mapping[str, microscope.AxisLimits]:
+        lower = self._dev_conn.get_limits_min()
+        upper = self._dev_conn.get_limits_max()
+        return {
+            name: microscope.AxisLimits(
+                lower=lower[int(name) - 1], upper=upper[int(name) - 1]
+            )
+            for name in self._axes
+        }
+
     def move_by(self, delta: Mapping[str, float]) -> None:
         """Move specified axes by the specified distance."""
         for axis_name, axis_delta in delta.items():
@@ -370,6 +691,30 @@ class _ZaberStage(microscope.abc.Stage):
             )
         self._dev_conn.wait_until_idle()
 
+    def move_by_async(
+        self, delta: Mapping[str, float]
+    ) -> microscope.abc.StageMove:
+        for axis_name, axis_delta in delta.items():
+            self._dev_conn.move_by_relative_position(
+                int(axis_name),
+                int(axis_delta),
+            )
+        return microscope.abc.StageMove(
+            self, self._dev_conn.is_busy, self._dev_conn.stop
+        )
+
+    def move_to_async(
+        self, position: Mapping[str, float]
+    ) -> microscope.abc.StageMove:
+        for axis_name, axis_position in position.items():
+            self._dev_conn.move_to_absolute_position(
+                int(axis_name),
+                int(axis_position),
+            )
+        return microscope.abc.StageMove(
+            self, self._dev_conn.is_busy, self._dev_conn.stop
+        )
+
 
 class _ZaberFilterWheel(microscope.abc.FilterWheel):
     """Zaber filter wheels and filter cube turrets."""
@@ -402,7 +747,7 @@ class _ZaberFilterWheel(microscope.abc.FilterWheel):
             self._dev_conn.home()
 
     def _do_shutdown(self) -> None:
-        pass
+        self._dev_conn.restore_alerts()
 
     def _do_get_position(self) -> int:
         if self._dev_conn.is_busy():
@@ -592,6 +937,7 @@ class ZaberDaisyChain(microscope.abc.Controller):
     ) -> None:
         super().__init__(**kwargs)
         self._conn = _ZaberConnection(port, baudrate=115200, timeout=0.5)
+        self._serial_stats = self._conn.stats
         self._devices: Dict[str, microscope.abc.Device] = {}
 
         for address, device_type in address2type.items():
@@ -603,3 +949,7 @@ class ZaberDaisyChain(microscope.abc.Controller):
     @property
     def devices(self) -> Dict[str, microscope.abc.Device]:
         return self._devices
+
+    def _do_shutdown(self) -> None:
+        super()._do_shutdown()
+        self._conn.close()
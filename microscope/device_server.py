@@ -36,22 +36,40 @@ where ``CONFIG-FILEPATH`` is the path for a python file that defines a
 
 import argparse
 import copy
+import functools
 import importlib.machinery
 import importlib.util
+import inspect
+import json
 import logging
 import multiprocessing
 import os.path
 import signal
 import sys
+import threading
 import time
 from collections.abc import Iterable
 from dataclasses import dataclass
 from logging import FileHandler, StreamHandler
 from threading import Thread
-from typing import Any, Callable, Dict, Mapping, Optional, Sequence
-
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import numpy as np
 import Pyro4
 
+import microscope._logging
+import microscope._metrics
+import microscope._utils
 import microscope.abc
 from microscope.abc import FloatingDeviceMixin
 
@@ -77,12 +95,68 @@ Pyro4.config.SERIALIZER = "pickle"
 Pyro4.config.REQUIRE_EXPOSE = False
 
 
+# Exit code of a DeviceServer whose device definition is invalid, such
+# as a class name that can't be imported.  The DeviceServer is not
+# restarted since it would fail again (EX_CONFIG from sysexits.h).
+_INVALID_DEVICE_DEF_EXITCODE = 78
+
+
+def _check_uid(cls: Callable, uid: Optional[str]) -> None:
+    """Check that `uid` is given for, and only for, floating devices."""
+    if isinstance(cls, type):
+        if issubclass(cls, FloatingDeviceMixin) and uid is None:
+            raise TypeError("uid must be specified for floating devices")
+        elif not issubclass(cls, FloatingDeviceMixin) and uid is not None:
+            raise TypeError("uid must not be given for non floating devices")
+
+
+def _import_cls(cls: Union[Callable, str]) -> Callable:
+    """Import the device class from a dotted path, if it is a string."""
+    if not isinstance(cls, str):
+        return cls
+    module_name, _, attr_name = cls.rpartition(".")
+    module = importlib.import_module(module_name)
+    try:
+        return getattr(module, attr_name)
+    except AttributeError:
+        raise ImportError(
+            "module '%s' has no attribute '%s'" % (module_name, attr_name)
+        )
+
+
+def _cls_key(cls: Union[Callable, str]) -> Union[Callable, str]:
+    """Key to identify the device class of a device definition.
+
+    A class given by name is resolved to the class object if its
+    module has already been imported, so that the same class given
+    by name or object has the same key.  Modules are not imported,
+    those are only imported by the DeviceServer.
+    """
+    if isinstance(cls, str):
+        module_name, _, attr_name = cls.rpartition(".")
+        if module_name in sys.modules:
+            return getattr(sys.modules[module_name], attr_name, cls)
+    return cls
+
+
+def _is_floating_device_def(device_def) -> bool:
+    cls = device_def["cls"]
+    if isinstance(cls, str):
+        # We don't want to import the class, but device() only
+        # accepts a uid for floating devices.
+        return device_def["uid"] is not None
+    else:
+        return isinstance(cls, type) and issubclass(cls, FloatingDeviceMixin)
+
+
 def device(
-    cls: Callable,
+    cls: Union[Callable, str],
     host: str,
     port: int,
     conf: Optional[Mapping[str, Any]] = None,
     uid: Optional[str] = None,
+    metrics_port: Optional[int] = None,
+    daemon_options: Optional[Mapping[str, Any]] = None,
 ):
     """Define devices and where to serve them.
 
@@ -92,7 +166,12 @@ def device(
         cls: :class:`Device` class of device to serve or function that
             returns a map of `Device` instances to wanted Pyro ID.
             The device class will be constructed, or the function will
-            be called, with the arguments in ``conf``.
+            be called, with the arguments in ``conf``.  It can also be
+            the full dotted name of the class or function, such as
+            ``"microscope.cameras.pvcam.PVCamera"``, in which case it
+            is only imported by the process that serves the device.
+            If it can't be imported, the device is not served and
+            that process is not restarted.
         host: hostname or ip address serving the devices.
         port: port number used to serve the devices.
         conf: keyword arguments for ``cls``.  The device or function
@@ -100,6 +179,13 @@ def device(
         uid: used to identify "floating" devices (see documentation
             for :class:`FloatingDeviceMixin`).  This must be specified
             if ``cls`` is a floating device.
+        metrics_port: port number to serve, on ``host``, metrics about
+            the device server in the Prometheus text format.  If
+            `None` (default), the metrics are not collected.
+        daemon_options: keyword arguments to tune the Pyro daemon
+            serving the device, such as the server type and thread
+            pool size.  See :func:`microscope._utils.create_pyro_daemon`
+            for the available options.
 
     Example
 
@@ -122,14 +208,37 @@ def device(
     if conf is None:
         conf = {}
 
-    if not callable(cls):
+    if isinstance(cls, str):
+        if "." not in cls:
+            raise ValueError(
+                "cls must be the full dotted name, including the module"
+            )
+        # The uid can only be checked once the class is imported by
+        # the DeviceServer.
+    elif not callable(cls):
         raise TypeError("cls must be a callable")
-    elif isinstance(cls, type):
-        if issubclass(cls, FloatingDeviceMixin) and uid is None:
-            raise TypeError("uid must be specified for floating devices")
-        elif not issubclass(cls, FloatingDeviceMixin) and uid is not None:
-            raise TypeError("uid must not be given for non floating devices")
-    return dict(cls=cls, host=host, port=int(port), uid=uid, conf=conf)
+    else:
+        _check_uid(cls, uid)
+    if metrics_port is not None:
+        metrics_port = int(metrics_port)
+
+    if daemon_options is None:
+        daemon_options = {}
+    # Check the options now instead of failing later on the
+    # DeviceServer process.
+    inspect.signature(microscope._utils.create_pyro_daemon).bind(
+        host, port, **daemon_options
+    )
+
+    return dict(
+        cls=cls,
+        host=host,
+        port=int(port),
+        uid=uid,
+        conf=conf,
+        metrics_port=metrics_port,
+        daemon_options=daemon_options,
+    )
 
 
 def _create_log_formatter(name: str):
@@ -200,6 +309,7 @@ class DeviceServerOptions:
     config_fpath: str
     logging_level: int
     logging_dir: str
+    rpc_trace_dir: Optional[str] = None
 
 
 def _check_autoproxy_feature() -> None:
@@ -225,18 +335,420 @@ def _check_autoproxy_feature() -> None:
     return None
 
 
-def _register_device(pyro_daemon, device, obj_id=None) -> None:
-    pyro_daemon.register(device, obj_id)
+@dataclass(frozen=True)
+class _RemoteCall:
+    """Record of a remote call to an instrumented method.
+
+    Attributes:
+        device: name of the device.
+        method: name of the method.
+        start: time since the epoch, in seconds, when the call
+            started.
+        duration: time taken, in seconds, to handle the call.
+        failed: whether the call raised an exception.
+        concurrency: number of remote calls in progress, including
+            this one, when this call started.
+        args: positional arguments of the call.
+        kwargs: keyword arguments of the call.
+        result: the value returned, `None` if the call failed.
+
+    """
+
+    device: str
+    method: str
+    start: float
+    duration: float
+    failed: bool
+    concurrency: int
+    args: Tuple[Any, ...]
+    kwargs: Dict[str, Any]
+    result: Any
+
+
+# Depth of nested calls to instrumented methods on the current
+# thread.  See `_observe_remote_calls`.
+_call_depth = threading.local()
+
+# Number of remote calls to instrumented methods in progress.
+_calls_in_progress = 0
+_calls_in_progress_lock = threading.Lock()
+
+
+def _observe_remote_calls(
+    method: Callable,
+    device_name: str,
+    method_name: str,
+    observers: Sequence[Callable[[_RemoteCall], None]],
+) -> Callable:
+    """Wrap method to observe the calls to it that come from Pyro.
+
+    Only calls made by Pyro, i.e., remote calls, are observed.  Calls
+    made from the device own threads, or that a device makes to its
+    own methods while handling a remote call, are not.
+
+    Args:
+        method: the method to wrap.
+        device_name: name of the device for the call records.
+        method_name: name of the method for the call records.
+        observers: functions called with a `_RemoteCall` after each
+            remote call.
+
+    """
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        global _calls_in_progress
+        if (
+            getattr(_call_depth, "value", 0)
+            or getattr(Pyro4.current_context, "client", None) is None
+        ):
+            return method(*args, **kwargs)
+        _call_depth.value = 1
+        with _calls_in_progress_lock:
+            _calls_in_progress += 1
+            concurrency = _calls_in_progress
+        result = None
+        failed = False
+        start = time.time()
+        start_counter = time.perf_counter()
+        try:
+            result = method(*args, **kwargs)
+            return result
+        except Exception:
+            failed = True
+            raise
+        finally:
+            duration = time.perf_counter() - start_counter
+            _call_depth.value = 0
+            with _calls_in_progress_lock:
+                _calls_in_progress -= 1
+            call = _RemoteCall(
+                device=device_name,
+                method=method_name,
+                start=start,
+                duration=duration,
+                failed=failed,
+                concurrency=concurrency,
+                args=args,
+                kwargs=kwargs,
+                result=result,
+            )
+            for observe in observers:
+                try:
+                    observe(call)
+                except Exception as ex:
+                    _logger.error("failed to observe remote call", exc_info=ex)
+
+    return wrapper
+
+
+def _wrap_remote_methods(
+    obj, wrap: Callable[[str, Callable], Callable]
+) -> None:
+    """Replace the methods Pyro exposes on an object with wrappers.
+
+    Pyro looks up the methods on the instance so we replace them
+    there, leaving the class untouched.
+
+    Args:
+        obj: the object that is, or will be, served by Pyro.
+        wrap: function called with the method name and bound method
+            which returns the wrapped method.
+
+    """
+    exposed = Pyro4.util.get_exposed_members(
+        obj, only_exposed=Pyro4.config.REQUIRE_EXPOSE
+    )
+    for name in exposed["methods"]:
+        setattr(obj, name, wrap(name, getattr(obj, name)))
+
+
+class _DeviceServerMetrics:
+    """Metrics collected on a device server process.
+
+    Args:
+        restart_count: number of times the device server has been
+            restarted.
+
+    """
+
+    def __init__(self, restart_count: int = 0) -> None:
+        self.registry = microscope._metrics.Registry()
+        microscope._metrics.add_process_metrics(self.registry)
+        self.registry.counter(
+            "microscope_device_server_restarts_total",
+            "Number of times the device server was restarted.",
+        ).labels().set(restart_count)
+
+        self._rpc_calls = self.registry.counter(
+            "microscope_rpc_calls_total",
+            "Number of remote calls.",
+            ["device", "method"],
+        )
+        self._rpc_errors = self.registry.counter(
+            "microscope_rpc_errors_total",
+            "Number of remote calls that raised an exception.",
+            ["device", "method"],
+        )
+        self._rpc_duration = self.registry.histogram(
+            "microscope_rpc_duration_seconds",
+            "Time taken to handle remote calls.",
+            ["device", "method"],
+        )
+
+        self._data_acquired = self.registry.counter(
+            "microscope_data_acquired_total",
+            "Number of data, e.g., images, put into the dispatch queue.",
+            ["device"],
+        )
+        self._data_sent = self.registry.counter(
+            "microscope_data_sent_total",
+            "Number of data sent to a client.",
+            ["device"],
+        )
+        self._data_dropped = self.registry.counter(
+            "microscope_data_dropped_total",
+            "Number of data dropped for lack of client or failure to send.",
+            ["device"],
+        )
+        self._dispatch_queue_length = self.registry.gauge(
+            "microscope_dispatch_queue_length",
+            "Number of data waiting to be sent to a client.",
+            ["device"],
+        )
+
+    def observe_call(self, call: _RemoteCall) -> None:
+        self._rpc_calls.labels(call.device, call.method).inc()
+        self._rpc_duration.labels(call.device, call.method).observe(
+            call.duration
+        )
+        if call.failed:
+            self._rpc_errors.labels(call.device, call.method).inc()
+
+    def add_device(self, device, name: str) -> None:
+        """Collect metrics from a device about to be served.
+
+        Args:
+            device: the device.  Not necessarily a `Device` instance,
+                may also be something like a `StageAxis`.
+            name: name for the device on the metrics.
+
+        """
+        if isinstance(device, microscope.abc.DataDevice):
+            self._data_acquired.labels(name).set_function(
+                lambda: device._n_acquired
+            )
+            self._data_sent.labels(name).set_function(lambda: device._n_sent)
+            self._data_dropped.labels(name).set_function(
+                lambda: device._n_dropped
+            )
+            self._dispatch_queue_length.labels(name).set_function(
+                device._dispatch_buffer.qsize
+            )
+
+
+def _payload_size(obj, depth: int = 0) -> int:
+    """Estimate the number of bytes needed to send `obj` over Pyro.
+
+    This is only an estimate of the serialised size, from the size of
+    the data, so that it is cheap to compute even for large images.
+    It does not serialise `obj`.
+    """
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    elif isinstance(obj, (bytes, bytearray, str)):
+        return len(obj)
+    elif isinstance(obj, (bool, int, float, complex)) or obj is None:
+        return 8
+    elif depth > 4:
+        # Do not go through deeply nested structures, the estimate
+        # of their leaves is not worth the time.
+        return 0
+    elif isinstance(obj, dict):
+        return sum(
+            _payload_size(k, depth + 1) + _payload_size(v, depth + 1)
+            for k, v in obj.items()
+        )
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        return sum(_payload_size(x, depth + 1) for x in obj)
+    else:
+        # Other objects, such as a device returned to be autoproxied
+        # by Pyro, or an enum, are small.
+        return 0
+
+
+# Buckets for payload sizes, from 64 bytes to 64 MiB.
+_PAYLOAD_BUCKETS = tuple(2**i for i in range(6, 27, 2))
+
+
+class _RemoteCallTracer:
+    """Trace remote calls for profiling.
+
+    Records the size of the arguments and return value, and the
+    number of concurrent calls, into histograms.  Optionally, write a
+    timeline of all calls to a file in the `Chrome trace event format
+    <https://docs.google.com/document/d/1CvAClvFfyA5R-PhYUmn5OOQtYMH4h6I0nSsKchNAySU>`_
+    that can be opened with ``chrome://tracing`` or `Perfetto
+    <https://ui.perfetto.dev>`_.
+
+    Args:
+        registry: where to add the histograms.
+        trace_fpath: path for the timeline file.  If `None`, no
+            timeline is written.
+
+    """
+
+    def __init__(
+        self,
+        registry: microscope._metrics.Registry,
+        trace_fpath: Optional[str] = None,
+    ) -> None:
+        self._request_bytes = registry.histogram(
+            "microscope_rpc_request_bytes",
+            "Size of the arguments of remote calls.",
+            ["device", "method"],
+            buckets=_PAYLOAD_BUCKETS,
+        )
+        self._response_bytes = registry.histogram(
+            "microscope_rpc_response_bytes",
+            "Size of the value returned by remote calls.",
+            ["device", "method"],
+            buckets=_PAYLOAD_BUCKETS,
+        )
+        self._concurrency = registry.histogram(
+            "microscope_rpc_concurrency",
+            "Number of remote calls in progress when a remote call starts.",
+            ["device", "method"],
+            buckets=(1, 2, 3, 4, 6, 8, 12, 16, 24, 32),
+        )
+
+        self._trace_lock = threading.Lock()
+        self._trace_file = None
+        self._trace_empty = True
+        if trace_fpath is not None:
+            self._trace_file = open(trace_fpath, "w")
+            self._trace_file.write("[\n")
+
+    def observe_call(self, call: _RemoteCall) -> None:
+        request_bytes = _payload_size((call.args, call.kwargs))
+        response_bytes = _payload_size(call.result)
+        self._request_bytes.labels(call.device, call.method).observe(
+            request_bytes
+        )
+        self._response_bytes.labels(call.device, call.method).observe(
+            response_bytes
+        )
+        self._concurrency.labels(call.device, call.method).observe(
+            call.concurrency
+        )
+
+        if self._trace_file is None:
+            return
+        event = {
+            "name": call.method,
+            "cat": call.device,
+            "ph": "X",  # complete event, i.e., with duration
+            "ts": call.start * 1e6,  # microseconds
+            "dur": call.duration * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": {
+                "request_bytes": request_bytes,
+                "response_bytes": response_bytes,
+                "concurrency": call.concurrency,
+                "failed": call.failed,
+            },
+        }
+        with self._trace_lock:
+            if self._trace_file is None:
+                return
+            if not self._trace_empty:
+                self._trace_file.write(",\n")
+            self._trace_file.write(json.dumps(event))
+            self._trace_empty = False
+
+    def close(self) -> None:
+        with self._trace_lock:
+            if self._trace_file is not None:
+                self._trace_file.write("\n]\n")
+                self._trace_file.close()
+                self._trace_file = None
+
+
+def _instrument_device(
+    device,
+    name: str,
+    observers: Sequence[Callable[[_RemoteCall], None]],
+    metrics: Optional[_DeviceServerMetrics] = None,
+) -> None:
+    """Observe the remote calls to a device and collect its metrics.
+
+    Args:
+        device: the device about to be served.
+        name: name of the device for the metrics and call records.
+        observers: functions called with a `_RemoteCall` after each
+            remote call.
+        metrics: if not `None`, collect metrics from the device.
+
+    """
+    if metrics is not None:
+        metrics.add_device(device, name)
+
+    def wrap(method_name: str, method: Callable) -> Callable:
+        return _observe_remote_calls(method, name, method_name, observers)
+
+    _wrap_remote_methods(device, wrap)
+
+
+def _register_device(
+    pyro_daemon,
+    device,
+    obj_id=None,
+    instrument: Optional[Callable[[Any, str], None]] = None,
+    name: Optional[str] = None,
+) -> None:
+    """Register device, and any device it controls, with Pyro daemon.
+
+    Args:
+        pyro_daemon: the daemon to register the device with.
+        device: the device to register.
+        obj_id: the Pyro object ID for the device.  If `None`, Pyro
+            creates one.
+        instrument: an optional function, called with the device and
+            its name, for each device before it is served.
+        name: the name of the device to pass to `instrument`.  If
+            `None`, the Pyro object ID is used.  Controlled devices
+            and stage axes get their name appended to the name of
+            their controller or stage.
+
+    """
+    uri = pyro_daemon.register(device, obj_id)
+    if name is None:
+        name = uri.object
+    if instrument is not None:
+        instrument(device, name)
 
     if isinstance(device, microscope.abc.Controller):
         _check_autoproxy_feature()
-        for sub_device in device.devices.values():
-            _register_device(pyro_daemon, sub_device, obj_id=None)
+        for sub_name, sub_device in device.devices.items():
+            _register_device(
+                pyro_daemon,
+                sub_device,
+                obj_id=None,
+                instrument=instrument,
+                name="%s.%s" % (name, sub_name),
+            )
 
     if isinstance(device, microscope.abc.Stage):
         _check_autoproxy_feature()
-        for axis in device.axes.values():
-            _register_device(pyro_daemon, axis, obj_id=None)
+        for axis_name, axis in device.axes.items():
+            _register_device(
+                pyro_daemon,
+                axis,
+                obj_id=None,
+                instrument=instrument,
+                name="%s.%s" % (name, axis_name),
+            )
 
     return None
 
@@ -252,6 +764,8 @@ class DeviceServer(multiprocessing.Process):
             number.
         exit_event: a shared event to signal that the process should
             quit.
+        restart_count: number of times this device server has been
+            restarted.  Only used for the metrics.
 
     """
 
@@ -262,6 +776,7 @@ class DeviceServer(multiprocessing.Process):
         id_to_host: Mapping[str, str],
         id_to_port: Mapping[str, int],
         exit_event: Optional[multiprocessing.Event] = None,
+        restart_count: int = 0,
     ):
         # The device to serve.
         self._device_def = device_def
@@ -272,13 +787,19 @@ class DeviceServer(multiprocessing.Process):
         self._id_to_port = id_to_port
         # A shared event to allow clean shutdown.
         self.exit_event = exit_event
+        # An event to stop only this device server (see `stop`).
+        self._stop_event = multiprocessing.Event()
+        self._restart_count = restart_count
+        # Set on the DeviceServer process, in `run`.
+        self._queue_logging: Optional[microscope._logging.QueueLogging] = None
         super().__init__()
         self.daemon = True
 
     def clone(self):
         """Create new instance with same settings.
 
-        This is useful to restart a device server.
+        This is useful to restart a device server.  The new instance
+        counts as a restart of this one.
 
         """
         return DeviceServer(
@@ -287,11 +808,39 @@ class DeviceServer(multiprocessing.Process):
             self._id_to_host,
             self._id_to_port,
             exit_event=self.exit_event,
+            restart_count=self._restart_count + 1,
         )
 
+    def stop(self) -> None:
+        """Signal this device server, and only this, to shutdown.
+
+        Unlike setting the shared exit event, the other device servers
+        keep running.  Use :meth:`join` to wait for the device server
+        to have shutdown.
+        """
+        self._stop_event.set()
+
+    def _stop_requested(self) -> bool:
+        return self.exit_event.is_set() or self._stop_event.is_set()
+
     def run(self):
+        # Log records are written on a separate thread (see _run).
+        # Make sure that all of them have been written before the
+        # process exits, specially if it exits because of an error.
+        self._queue_logging = microscope._logging.QueueLogging()
+        try:
+            self._run()
+        finally:
+            self._queue_logging.stop()
+
+    def _run(self):
+        # The class may only be given by name, and it is only imported
+        # once the logging is configured.
         cls = self._device_def["cls"]
-        cls_name = cls.__name__
+        if isinstance(cls, str):
+            cls_name = cls.rpartition(".")[2]
+        else:
+            cls_name = cls.__name__
 
         # If the multiprocessing start method is fork, the child
         # process gets a copy of the root logger.  The copy is
@@ -307,6 +856,12 @@ class DeviceServer(multiprocessing.Process):
 
         root_logger.setLevel(self._options.logging_level)
 
+        # Log records are only queued by the logging calls.  The
+        # actual handlers, which write to stderr and to a file, are
+        # called on a separate thread so that logging does not block
+        # the device threads on IO.
+        root_logger.addHandler(self._queue_logging.handler)
+
         # Later, we'll log to one file per server, with a filename
         # based on a unique identifier for the device. Some devices
         # don't have UIDs available until after initialization, so
@@ -314,11 +869,38 @@ class DeviceServer(multiprocessing.Process):
 
         stderr_handler = StreamHandler(sys.stderr)
         stderr_handler.setFormatter(_create_log_formatter(cls_name))
-        root_logger.addHandler(stderr_handler)
+        self._queue_logging.add_handler(stderr_handler)
         root_logger.debug("Debugging messages on.")
 
         root_logger.addFilter(Filter())
 
+        def add_log_file(host: str, port: int) -> None:
+            log_handler = FileHandler(
+                os.path.join(
+                    self._options.logging_dir,
+                    "%s_%s_%s.log" % (cls_name, host, port),
+                )
+            )
+            log_handler.setFormatter(_create_log_formatter(cls_name))
+            self._queue_logging.add_handler(log_handler)
+
+        try:
+            cls = _import_cls(cls)
+            # If the class was given by name, we only now can check if
+            # it is a floating device.
+            _check_uid(cls, self._device_def["uid"])
+        except Exception as ex:
+            # Importing a device module can fail in many ways, such as
+            # OSError for a missing vendor library, and it would fail
+            # again if this DeviceServer was restarted.
+            add_log_file(self._device_def["host"], self._device_def["port"])
+            _logger.error(
+                "Invalid definition for device %s.",
+                self._device_def["cls"],
+                exc_info=ex,
+            )
+            sys.exit(_INVALID_DEVICE_DEF_EXITCODE)
+
         # The cls argument can either be a Device subclass, or it can
         # be a function that returns a map of names to devices.
         cls_is_type = isinstance(cls, type)
@@ -326,7 +908,7 @@ class DeviceServer(multiprocessing.Process):
         if not cls_is_type:
             self._devices = cls(**self._device_def["conf"])
         else:
-            while not self.exit_event.is_set():
+            while not self._stop_requested():
                 try:
                     device = cls(**self._device_def["conf"])
                 except Exception as e:
@@ -352,20 +934,67 @@ class DeviceServer(multiprocessing.Process):
             host = self._device_def["host"]
             port = self._device_def["port"]
 
-        pyro_daemon = Pyro4.Daemon(port=port, host=host)
+        pyro_daemon = microscope._utils.create_pyro_daemon(
+            host, port, **self._device_def.get("daemon_options", {})
+        )
+
+        add_log_file(host, port)
+
+        # Metrics are collected if they are being served or if remote
+        # calls are being traced, in which case they are written to a
+        # file at the end.
+        metrics_port = self._device_def.get("metrics_port")
+        rpc_trace_dir = self._options.rpc_trace_dir
+        if metrics_port is not None or rpc_trace_dir is not None:
+            metrics = _DeviceServerMetrics(self._restart_count)
+            observers = [metrics.observe_call]
+        else:
+            metrics = None
+            observers = []
+
+        metrics_server = None
+        if metrics_port is not None:
+            try:
+                metrics_server = microscope._metrics.MetricsServer(
+                    metrics.registry, host, metrics_port
+                )
+            except OSError as ex:
+                # Typically, the port is already in use.  That should
+                # not take down the device, which would also fail
+                # again if this DeviceServer was restarted.
+                _logger.error(
+                    "Failed to serve metrics on port %d, serving device"
+                    " without metrics.",
+                    metrics_port,
+                    exc_info=ex,
+                )
 
-        log_handler = FileHandler(
-            os.path.join(
-                self._options.logging_dir,
-                "%s_%s_%s.log" % (cls_name, host, port),
+        if rpc_trace_dir is not None:
+            # Include the process ID so that the files of a device
+            # server that was restarted are not overwritten.
+            rpc_trace_basename = os.path.join(
+                rpc_trace_dir,
+                "%s_%s_%s_%d" % (cls_name, host, port, os.getpid()),
             )
-        )
-        log_handler.setFormatter(_create_log_formatter(cls_name))
-        root_logger.addHandler(log_handler)
+            tracer = _RemoteCallTracer(
+                metrics.registry, rpc_trace_basename + ".trace.json"
+            )
+            observers.append(tracer.observe_call)
+        else:
+            tracer = None
+
+        if metrics is not None:
+            instrument = functools.partial(
+                _instrument_device, observers=observers, metrics=metrics
+            )
+        else:
+            instrument = None
 
         _logger.info("Device initialized; starting daemon.")
         for obj_id, device in self._devices.items():
-            _register_device(pyro_daemon, device, obj_id=obj_id)
+            _register_device(
+                pyro_daemon, device, obj_id=obj_id, instrument=instrument
+            )
 
         # Run the Pyro daemon in a separate thread so that we can do
         # clean shutdown under Windows.
@@ -378,18 +1007,30 @@ class DeviceServer(multiprocessing.Process):
                 _logger.info(
                     "Device UID on port %s is %s", port, device.get_id()
                 )
+        if metrics_server is not None:
+            metrics_server.start()
+            _logger.info(
+                "Serving metrics on http://%s:%d/metrics",
+                *metrics_server.address,
+            )
 
         # Wait for termination event. We should just be able to call
         # wait() on the exit_event, but this causes issues with locks
         # in multiprocessing - see http://bugs.python.org/issue30975 .
-        while self.exit_event and not self.exit_event.is_set():
+        while self.exit_event and not self._stop_requested():
             # This tread waits for the termination event.
             try:
                 time.sleep(5)
             except (KeyboardInterrupt, IOError):
                 pass
+        if metrics_server is not None:
+            metrics_server.shutdown()
         pyro_daemon.shutdown()
         pyro_thread.join()
+        if tracer is not None:
+            tracer.close()
+            with open(rpc_trace_basename + ".metrics.txt", "w") as fh:
+                fh.write(metrics.registry.exposition())
         for device in self._devices.values():
             try:
                 device.shutdown()
@@ -399,6 +1040,110 @@ class DeviceServer(multiprocessing.Process):
                 _logger.error("Failure to shutdown device %s", device, ex)
 
 
+def _device_servers_args(devices) -> List[Tuple[dict, dict, dict]]:
+    """Prepare the definition and uid maps for each `DeviceServer`.
+
+    Returns:
+        A list with a tuple of device definition, map of uid to host,
+        and map of uid to port, for each device in `devices`.
+    """
+    # Group devices by class.
+    by_class = {}
+    for dev in devices:
+        ## We may change dev['conf'] later so make a copy of it (see
+        ## original issue #211 and PRs #212 and #217 - most discussion
+        ## happens on #212).  And the copy must be made on 'dev' and
+        ## not 'devices' because 'devices' may have internal refs
+        ## which are kept on a deepcopy (issue #274).
+        dev = copy.deepcopy(dev)
+
+        key = _cls_key(dev["cls"])
+        by_class[key] = by_class.get(key, []) + [dev]
+
+    servers_args = []
+    for cls, devs in by_class.items():
+        # Floating devices are devices that can only be identified
+        # after having been initialized, so the constructor will
+        # return any device that it supports.  To work around this we
+        # map all device uid to host/port first.  After the
+        # DeviceServer constructs the device, it can check on the map
+        # where to serve it.  For non floating devices that
+        # information is part of the device definition, no map is
+        # needed.
+        uid_to_host = {}
+        uid_to_port = {}
+        if _is_floating_device_def(devs[0]):
+            # In addition to the maps of uid to host/port, floating
+            # devices SDKs need the number of devices to index them.
+            count = 0
+            for dev in devs:
+                uid = dev["uid"]
+                uid_to_host[uid] = dev["host"]
+                uid_to_port[uid] = dev["port"]
+
+                dev["conf"]["index"] = count
+                count += 1
+
+        for dev in devs:
+            servers_args.append((dev, uid_to_host, uid_to_port))
+    return servers_args
+
+
+def _same_cls(a: Union[Callable, str], b: Union[Callable, str]) -> bool:
+    a = _cls_key(a)
+    b = _cls_key(b)
+    if a == b:
+        return True
+    # Functions defined in the configuration file are new objects
+    # each time the file is loaded, so compare their code instead.
+    a_code = getattr(a, "__code__", None)
+    if a_code is None:
+        return False
+    return a.__qualname__ == getattr(b, "__qualname__", None) and (
+        a_code == getattr(b, "__code__", None)
+    )
+
+
+def _same_value(a: Any, b: Any) -> bool:
+    if a is b:
+        return True
+    try:
+        return bool(a == b)
+    except Exception:
+        # Comparing some values, such as numpy arrays, fails.  If we
+        # can't tell, consider them different.
+        return False
+
+
+def _same_device_server_args(
+    server: DeviceServer, args: Tuple[dict, dict, dict]
+) -> bool:
+    """Whether `server` was constructed with the arguments `args`.
+
+    Values are the same if they are the same object or compare equal.
+    Objects that do not implement equality, such as instances of
+    classes defined in the configuration file, are new objects each
+    time the configuration is loaded so they are always different.
+    """
+    device_def, id_to_host, id_to_port = args
+    old_def = server._device_def
+    if not _same_cls(old_def["cls"], device_def["cls"]):
+        return False
+    if old_def.keys() != device_def.keys():
+        return False
+    for key in device_def.keys() - {"cls", "conf"}:
+        if not _same_value(old_def[key], device_def[key]):
+            return False
+    if old_def["conf"].keys() != device_def["conf"].keys():
+        return False
+    for key in device_def["conf"]:
+        if not _same_value(old_def["conf"][key], device_def["conf"][key]):
+            return False
+    return _same_value(server._id_to_host, id_to_host) and _same_value(
+        server._id_to_port, id_to_port
+    )
+
+
 def serve_devices(devices, options: DeviceServerOptions, exit_event=None):
     root_logger = logging.getLogger()
 
@@ -423,6 +1168,9 @@ def serve_devices(devices, options: DeviceServerOptions, exit_event=None):
     # clean shutdown on win32 elsewhere.
     parent = multiprocessing.current_process()
 
+    # Set on SIGHUP to reload the configuration file.
+    reload_event = threading.Event()
+
     def term_func(sig, frame):
         """Terminate subprocesses cleanly."""
         if parent == multiprocessing.current_process():
@@ -435,49 +1183,72 @@ def serve_devices(devices, options: DeviceServerOptions, exit_event=None):
                 this_server.join()
             sys.exit()
 
+    def reload_func(sig, frame):
+        """Reload the configuration file."""
+        if parent == multiprocessing.current_process():
+            reload_event.set()
+
     if sys.platform != "win32":
         signal.signal(signal.SIGTERM, term_func)
         signal.signal(signal.SIGINT, term_func)
+        signal.signal(signal.SIGHUP, reload_func)
 
-    # Group devices by class.
-    by_class = {}
-    for dev in devices:
-        ## We may change dev['conf'] later so make a copy of it (see
-        ## original issue #211 and PRs #212 and #217 - most discussion
-        ## happens on #212).  And the copy must be made on 'dev' and
-        ## not 'devices' because 'devices' may have internal refs
-        ## which are kept on a deepcopy (issue #274).
-        dev = copy.deepcopy(dev)
-
-        by_class[dev["cls"]] = by_class.get(dev["cls"], []) + [dev]
-
-    if not by_class:
+    servers_args = _device_servers_args(devices)
+    if not servers_args:
         _logger.warning("No valid devices specified. Maybe an empty list?")
 
-    for cls, devs in by_class.items():
-        # Floating devices are devices that can only be identified
-        # after having been initialized, so the constructor will
-        # return any device that it supports.  To work around this we
-        # map all device uid to host/port first.  After the
-        # DeviceServer constructs the device, it can check on the map
-        # where to serve it.  For non floating devices that
-        # information is part of the device definition, no map is
-        # needed.
-        uid_to_host = {}
-        uid_to_port = {}
-        if isinstance(cls, type) and issubclass(cls, FloatingDeviceMixin):
-            # In addition to the maps of uid to host/port, floating
-            # devices SDKs need the number of devices to index them.
-            count = 0
-            for dev in devs:
-                uid = dev["uid"]
-                uid_to_host[uid] = dev["host"]
-                uid_to_port[uid] = dev["port"]
+    for dev, uid_to_host, uid_to_port in servers_args:
+        servers.append(
+            DeviceServer(
+                dev,
+                options,
+                uid_to_host,
+                uid_to_port,
+                exit_event=exit_event,
+            )
+        )
+        servers[-1].start()
 
-                dev["conf"]["index"] = count
-                count += 1
+    def reload_devices():
+        """Restart the DeviceServers whose definition has changed.
 
-        for dev in devs:
+        DeviceServers whose definition is the same on the reloaded
+        configuration file keep running, their devices are not
+        shutdown.
+        """
+        _logger.info("Reloading %s ...", options.config_fpath)
+        try:
+            new_servers_args = _device_servers_args(
+                validate_devices(options.config_fpath)
+            )
+        except Exception as ex:
+            _logger.error(
+                "... failed to reload configuration. Keeping current"
+                " devices.",
+                exc_info=ex,
+            )
+            return
+
+        to_start = []
+        to_stop = list(servers)
+        for args in new_servers_args:
+            for s in to_stop:
+                if _same_device_server_args(s, args):
+                    to_stop.remove(s)
+                    break
+            else:
+                to_start.append(args)
+
+        # Stop all servers before starting the new ones because a
+        # changed device may be served on the same port.
+        for s in to_stop:
+            servers.remove(s)
+            s.stop()
+        for s in to_stop:
+            s.join()
+            _logger.info("... stopped DeviceServer with PID %s.", s.pid)
+
+        for dev, uid_to_host, uid_to_port in to_start:
             servers.append(
                 DeviceServer(
                     dev,
@@ -488,6 +1259,15 @@ def serve_devices(devices, options: DeviceServerOptions, exit_event=None):
                 )
             )
             servers[-1].start()
+            _logger.info(
+                "... started DeviceServer for %s as PID %s.",
+                dev["cls"],
+                servers[-1].pid,
+            )
+        _logger.info(
+            "... configuration reloaded. %d DeviceServers unchanged.",
+            len(servers) - len(to_start),
+        )
 
     # Main thread must be idle to process signals correctly, so use another
     # thread to check DeviceServers, restarting them where necessary. Define
@@ -495,9 +1275,20 @@ def serve_devices(devices, options: DeviceServerOptions, exit_event=None):
     def keep_alive():
         """Keep DeviceServers alive."""
         while not exit_event.is_set():
+            if reload_event.is_set():
+                reload_event.clear()
+                reload_devices()
             for s in servers:
                 if s.is_alive():
                     continue
+                elif s.exitcode == _INVALID_DEVICE_DEF_EXITCODE:
+                    _logger.error(
+                        "DeviceServer with PID %s has an invalid device"
+                        " definition for %s. Not restarting it.",
+                        s.pid,
+                        s._device_def["cls"],
+                    )
+                    servers.remove(s)
                 else:
                     _logger.info(
                         "DeviceServer Failure. Process %s is dead with"
@@ -529,7 +1320,8 @@ def serve_devices(devices, options: DeviceServerOptions, exit_event=None):
                 exit_event.set()
             else:
                 try:
-                    time.sleep(5)
+                    # Wake up early to reload the configuration.
+                    reload_event.wait(5)
                 except (KeyboardInterrupt, IOError):
                     pass
 
@@ -576,6 +1368,18 @@ def _parse_cmd_line_args(args: Sequence[str]) -> DeviceServerOptions:
         help="Directory where log files are written to",
     )
 
+    parser.add_argument(
+        "--rpc-trace-dir",
+        action="store",
+        type=str,
+        default=None,
+        help=(
+            "Directory where to write, for each device server, a timeline"
+            " of remote calls in the Chrome trace format and metrics about"
+            " them.  Tracing is disabled if not set"
+        ),
+    )
+
     parser.add_argument(
         "config_fpath",
         action="store",
@@ -588,6 +1392,7 @@ def _parse_cmd_line_args(args: Sequence[str]) -> DeviceServerOptions:
         config_fpath=parsed.config_fpath,
         logging_level=getattr(logging, parsed.logging_level.upper()),
         logging_dir=parsed.logging_dir,
+        rpc_trace_dir=parsed.rpc_trace_dir,
     )
 
 
@@ -25,6 +25,7 @@ import warnings
 import serial
 
 import microscope
+import microscope._serial
 import microscope.abc
 
 
@@ -42,15 +43,18 @@ class ThorlabsFilterWheel(microscope.abc.FilterWheel):
         :param timeout: serial timeout
         """
         self.eol = "\r"
-        rawSerial = serial.Serial(
-            port=com,
-            baudrate=baud,
-            timeout=timeout,
-            stopbits=serial.STOPBITS_ONE,
-            bytesize=serial.EIGHTBITS,
-            parity=serial.PARITY_NONE,
-            xonxoff=0,
+        rawSerial = microscope._serial.InstrumentedSerial(
+            serial.Serial(
+                port=com,
+                baudrate=baud,
+                timeout=timeout,
+                stopbits=serial.STOPBITS_ONE,
+                bytesize=serial.EIGHTBITS,
+                parity=serial.PARITY_NONE,
+                xonxoff=0,
+            )
         )
+        self._serial_stats = rawSerial.stats
         # The Thorlabs controller serial implementation is strange.
         # Generally, it uses \r as EOL, but error messages use \n.
         # A readline after sending a 'pos?\r' command always times out,
@@ -22,6 +22,7 @@ import logging
 
 import serial
 
+import microscope._serial
 import microscope._utils
 import microscope.abc
 
@@ -45,14 +46,17 @@ class CoboltLaser(
 
     def __init__(self, com=None, baud=115200, timeout=0.1, **kwargs):
         super().__init__(**kwargs)
-        self.connection = serial.Serial(
-            port=com,
-            baudrate=baud,
-            timeout=timeout,
-            stopbits=serial.STOPBITS_ONE,
-            bytesize=serial.EIGHTBITS,
-            parity=serial.PARITY_NONE,
+        self.connection = microscope._serial.InstrumentedSerial(
+            serial.Serial(
+                port=com,
+                baudrate=baud,
+                timeout=timeout,
+                stopbits=serial.STOPBITS_ONE,
+                bytesize=serial.EIGHTBITS,
+                parity=serial.PARITY_NONE,
+            )
         )
+        self._serial_stats = self.connection.stats
         # Start a logger.
         response = self.send(b"sn?")
         _logger.info("Cobolt laser serial number: [%s]", response.decode())
@@ -23,6 +23,7 @@ import logging
 import serial
 
 import microscope
+import microscope._serial
 import microscope.abc
 
 _logger = logging.getLogger(__name__)
@@ -42,14 +43,17 @@ class DeepstarLaser(
 
     def __init__(self, com, baud=9600, timeout=2.0, **kwargs):
         super().__init__(**kwargs)
-        self.connection = serial.Serial(
-            port=com,
-            baudrate=baud,
-            timeout=timeout,
-            stopbits=serial.STOPBITS_ONE,
-            bytesize=serial.EIGHTBITS,
-            parity=serial.PARITY_NONE,
+        self.connection = microscope._serial.InstrumentedSerial(
+            serial.Serial(
+                port=com,
+                baudrate=baud,
+                timeout=timeout,
+                stopbits=serial.STOPBITS_ONE,
+                bytesize=serial.EIGHTBITS,
+                parity=serial.PARITY_NONE,
+            )
         )
+        self._serial_stats = self.connection.stats
         # If the laser is currently on, then we need to use 7-byte mode; otherwise we need to
         # use 16-byte mode.
         self._write(b"S?")
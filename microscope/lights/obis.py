@@ -24,6 +24,7 @@ import logging
 import serial
 
 import microscope
+import microscope._serial
 import microscope.abc
 
 _logger = logging.getLogger(__name__)
@@ -32,14 +33,17 @@ _logger = logging.getLogger(__name__)
 class ObisLaser(microscope.abc.SerialDeviceMixin, microscope.abc.LightSource):
     def __init__(self, com, baud=115200, timeout=0.5, **kwargs) -> None:
         super().__init__(**kwargs)
-        self.connection = serial.Serial(
-            port=com,
-            baudrate=baud,
-            timeout=timeout,
-            stopbits=serial.STOPBITS_ONE,
-            bytesize=serial.EIGHTBITS,
-            parity=serial.PARITY_NONE,
+        self.connection = microscope._serial.InstrumentedSerial(
+            serial.Serial(
+                port=com,
+                baudrate=baud,
+                timeout=timeout,
+                stopbits=serial.STOPBITS_ONE,
+                bytesize=serial.EIGHTBITS,
+                parity=serial.PARITY_NONE,
+            )
         )
+        self._serial_stats = self.connection.stats
         # Start a logger.
         self._write(b"SYSTem:INFormation:MODel?")
         response = self._readline()
@@ -24,11 +24,25 @@ import logging
 
 import serial
 
+import microscope._serial
 import microscope._utils
 import microscope.abc
 
 _logger = logging.getLogger(__name__)
 
+# Time, in seconds, without new data after which a response of
+# unknown length is complete.  Much shorter than the serial timeout,
+# which the manual recommends to be over 0.5 seconds.
+_IDLE_TIMEOUT = 0.05
+
+# The list of faults is a header line followed by one line per fault,
+# or an empty line.
+_FAULTS_RESPONSE = microscope._serial.ResponseFormat(
+    terminator=b"\r\n",
+    end=lambda line: len(line.strip()) == 0,
+    idle_timeout=_IDLE_TIMEOUT,
+)
+
 
 class SapphireLaser(
     microscope._utils.OnlyTriggersBulbOnSoftwareMixin,
@@ -56,14 +70,17 @@ class SapphireLaser(
         # no parity or flow control
         # timeout is recomended to be over 0.5
         super().__init__(**kwargs)
-        self.connection = serial.Serial(
-            port=com,
-            baudrate=baud,
-            timeout=timeout,
-            stopbits=serial.STOPBITS_ONE,
-            bytesize=serial.EIGHTBITS,
-            parity=serial.PARITY_NONE,
+        self.connection = microscope._serial.InstrumentedSerial(
+            serial.Serial(
+                port=com,
+                baudrate=baud,
+                timeout=timeout,
+                stopbits=serial.STOPBITS_ONE,
+                bytesize=serial.EIGHTBITS,
+                parity=serial.PARITY_NONE,
+            )
         )
+        self._serial_stats = self.connection.stats
         # Turning off command prompt
         self.send(b">=0")
 
@@ -100,9 +117,7 @@ class SapphireLaser(
         return self.get_status()
 
     def flush_buffer(self):
-        line = b" "
-        while len(line) > 0:
-            line = self._readline()
+        microscope._serial.read_until_idle(self.connection, _IDLE_TIMEOUT)
 
     @microscope.abc.SerialDeviceMixin.lock_comms
     def get_status(self):
@@ -127,13 +142,10 @@ class SapphireLaser(
             result.append(stat + " " + self.send(cmd).decode())
 
         self._write(b"?fl")
-        faults = self._readline()
-        response = self._readline()
-        while response:
-            faults += b" " + response
-            response = self._readline()
-
-        result.append(faults.decode())
+        faults = _FAULTS_RESPONSE.read(self.connection)
+        result.append(
+            b" ".join(f.strip() for f in faults if f.strip()).decode()
+        )
         return result
 
     @microscope.abc.SerialDeviceMixin.lock_comms
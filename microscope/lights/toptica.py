@@ -24,6 +24,7 @@ from typing import List
 import serial
 
 import microscope
+import microscope._serial
 import microscope._utils
 import microscope.abc
 
@@ -78,7 +79,11 @@ class _iBeamConnection:
             rtscts=False,
             dsrdtr=False,
         )
-        self._serial = microscope._utils.SharedSerial(serial_conn)
+        instrumented_serial = microscope._serial.InstrumentedSerial(
+            serial_conn
+        )
+        self._serial_stats = instrumented_serial.stats
+        self._serial = microscope._utils.SharedSerial(instrumented_serial)
 
         # We don't know what is the current verbosity state and so we
         # don't know yet what we should be reading back.  So blindly
@@ -26,18 +26,32 @@ hardware behaviour.  They implement the different ABC.
 
 """
 
+import collections
 import logging
 import math
 import random
+import threading
 import time
-from typing import Mapping, Tuple
+from typing import (
+    Deque,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 
 import microscope
-import microscope._utils
 import microscope.abc
+from microscope.simulators.triggers import (
+    SimulatedTriggerBus,
+    SimulatedTriggerTargetMixin,
+)
 
 _logger = logging.getLogger(__name__)
 
@@ -58,7 +72,12 @@ def _theta_generator():
 
 
 class _ImageGenerator:
-    """Generates test images, with methods for configuration via a Setting."""
+    """Generates test images, with methods for configuration via a Setting.
+
+    The image generation methods write into an output array of the
+    selected data type.  They compute in single precision, with the
+    coordinate grids and scratch buffers cached for the image size.
+    """
 
     def __init__(self):
         self._methods = (
@@ -73,9 +92,24 @@ class _ImageGenerator:
         self._datatypes = (np.uint8, np.uint16, float)
         self._datatype_index = 0
         self._theta = _theta_generator()
+        self._rng = np.random.default_rng()
         self.numbering = True
-        # Font for rendering counter in images.
+        # Font for rendering counter in images.  The digits are
+        # rendered once and then copied into the images.
         self._font = ImageFont.load_default()
+        if _IMAGEFONT_HAS_GETBBOX:
+            self._glyph_height = self._font.getbbox("0123456789")[3]
+        else:
+            self._glyph_height = self._font.getsize("0123456789")[1]
+        self._glyphs: Dict[str, np.ndarray] = {}
+        # Coordinates and scratch buffer for the last image size.
+        # Image generation is called from multiple threads, e.g., to
+        # render a frame bank on enable, so it needs a lock.
+        self._lock = threading.Lock()
+        self._grids_shape: Tuple[int, int] = (0, 0)
+        self._xx = np.empty((1, 0), dtype=np.float32)
+        self._yy = np.empty((0, 1), dtype=np.float32)
+        self._scratch = np.empty((0, 0), dtype=np.float32)
 
     def enable_numbering(self, enab):
         self.numbering = enab
@@ -101,70 +135,131 @@ class _ImageGenerator:
         """Set the image generation method."""
         self._method_index = index
 
+    def _update_grids(self, w, h):
+        """Update the coordinates and scratch buffer for image size."""
+        if self._grids_shape != (h, w):
+            # Coordinates are kept as a row and a column and expanded
+            # to the whole image by broadcasting.
+            self._xx = np.arange(w, dtype=np.float32)[np.newaxis, :]
+            self._yy = np.arange(h, dtype=np.float32)[:, np.newaxis]
+            self._scratch = np.empty((h, w), dtype=np.float32)
+            self._grids_shape = (h, w)
+
+    def _get_glyph(self, char):
+        """Return the bitmap of a character, rendered at full value."""
+        glyph = self._glyphs.get(char)
+        if glyph is None:
+            if _IMAGEFONT_HAS_GETBBOX:
+                width = self._font.getbbox(char)[2]
+            else:
+                width = self._font.getsize(char)[0]
+            img = Image.new("L", (width, self._glyph_height))
+            ImageDraw.Draw(img).text((0, 0), char, fill=255)
+            glyph = np.asarray(img, dtype=np.uint16)
+            self._glyphs[char] = glyph
+        return glyph
+
+    def _draw_number(self, data, number, light):
+        """Draw number on the top left corner of the image."""
+        glyphs = [self._get_glyph(c) for c in "%d" % number]
+        # Black box with 1 pixel of padding around the number.
+        box_width = sum(g.shape[1] for g in glyphs) + 2
+        box = data[0 : self._glyph_height + 2, 0:box_width]
+        box[...] = 0
+        x = 1
+        for glyph in glyphs:
+            region = box[1 : 1 + self._glyph_height, x : x + glyph.shape[1]]
+            rows, cols = region.shape
+            region[...] = glyph[:rows, :cols] * light // 255
+            x += glyph.shape[1]
+
     def get_image(self, width, height, dark=0, light=255, index=None):
         """Return an image using the currently selected method."""
         m = self._methods[self._method_index]
         d = self._datatypes[self._datatype_index]
-        # return Image.fromarray(m(width, height, dark, light).astype(d), 'L')
-        data = m(width, height, dark, light).astype(d)
+        data = np.empty((height, width), dtype=d)
+        with self._lock:
+            self._update_grids(width, height)
+            m(width, height, dark, light, data)
         if self.numbering and index is not None:
-            text = "%d" % index
-            if _IMAGEFONT_HAS_GETBBOX:
-                size = self._font.getbbox(text)[2:]
-            else:
-                size = self._font.getsize(text)
-            size = tuple(d + 2 for d in size)  # padding
-            img = Image.new("L", size)
-            ctx = ImageDraw.Draw(img)
-            ctx.text((1, 1), text, fill=light)
-            data[0 : size[1], 0 : size[0]] = np.asarray(img)
+            self._draw_number(data, index, light)
         return data
 
-    def black(self, w, h, dark, light):
+    def black(self, w, h, dark, light, out):
         """Ignores dark and light - returns zeros"""
-        return np.zeros((h, w))
+        out.fill(0)
 
-    def white(self, w, h, dark, light):
+    def white(self, w, h, dark, light, out):
         """Ignores dark and light - returns max value for current data type."""
-        d = self._datatypes[self._datatype_index]
-        if issubclass(d, np.integer):
-            value = np.iinfo(d).max
+        if np.issubdtype(out.dtype, np.integer):
+            out.fill(np.iinfo(out.dtype).max)
         else:
-            value = 1.0
-        return value * np.ones((h, w)).astype(d)
+            out.fill(1.0)
 
-    def gradient(self, w, h, dark, light):
+    def gradient(self, w, h, dark, light, out):
         """A single gradient across the whole image from top left to bottom right."""
-        xx, yy = np.meshgrid(range(w), range(h))
-        return dark + light * (xx + yy) / (xx.max() + yy.max())
+        scale = np.float32(light / max(w + h - 2, 1))
+        np.add(self._xx, self._yy, out=self._scratch)
+        self._scratch *= scale
+        self._scratch += dark
+        np.copyto(out, self._scratch, casting="unsafe")
 
-    def noise(self, w, h, dark, light):
+    def noise(self, w, h, dark, light, out):
         """Random noise."""
-        return np.random.randint(dark, light, size=(h, w))
+        # Generating uint8 random integers is much slower than
+        # uint16, so generate uint16 even if the image is uint8.
+        noise = self._rng.integers(dark, light, size=(h, w), dtype=np.uint16)
+        np.copyto(out, noise, casting="unsafe")
 
-    def one_gaussian(self, w, h, dark, light):
+    def one_gaussian(self, w, h, dark, light, out):
         "A single gaussian"
         sigma = 0.01 * max(w, h)
-        x0 = np.random.randint(w)
-        y0 = np.random.randint(h)
-        xx, yy = np.meshgrid(range(w), range(h))
-        return dark + light * np.exp(
-            -((xx - x0) ** 2 + (yy - y0) ** 2) / (2 * sigma**2)
-        )
-
-    def sawtooth(self, w, h, dark, light):
+        x0 = int(self._rng.integers(w))
+        y0 = int(self._rng.integers(h))
+        # A 2D gaussian is the product of two 1D gaussians.
+        gx = np.exp(-((self._xx - x0) ** 2) / np.float32(2 * sigma**2))
+        gy = np.exp(-((self._yy - y0) ** 2) / np.float32(2 * sigma**2))
+        np.multiply(gy, gx, out=self._scratch)
+        self._scratch *= np.float32(light)
+        self._scratch += dark
+        np.copyto(out, self._scratch, casting="unsafe")
+
+    def sawtooth(self, w, h, dark, light, out):
         """A sawtooth gradient that rotates about 0,0."""
         th = next(self._theta)
-        xx, yy = np.meshgrid(range(w), range(h))
-        wrap = 0.1 * max(xx.max(), yy.max())
-        return dark + light * ((np.sin(th) * xx + np.cos(th) * yy) % wrap) / (
-            wrap
+        wrap = np.float32(max(0.1 * max(w - 1, h - 1), 1e-6))
+        np.add(
+            (np.float32(np.sin(th)) / wrap) * self._xx,
+            (np.float32(np.cos(th)) / wrap) * self._yy,
+            out=self._scratch,
         )
+        # Fractional part, i.e., the position in the wrap, is faster
+        # to compute than the modulo.
+        self._scratch -= np.floor(self._scratch)
+        self._scratch *= np.float32(light)
+        self._scratch += dark
+        np.copyto(out, self._scratch, casting="unsafe")
+
+
+class SimulatedCamera(SimulatedTriggerTargetMixin, microscope.abc.Camera):
+    """Camera that generates test images.
+
+    Each image is rendered when the camera is triggered, after
+    waiting for the exposure time.  Rendering large images can take
+    longer than the exposure time which limits the frame rate.  To
+    test the transport of images at high frame rates, set the "frame
+    bank size" setting.  The camera will then render that number of
+    images once, for each ROI, binning, pattern, and data type, and
+    send them in turn at one image per exposure time.
+
+    The camera can also be triggered by a simulated trigger bus, see
+    :class:`microscope.simulators.triggers.SimulatedTriggerTargetMixin`
+    for the arguments of the timing model.  On a hardware trigger,
+    the image is sent one exposure time plus the readout time after
+    the trigger.
 
+    """
 
-class SimulatedCamera(
-    microscope._utils.OnlyTriggersOnceOnSoftwareMixin, microscope.abc.Camera
-):
     def __init__(self, sensor_shape: Tuple[int, int] = (512, 512), **kwargs):
         super().__init__(**kwargs)
         # Binning and ROI
@@ -219,9 +314,27 @@ class SimulatedCamera(
             self._set_gain,
             lambda: (0, 8192),
         )
+        # In frame bank mode, images are rendered once and then sent
+        # in turn.  This makes the frame rate independent of the time
+        # to render an image.
+        self._frame_bank_size = 0
+        self.add_setting(
+            "frame bank size",
+            "int",
+            lambda: self._frame_bank_size,
+            self._set_frame_bank_size,
+            lambda: (0, 1024),
+        )
+        self._frame_bank: List[np.ndarray] = []
+        self._frame_bank_key = None
+        # Time, on the monotonic clock, when the last image was ready.
+        self._last_frame_time = 0.0
         self._acquiring = False
         self._exposure_time = 0.1
         self._triggered = 0
+        # Time, on the monotonic clock, of the pending hardware
+        # triggers.
+        self._hardware_triggers: Deque[float] = collections.deque()
         # Count number of images sent since last enable.
         self._sent = 0
 
@@ -232,6 +345,41 @@ class SimulatedCamera(
     def _set_gain(self, value):
         self._gain = value
 
+    def _set_frame_bank_size(self, value):
+        self._frame_bank_size = value
+        if value == 0:
+            self._frame_bank = []
+            self._frame_bank_key = None
+
+    def _render_image(self, width, height, index):
+        dark = int(32 * np.random.rand())
+        light = int(255 - 128 * np.random.rand())
+        return self._image_generator.get_image(
+            width, height, dark, light, index=index
+        )
+
+    def _get_frame_bank(self, width, height) -> List[np.ndarray]:
+        """Return the bank of images, rendering them if needed."""
+        key = (
+            width,
+            height,
+            self._image_generator.method(),
+            self._image_generator.data_type(),
+            self._image_generator.numbering,
+            self._frame_bank_size,
+        )
+        if key != self._frame_bank_key:
+            _logger.info("Rendering bank of %d images.", self._frame_bank_size)
+            self._frame_bank = []
+            for index in range(self._frame_bank_size):
+                image = self._render_image(width, height, index)
+                # The same image is sent many times, maybe to a
+                # client on the same process, so make it read-only.
+                image.flags.writeable = False
+                self._frame_bank.append(image)
+            self._frame_bank_key = key
+        return self._frame_bank
+
     def _purge_buffers(self):
         """Purge buffers on both camera and PC."""
         _logger.info("Purging buffers.")
@@ -249,16 +397,43 @@ class SimulatedCamera(
                     "Exception raised in SimulatedCamera._fetch_data"
                 )
             _logger.info("Sending image")
-            time.sleep(self._exposure_time)
-            self._triggered -= 1
-            # Create an image
-            dark = int(32 * np.random.rand())
-            light = int(255 - 128 * np.random.rand())
             width = self._roi.width // self._binning.h
             height = self._roi.height // self._binning.v
-            image = self._image_generator.get_image(
-                width, height, dark, light, index=self._sent
-            )
+            if self._hardware_triggers:
+                # The image is ready one exposure and readout after
+                # the trigger.
+                ready_time = (
+                    self._hardware_triggers.popleft()
+                    + self._exposure_time
+                    + self._readout_time
+                )
+                delay = ready_time - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                self._last_frame_time = ready_time
+                if self._frame_bank_size > 0:
+                    frame_bank = self._get_frame_bank(width, height)
+                    image = frame_bank[self._sent % len(frame_bank)]
+                else:
+                    image = self._render_image(width, height, self._sent)
+            elif self._frame_bank_size > 0:
+                frame_bank = self._get_frame_bank(width, height)
+                # If the camera was busy, the next image is ready one
+                # exposure after the previous one, independently of
+                # how long it took to send it.
+                ready_time = (
+                    max(time.monotonic(), self._last_frame_time)
+                    + self._exposure_time
+                )
+                delay = ready_time - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                self._last_frame_time = ready_time
+                image = frame_bank[self._sent % len(frame_bank)]
+            else:
+                time.sleep(self._exposure_time)
+                image = self._render_image(width, height, self._sent)
+            self._triggered -= 1
             self._sent += 1
             return image
 
@@ -266,6 +441,7 @@ class SimulatedCamera(
         _logger.info("Disabling acquisition; %d images sent.", self._sent)
         if self._acquiring:
             self._acquiring = False
+        self._hardware_triggers.clear()
 
     def _do_disable(self):
         self.abort()
@@ -275,6 +451,11 @@ class SimulatedCamera(
         if self._acquiring:
             self.abort()
         self._create_buffers()
+        if self._frame_bank_size > 0:
+            self._get_frame_bank(
+                self._roi.width // self._binning.h,
+                self._roi.height // self._binning.v,
+            )
         self._acquiring = True
         self._sent = 0
         _logger.info("Acquisition enabled.")
@@ -303,6 +484,17 @@ class SimulatedCamera(
         if self._acquiring:
             self._triggered += 1
 
+    def _trigger_busy_time(self, pulse_width: float) -> float:
+        return self._exposure_time + self._readout_time
+
+    def _do_hardware_trigger(
+        self, action_time: float, pulse_width: float
+    ) -> None:
+        _logger.debug("Hardware trigger at %f.", action_time)
+        if self._acquiring:
+            self._hardware_triggers.append(action_time)
+            self._triggered += 1
+
     def _get_binning(self):
         return self._binning
 
@@ -318,7 +510,7 @@ class SimulatedCamera(
         self._roi = roi
 
     def _do_shutdown(self) -> None:
-        pass
+        self._disconnect_trigger_bus()
 
 
 class SimulatedController(microscope.abc.Controller):
@@ -347,13 +539,23 @@ class SimulatedFilterWheel(microscope.abc.FilterWheel):
 
 
 class SimulatedLightSource(
-    microscope._utils.OnlyTriggersBulbOnSoftwareMixin,
-    microscope.abc.LightSource,
+    SimulatedTriggerTargetMixin, microscope.abc.LightSource
 ):
+    """Simulated light source.
+
+    On a hardware trigger, an enabled light source emits light for
+    the duration of each trigger pulse.  The number of pulses emitted
+    is counted by :meth:`get_emitted_pulses`.
+
+    """
+
+    _simulated_trigger_mode = microscope.TriggerMode.BULB
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self._power = 0.0
         self._emission = False
+        self._emitted_pulses = 0
 
     def get_status(self):
         return [str(x) for x in (self._emission, self._power, self._set_point)]
@@ -363,7 +565,27 @@ class SimulatedLightSource(
         return self._emission
 
     def _do_shutdown(self) -> None:
-        pass
+        self._disconnect_trigger_bus()
+
+    def _do_trigger(self) -> None:
+        raise microscope.IncompatibleStateError(
+            "trigger does not make sense in trigger mode bulb, only enable"
+        )
+
+    def _do_hardware_trigger(
+        self, action_time: float, pulse_width: float
+    ) -> None:
+        if self._emission:
+            self._emitted_pulses += 1
+
+    def get_emitted_pulses(self) -> int:
+        """Number of trigger pulses during which light was emitted.
+
+        This method is not part of the LightSource ABC, it only exists
+        on this test device to help testing hardware-timed
+        experiments.
+        """
+        return self._emitted_pulses
 
     def _do_disable(self):
         self._emission = False
@@ -384,15 +606,14 @@ class SimulatedLightSource(
 
 
 class SimulatedDeformableMirror(
-    microscope._utils.OnlyTriggersOnceOnSoftwareMixin,
-    microscope.abc.DeformableMirror,
+    SimulatedTriggerTargetMixin, microscope.abc.DeformableMirror
 ):
     def __init__(self, n_actuators, **kwargs):
         super().__init__(**kwargs)
         self._n_actuators = n_actuators
 
     def _do_shutdown(self) -> None:
-        pass
+        self._disconnect_trigger_bus()
 
     @property
     def n_actuators(self) -> int:
@@ -401,6 +622,16 @@ class SimulatedDeformableMirror(
     def _do_apply_pattern(self, pattern):
         self._current_pattern = pattern
 
+    def _do_hardware_trigger(
+        self, action_time: float, pulse_width: float
+    ) -> None:
+        # apply_pattern requires software trigger so apply the next
+        # queued pattern directly.
+        if self._patterns is None:
+            raise microscope.DeviceError("no pattern queued to apply")
+        self._pattern_idx += 1
+        self._do_apply_pattern(self._patterns[self._pattern_idx, :])
+
     def get_current_pattern(self):
         """Method for debug purposes only.
 
@@ -410,33 +641,178 @@ class SimulatedDeformableMirror(
         return self._current_pattern
 
 
+class _AxisMove:
+    """Move of an axis with a trapezoidal velocity profile.
+
+    The axis starts at rest, accelerates to the maximum speed, and
+    decelerates to stop at the target.  Short moves never reach the
+    maximum speed.  After the move, the axis takes the settle time
+    before the move is complete.
+    """
+
+    def __init__(
+        self,
+        start: float,
+        target: float,
+        start_time: float,
+        speed: float,
+        acceleration: float,
+        settle_time: float,
+    ) -> None:
+        self.start = start
+        self.target = target
+        self.start_time = start_time
+        distance = abs(target - start)
+        if acceleration > 0.0:
+            # Reduce the peak speed if there is no distance to
+            # accelerate to the maximum speed.
+            speed = min(speed, math.sqrt(distance * acceleration))
+            self._ramp_time = speed / acceleration
+        else:
+            self._ramp_time = 0.0
+        self._speed = speed
+        self._acceleration = acceleration
+        if distance == 0.0:
+            self._travel_time = 0.0
+        else:
+            self._travel_time = distance / speed + self._ramp_time
+        self.end_time = start_time + self._travel_time + settle_time
+
+    def position(self, now: float) -> float:
+        """Position of the axis at a time on the monotonic clock."""
+        t = now - self.start_time
+        if t >= self._travel_time:
+            return self.target
+        elif t <= 0.0:
+            return self.start
+        elif t < self._ramp_time:
+            travelled = 0.5 * self._acceleration * t**2
+        elif t < self._travel_time - self._ramp_time:
+            travelled = self._speed * (t - 0.5 * self._ramp_time)
+        else:
+            remaining = self._travel_time - t
+            travelled = (
+                abs(self.target - self.start)
+                - 0.5 * self._acceleration * remaining**2
+            )
+        return self.start + math.copysign(travelled, self.target - self.start)
+
+
 class SimulatedStageAxis(microscope.abc.StageAxis):
-    def __init__(self, limits: microscope.AxisLimits) -> None:
+    """A test stage axis.
+
+    By default, the axis moves to the target position immediately.
+    If a speed is set, moves follow a trapezoidal velocity profile
+    and run in the background: `move_to` and `move_by` return
+    immediately, `position` returns the position during the move,
+    and `is_moving` returns true until the move, and the settle time,
+    is over.  A new move starts from the current position, as if the
+    axis was at rest.
+
+    Args:
+        limits: the limits of the axis.
+        speed: maximum speed, in units per second.  If `None`, the
+            axis moves immediately.
+        acceleration: acceleration, in units per second squared.  If
+            zero, the axis moves at maximum speed from the start.
+        settle_time: time, in seconds, after each move for the axis to
+            settle.
+
+    """
+
+    def __init__(
+        self,
+        limits: microscope.AxisLimits,
+        speed: Optional[float] = None,
+        acceleration: float = 0.0,
+        settle_time: float = 0.0,
+    ) -> None:
         super().__init__()
+        if speed is not None and speed <= 0.0:
+            raise ValueError("speed must be positive")
         self._limits = limits
+        self._speed = speed
+        self._acceleration = acceleration
+        self._settle_time = settle_time
         # Start axis in the middle of its range.
         self._position = self._limits.lower + (
             (self._limits.upper - self._limits.lower) / 2.0
         )
+        self._move: Optional[_AxisMove] = None
+        self._move_lock = threading.Lock()
 
     @property
     def position(self) -> float:
-        return self._position
+        with self._move_lock:
+            if self._move is None:
+                return self._position
+            return self._move.position(time.monotonic())
 
     @property
     def limits(self) -> microscope.AxisLimits:
         return self._limits
 
+    def is_moving(self) -> bool:
+        """Whether the axis is moving or settling."""
+        with self._move_lock:
+            return (
+                self._move is not None
+                and time.monotonic() < self._move.end_time
+            )
+
     def move_by(self, delta: float) -> None:
-        self.move_to(self._position + delta)
+        with self._move_lock:
+            # Relative to the target of the current move, as if the
+            # axis had reached it.
+            self._move_to(self._position + delta)
 
     def move_to(self, pos: float) -> None:
+        with self._move_lock:
+            self._move_to(pos)
+
+    def move_by_async(self, delta: float) -> microscope.abc.StageMove:
+        self.move_by(delta)
+        return microscope.abc.StageMove(self, self.is_moving, self.stop)
+
+    def move_to_async(self, pos: float) -> microscope.abc.StageMove:
+        self.move_to(pos)
+        return microscope.abc.StageMove(self, self.is_moving, self.stop)
+
+    def stop(self) -> None:
+        """Stop the axis where it is, skipping the settle time."""
+        with self._move_lock:
+            if self._move is not None:
+                self._position = self._move.position(time.monotonic())
+                self._move = None
+
+    def _move_to(self, pos: float) -> None:
         if pos < self._limits.lower:
-            self._position = self._limits.lower
+            pos = self._limits.lower
         elif pos > self._limits.upper:
-            self._position = self._limits.upper
-        else:
-            self._position = pos
+            pos = self._limits.upper
+        if self._speed is not None:
+            now = time.monotonic()
+            if self._move is None:
+                start = self._position
+            else:
+                start = self._move.position(now)
+            self._move = _AxisMove(
+                start,
+                pos,
+                now,
+                self._speed,
+                self._acceleration,
+                self._settle_time,
+            )
+        self._position = pos
+
+
+def _per_axis(value, name: str):
+    """Value for an axis from a value for all axes or a map of them."""
+    if isinstance(value, Mapping):
+        return value[name]
+    else:
+        return value
 
 
 class SimulatedStage(microscope.abc.Stage):
@@ -444,6 +820,19 @@ class SimulatedStage(microscope.abc.Stage):
 
     Args:
         limits: map of test axis to be created and their limits.
+        speed: maximum speed of the axes, in units per second, either
+            the same value for all axes or a map of axis name to its
+            speed.  If `None`, the axes move immediately.  See
+            :class:`SimulatedStageAxis`.
+        acceleration: acceleration of the axes, in units per second
+            squared, either the same value for all axes or a map of
+            axis name to its acceleration.
+        settle_time: time, in seconds, for the axes to settle after a
+            move, either the same value for all axes or a map of axis
+            name to its settle time.
+        trigger_bus: simulated trigger line whose pulses advance the
+            stage through a list of positions, when running one with
+            a hardware trigger type.  See :meth:`run_positions`.
 
     .. code-block:: python
 
@@ -460,14 +849,35 @@ class SimulatedStage(microscope.abc.Stage):
             'Z' : AxisLimits(0, 1000),
         })
 
+        # XY stage that takes time to move, with a slower Y axis:
+        xy_stage = SimulatedStage(
+            {'X' : AxisLimits(0, 5000), 'Y' : AxisLimits(0, 5000)},
+            speed={'X': 2000, 'Y': 1000},
+            acceleration=20000,
+            settle_time=0.01,
+        )
+
     """
 
     def __init__(
-        self, limits: Mapping[str, microscope.AxisLimits], **kwargs
+        self,
+        limits: Mapping[str, microscope.AxisLimits],
+        speed: Union[None, float, Mapping[str, float]] = None,
+        acceleration: Union[float, Mapping[str, float]] = 0.0,
+        settle_time: Union[float, Mapping[str, float]] = 0.0,
+        trigger_bus: Optional[SimulatedTriggerBus] = None,
+        **kwargs,
     ) -> None:
         super().__init__(**kwargs)
+        self._trigger_bus = trigger_bus
         self._axes = {
-            name: SimulatedStageAxis(lim) for name, lim in limits.items()
+            name: SimulatedStageAxis(
+                lim,
+                speed=_per_axis(speed, name),
+                acceleration=_per_axis(acceleration, name),
+                settle_time=_per_axis(settle_time, name),
+            )
+            for name, lim in limits.items()
         }
 
     def _do_shutdown(self) -> None:
@@ -480,6 +890,10 @@ class SimulatedStage(microscope.abc.Stage):
     def axes(self) -> Mapping[str, microscope.abc.StageAxis]:
         return self._axes
 
+    def is_moving(self) -> bool:
+        """Whether any of the axes is moving or settling."""
+        return any(axis.is_moving() for axis in self._axes.values())
+
     def move_by(self, delta: Mapping[str, float]) -> None:
         for name, rpos in delta.items():
             self.axes[name].move_by(rpos)
@@ -488,6 +902,83 @@ class SimulatedStage(microscope.abc.Stage):
         for name, pos in position.items():
             self.axes[name].move_to(pos)
 
+    def move_by_async(
+        self, delta: Mapping[str, float]
+    ) -> microscope.abc.StageMove:
+        self.move_by(delta)
+        return microscope.abc.StageMove(self, self.is_moving, self.stop)
+
+    def move_to_async(
+        self, position: Mapping[str, float]
+    ) -> microscope.abc.StageMove:
+        self.move_to(position)
+        return microscope.abc.StageMove(self, self.is_moving, self.stop)
+
+    def stop(self) -> None:
+        """Stop all axes where they are."""
+        for axis in self._axes.values():
+            axis.stop()
+
+    def _move_to_and_wait(self, position: Mapping[str, float]) -> None:
+        self.move_to(position)
+        while self.is_moving():
+            time.sleep(0.001)
+
+    def run_positions(
+        self,
+        positions: Sequence[Mapping[str, float]],
+        dwell: float = 0.0,
+        trigger_type: Optional[microscope.TriggerType] = None,
+    ) -> microscope.abc.StageSequence:
+        """Move through a list of positions.
+
+        Rising edge triggers, on the trigger bus, advance the stage
+        to the next position.  See :meth:`microscope.abc.Stage.run_positions`.
+        """
+        if trigger_type not in (
+            None,
+            microscope.TriggerType.SOFTWARE,
+            microscope.TriggerType.RISING_EDGE,
+        ) or (
+            trigger_type == microscope.TriggerType.RISING_EDGE
+            and self._trigger_bus is None
+        ):
+            raise microscope.UnsupportedFeatureError(
+                "%s triggers are not supported" % trigger_type
+            )
+        if trigger_type != microscope.TriggerType.RISING_EDGE:
+            return microscope.abc._start_threaded_sequence(
+                self,
+                self._move_to_and_wait,
+                positions,
+                dwell,
+                trigger_type,
+                stop=self.stop,
+            )
+
+        # Subscribe before the sequence starts so that it can't finish,
+        # and unsubscribe, before subscribing.
+        bus = self._trigger_bus
+        sequences: List[microscope.abc.StageSequence] = []
+
+        def on_pulse(index: int, pulse_time: float, width: float) -> None:
+            if sequences:
+                sequences[0]._advance.release()
+
+        bus.subscribe(on_pulse)
+        sequences.append(
+            microscope.abc._start_threaded_sequence(
+                self,
+                self._move_to_and_wait,
+                positions,
+                dwell,
+                trigger_type,
+                stop=self.stop,
+                on_finish=lambda: bus.unsubscribe(on_pulse),
+            )
+        )
+        return sequences[0]
+
 
 class SimulatedDigitalIO(microscope.abc.DigitalIO):
     def __init__(self, **kwargs):
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+
+## Copyright (C) 2020 David Miguel Susano Pinto <carandraug@gmail.com>
+##
+## This file is part of Microscope.
+##
+## Microscope is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## Microscope is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with Microscope.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Injection of latency and failures on simulated devices.
+
+The simulated devices respond immediately which makes code that
+controls them look much faster than with real hardware.  The
+functions in this module wrap the methods of a device to add the
+latency, busy periods, and random errors, of real hardware, as
+described by a :class:`CallProfile`.
+
+For example, to make a simulated laser behave like a laser
+controlled via a serial port at 115200 baud, and a simulated stage
+like a Zaber stage:
+
+.. code-block:: python
+
+    from microscope.simulators import SimulatedLightSource, SimulatedStage
+    from microscope.simulators.injection import (
+        SERIAL_LASER,
+        ZABER_STAGE,
+        inject,
+    )
+
+    laser = SimulatedLightSource()
+    inject(laser, SERIAL_LASER)
+
+    stage = SimulatedStage(...)
+    inject(stage, ZABER_STAGE)
+
+To inject latency on devices served by the device server, use
+:func:`injected` to create the device class:
+
+.. code-block:: python
+
+    DEVICES = [
+        device(
+            injected(SimulatedLightSource, SERIAL_LASER),
+            "localhost",
+            8000,
+        ),
+    ]
+
+"""
+
+import copyreg
+import functools
+import logging
+import math
+import random
+import threading
+import time
+from typing import Any, Callable, Iterable, List, Mapping, Optional, Type
+
+import microscope
+import microscope.abc
+
+_logger = logging.getLogger(__name__)
+
+
+class CallProfile:
+    """Latency and failures of the calls to a device.
+
+    Args:
+        latency: mean time, in seconds, that each call takes.
+        jitter: standard deviation, in seconds, of the time that each
+            call takes.  The call time follows a normal distribution,
+            truncated at zero.
+        busy_time: time, in seconds, after each call during which
+            the device is busy.  Calls during the busy period wait
+            until the device is ready.
+        error_probability: probability, between 0 and 1, of a call
+            failing with :class:`microscope.DeviceError`.
+        serialize: whether the device handles only one call at a
+            time, such as devices controlled via a serial port.
+
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        busy_time: float = 0.0,
+        error_probability: float = 0.0,
+        serialize: bool = True,
+    ) -> None:
+        if not 0.0 <= error_probability <= 1.0:
+            raise ValueError("error probability must be in [0 1]")
+        self.latency = latency
+        self.jitter = jitter
+        self.busy_time = busy_time
+        self.error_probability = error_probability
+        self.serialize = serialize
+
+    def __eq__(self, other) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return vars(self) == vars(other)
+
+    def call_latency(
+        self, device: Any, name: str, args: tuple, kwargs: dict
+    ) -> float:
+        """Time, in seconds, that a call to a device method takes."""
+        if self.jitter > 0.0:
+            return max(0.0, random.gauss(self.latency, self.jitter))
+        else:
+            return self.latency
+
+
+class SerialProfile(CallProfile):
+    """Calls to a device controlled via a serial port.
+
+    The latency of each call is the time to transmit a command and
+    its reply, plus the time the device takes to process the command.
+
+    Args:
+        baudrate: the baud rate of the serial port.
+        message_size: number of bytes of each command and reply.
+        processing_time: time, in seconds, that the device takes to
+            process each command.
+        kwargs: other arguments passed on to :class:`CallProfile`.
+
+    """
+
+    def __init__(
+        self,
+        baudrate: int = 115200,
+        message_size: int = 16,
+        processing_time: float = 0.001,
+        **kwargs,
+    ) -> None:
+        # Each byte is sent with one start bit and one stop bit.
+        transmission_time = 2 * message_size * 10.0 / baudrate
+        kwargs.setdefault("latency", transmission_time + processing_time)
+        super().__init__(**kwargs)
+        self.baudrate = baudrate
+        self.message_size = message_size
+        self.processing_time = processing_time
+
+
+def _travel_time(distance: float, speed: float, acceleration: float) -> float:
+    """Time to travel a distance with a trapezoidal velocity profile."""
+    if acceleration <= 0.0 or math.isinf(acceleration):
+        return distance / speed
+    ramp_distance = speed**2 / acceleration
+    if distance >= ramp_distance:
+        return distance / speed + speed / acceleration
+    else:
+        # Never reaches full speed.
+        return 2.0 * math.sqrt(distance / acceleration)
+
+
+class MotionProfile(CallProfile):
+    """Calls to a stage, or stage axis, that block until moved.
+
+    Calls to ``move_by`` and ``move_to`` take the time to travel the
+    distance, with a trapezoidal velocity profile, plus the settle
+    time.  All axes move at the same time so the longest distance
+    sets the time of a move.  Other calls, including
+    ``move_by_async`` and ``move_to_async`` which return once the
+    move starts, take the `latency`.
+
+    Args:
+        speed: maximum speed, in stage units per second.
+        acceleration: acceleration, in stage units per second
+            squared.  If zero, the stage moves at full speed from the
+            start.
+        settle_time: time, in seconds, after the move for the stage
+            to settle.
+        kwargs: other arguments passed on to :class:`CallProfile`.
+
+    """
+
+    def __init__(
+        self,
+        speed: float,
+        acceleration: float = 0.0,
+        settle_time: float = 0.0,
+        **kwargs,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.speed = speed
+        self.acceleration = acceleration
+        self.settle_time = settle_time
+
+    def call_latency(
+        self, device: Any, name: str, args: tuple, kwargs: dict
+    ) -> float:
+        latency = super().call_latency(device, name, args, kwargs)
+        if name not in ("move_by", "move_to"):
+            return latency
+        target = args[0] if args else next(iter(kwargs.values()))
+        if name == "move_by":
+            current = None
+        else:
+            current = device.position
+        if isinstance(target, Mapping):
+            if current is None:
+                distances = [abs(v) for v in target.values()]
+            else:
+                distances = [abs(v - current[k]) for k, v in target.items()]
+        elif current is None:
+            distances = [abs(target)]
+        else:
+            distances = [abs(target - current)]
+        distance = max(distances, default=0.0)
+        return (
+            latency
+            + _travel_time(distance, self.speed, self.acceleration)
+            + self.settle_time
+        )
+
+
+# A laser controlled via a serial port at 115200 baud.
+SERIAL_LASER = SerialProfile(baudrate=115200, processing_time=0.002)
+
+# A Zaber linear stage, with positions in micrometres, controlled via
+# a serial port at 115200 baud.  A command and its reply are about 45
+# bytes, which take 4 milliseconds to transmit, and the controller
+# takes about 1 millisecond to process the command.
+ZABER_STAGE = MotionProfile(
+    speed=5000.0,
+    acceleration=50000.0,
+    settle_time=0.005,
+    latency=0.005,
+)
+
+
+class _InjectionState:
+    """State of the injection shared by all methods of a device."""
+
+    def __init__(self) -> None:
+        self.lock = threading.RLock()
+        # Time, on the monotonic clock, until which the device is
+        # busy after the previous call.
+        self.busy_until = 0.0
+        # Calls made during another call of the same device, such as
+        # a stage moving its axes, are part of that call.
+        self.local = threading.local()
+
+
+# Methods that are not modified by default.  Shutdown should not fail
+# and hardware triggers come from the trigger bus, with their own
+# timing, not from a call to the device.
+_EXCLUDED_METHOD_NAMES = frozenset(["_do_shutdown", "_do_hardware_trigger"])
+
+_STAGE_METHOD_NAMES = frozenset(
+    ["move_by", "move_to", "move_by_async", "move_to_async"]
+)
+
+
+def _default_method_names(device: Any) -> List[str]:
+    """Names of the methods that talk to the hardware.
+
+    These are the ``_do_*`` methods that device classes implement,
+    and the move methods of stages.
+    """
+    names = []
+    for name in dir(device):
+        if (
+            name.startswith("_do_") and name not in _EXCLUDED_METHOD_NAMES
+        ) or name in _STAGE_METHOD_NAMES:
+            if callable(getattr(device, name)):
+                names.append(name)
+    return names
+
+
+def _wrap_method(
+    device: Any,
+    name: str,
+    method: Callable,
+    profile: CallProfile,
+    state: _InjectionState,
+) -> Callable:
+    def call(*args, **kwargs):
+        wait = state.busy_until - time.monotonic()
+        if wait > 0.0:
+            time.sleep(wait)
+        time.sleep(profile.call_latency(device, name, args, kwargs))
+        if random.random() < profile.error_probability:
+            state.busy_until = time.monotonic() + profile.busy_time
+            raise microscope.DeviceError("injected failure on %s" % name)
+        try:
+            return method(*args, **kwargs)
+        finally:
+            state.busy_until = time.monotonic() + profile.busy_time
+
+    def outer_call(*args, **kwargs):
+        state.local.in_call = True
+        try:
+            return call(*args, **kwargs)
+        finally:
+            state.local.in_call = False
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        if getattr(state.local, "in_call", False):
+            return method(*args, **kwargs)
+        elif profile.serialize:
+            with state.lock:
+                return outer_call(*args, **kwargs)
+        else:
+            return outer_call(*args, **kwargs)
+
+    return wrapper
+
+
+def inject(
+    device: Any, profile: CallProfile, methods: Optional[Iterable[str]] = None
+) -> None:
+    """Inject latency and failures on the methods of a device.
+
+    The methods are replaced on the device instance only, other
+    instances of the same class are not affected.  If the methods
+    are not specified and the device is a stage, the methods of its
+    axes are also replaced.  Calls made while another call to the
+    same device is running, such as a stage moving its axes, take no
+    extra time.
+
+    Args:
+        device: the device, or any other object, to modify.
+        profile: the latency and failures to inject.
+        methods: names of the methods to modify.  Defaults to the
+            methods that, on a real device, would talk to the
+            hardware, i.e., the ``_do_*`` methods, except
+            ``_do_shutdown`` and ``_do_hardware_trigger``, and the
+            ``move_by``, ``move_to``, ``move_by_async``, and
+            ``move_to_async`` methods of stages and stage axes.
+    """
+    state = _InjectionState()
+    if methods is not None:
+        targets = [(device, methods)]
+    else:
+        targets = [(device, _default_method_names(device))]
+        if isinstance(device, microscope.abc.Stage):
+            targets.extend(
+                (axis, _default_method_names(axis))
+                for axis in device.axes.values()
+            )
+    for target, names in targets:
+        for name in names:
+            method = getattr(target, name)
+            setattr(
+                target,
+                name,
+                _wrap_method(target, name, method, profile, state),
+            )
+
+
+class _InjectedDeviceType(type(microscope.abc.Device)):
+    """Type of the device classes created by :func:`injected`.
+
+    These classes are created at runtime so they can't be pickled by
+    reference, which the device server needs to do.  They are pickled
+    with the arguments to create them instead.  Classes created with
+    the same arguments are equal, so that the device server does not
+    see a change in the device when the configuration is reloaded.
+    """
+
+    def __eq__(cls, other) -> bool:
+        if not isinstance(other, _InjectedDeviceType):
+            return NotImplemented
+        return cls._injection_args == other._injection_args
+
+    def __hash__(cls) -> int:
+        return hash(cls._injection_args[0])
+
+
+def _reduce_injected_device_type(cls: _InjectedDeviceType):
+    return injected, cls._injection_args
+
+
+copyreg.pickle(_InjectedDeviceType, _reduce_injected_device_type)
+
+
+def injected(
+    cls: Type[microscope.abc.Device],
+    profile: CallProfile,
+    methods: Optional[Iterable[str]] = None,
+) -> Type[microscope.abc.Device]:
+    """Subclass of a device class with latency and failures injected.
+
+    This is useful when the device is constructed elsewhere, such as
+    by the device server.  The subclass can be pickled and subclasses
+    created with the same arguments are equal.  See :func:`inject`
+    for the arguments.
+    """
+    if methods is not None:
+        methods = tuple(methods)
+
+    def __init__(self, *args, **kwargs):
+        cls.__init__(self, *args, **kwargs)
+        inject(self, profile, methods)
+
+    return _InjectedDeviceType(
+        cls.__name__,
+        (cls,),
+        {
+            "__init__": __init__,
+            "__module__": __name__,
+            "_injection_args": (cls, profile, methods),
+        },
+    )
@@ -21,9 +21,10 @@
 """Simulation of a full setup based on a given image file.
 """
 
+import collections
 import logging
 import time
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 
 import numpy as np
 import PIL.Image
@@ -39,6 +40,89 @@ from microscope.simulators import (
 
 _logger = logging.getLogger(__name__)
 
+# The blur, i.e., the sigma of the gaussian filter, is rounded to a
+# multiple of this, in pixels, so that there is a finite set of blur
+# levels whose kernels can be cached.
+_BLUR_STEP = 0.25
+
+# Number of images, at different positions, to keep.
+_FRAME_CACHE_SIZE = 16
+
+
+def _gaussian_kernel(sigma: float) -> np.ndarray:
+    """1D gaussian kernel, truncated at 4 sigma like `gaussian_filter`."""
+    radius = int(4.0 * sigma + 0.5)
+    x = np.arange(-radius, radius + 1, dtype=np.float64)
+    kernel = np.exp(-0.5 * (x / sigma) ** 2)
+    return kernel / kernel.sum()
+
+
+class _TileCache:
+    """Least recently used cache of tiles of a large image.
+
+    Reading a region of a memory-mapped image reads from disk every
+    time.  This keeps the tiles of the image that were read recently,
+    one channel at a time, so that reading regions near the previous
+    ones, as when moving a stage, only reads the new tiles.
+
+    Args:
+        image: array, usually memory-mapped, with shape (height,
+            width, channels).
+        tile_size: width and height of the tiles.
+        max_tiles: maximum number of tiles to keep.
+    """
+
+    def __init__(
+        self, image: np.ndarray, tile_size: int = 512, max_tiles: int = 64
+    ) -> None:
+        self._image = image
+        self._tile_size = tile_size
+        self._max_tiles = max_tiles
+        # Map of (tile row, tile column, channel) to tile, in order of
+        # use, least recently used first.
+        self._tiles = collections.OrderedDict()
+
+    def _get_tile(self, ty: int, tx: int, channel: int) -> np.ndarray:
+        key = (ty, tx, channel)
+        tile = self._tiles.get(key)
+        if tile is None:
+            y0 = ty * self._tile_size
+            x0 = tx * self._tile_size
+            tile = np.ascontiguousarray(
+                self._image[
+                    y0 : y0 + self._tile_size,
+                    x0 : x0 + self._tile_size,
+                    channel,
+                ]
+            )
+            self._tiles[key] = tile
+            if len(self._tiles) > self._max_tiles:
+                self._tiles.popitem(last=False)
+        else:
+            self._tiles.move_to_end(key)
+        return tile
+
+    def read(
+        self, y0: int, y1: int, x0: int, x1: int, channel: int
+    ) -> np.ndarray:
+        """Read region of one channel.  Must be within the image."""
+        region = np.empty((y1 - y0, x1 - x0), dtype=self._image.dtype)
+        size = self._tile_size
+        for ty in range(y0 // size, (y1 - 1) // size + 1):
+            for tx in range(x0 // size, (x1 - 1) // size + 1):
+                tile = self._get_tile(ty, tx, channel)
+                # Intersection of the tile and the region, in image
+                # coordinates.
+                iy0 = max(y0, ty * size)
+                iy1 = min(y1, ty * size + tile.shape[0])
+                ix0 = max(x0, tx * size)
+                ix1 = min(x1, tx * size + tile.shape[1])
+                region[iy0 - y0 : iy1 - y0, ix0 - x0 : ix1 - x0] = tile[
+                    iy0 - ty * size : iy1 - ty * size,
+                    ix0 - tx * size : ix1 - tx * size,
+                ]
+        return region
+
 
 class StageAwareCamera(SimulatedCamera):
     """Simulated camera that returns subregions of image based on stage
@@ -54,6 +138,11 @@ class StageAwareCamera(SimulatedCamera):
         stage: stage to read coordinates from.  Must have an "x",
             "y", and "z" axis.
         filterwheel: filter wheel to read position.
+        tile_cache_size: number of tiles, of 512x512 pixels, of the
+            image to keep in memory.  Only relevant if `image` is a
+            memory-mapped array, e.g., from :func:`numpy.load` with
+            `mmap_mode`, when it defaults to 64.  If zero, the image
+            is read directly each time.
 
     """
 
@@ -62,10 +151,27 @@ class StageAwareCamera(SimulatedCamera):
         image: np.ndarray,
         stage: microscope.abc.Stage,
         filterwheel: microscope.abc.FilterWheel,
+        tile_cache_size: Optional[int] = None,
         **kwargs,
     ) -> None:
         super().__init__(**kwargs)
         self._image = image
+        if tile_cache_size is None:
+            tile_cache_size = 64 if isinstance(image, np.memmap) else 0
+        if tile_cache_size > 0:
+            self._tile_cache: Optional[_TileCache] = _TileCache(
+                image, max_tiles=tile_cache_size
+            )
+        else:
+            self._tile_cache = None
+
+        # Gaussian kernels by blur level.
+        self._blur_kernels: Dict[int, np.ndarray] = {}
+        # Buffer for the first pass of the separable blur.
+        self._blur_buffer = np.empty((0, 0), dtype=image.dtype)
+        # Map of image region, channel, and blur level, to image, in
+        # order of use, least recently used first.
+        self._frame_cache = collections.OrderedDict()
         self._stage = stage
         self._filterwheel = filterwheel
         self._pixel_size = 1.0
@@ -94,6 +200,41 @@ class StageAwareCamera(SimulatedCamera):
             values=(0.0, float("inf")),
         )
 
+    def _read_image(
+        self, y0: int, y1: int, x0: int, x1: int, channel: int
+    ) -> np.ndarray:
+        if self._tile_cache is not None:
+            return self._tile_cache.read(y0, y1, x0, x1, channel)
+        else:
+            # Not a memmap, even if the image is, so that it can be
+            # sent to a client.
+            return np.asarray(self._image[y0:y1, x0:x1, channel])
+
+    def _blur(self, image: np.ndarray, level: int) -> np.ndarray:
+        """Blur image with a gaussian filter of the given blur level."""
+        if level == 0:
+            return image
+        kernel = self._blur_kernels.get(level)
+        if kernel is None:
+            kernel = _gaussian_kernel(level * _BLUR_STEP)
+            self._blur_kernels[level] = kernel
+        if (
+            self._blur_buffer.shape != image.shape
+            or self._blur_buffer.dtype != image.dtype
+        ):
+            self._blur_buffer = np.empty(image.shape, dtype=image.dtype)
+        # A 2D gaussian filter is separable in two 1D filters.  Like
+        # scipy.ndimage.gaussian_filter, the intermediate result has
+        # the image data type.
+        scipy.ndimage.correlate1d(
+            image, kernel, axis=0, output=self._blur_buffer, mode="reflect"
+        )
+        output = np.empty(image.shape, dtype=image.dtype)
+        scipy.ndimage.correlate1d(
+            self._blur_buffer, kernel, axis=1, output=output, mode="reflect"
+        )
+        return output
+
     def _fetch_data(self) -> Optional[np.ndarray]:
         if not self._acquiring or self._triggered == 0:
             return None
@@ -109,12 +250,39 @@ class StageAwareCamera(SimulatedCamera):
         height = self._roi.height // self._binning.v
 
         # Use stage position to compute bounding box.
-        xstart = int(
-            (self._stage.position["x"] / self._pixel_size) - (width / 2)
-        )
-        ystart = int(
-            (self._stage.position["y"] / self._pixel_size) - (height / 2)
-        )
+        position = self._stage.position
+        xstart = int((position["x"] / self._pixel_size) - (width / 2))
+        ystart = int((position["y"] / self._pixel_size) - (height / 2))
+
+        # Gaussian filter on abs Z position to simulate being out of
+        # focus (Z position zero is in focus).
+        blur_level = int(round(abs(position["z"] / 10.0) / _BLUR_STEP))
+
+        # Images at the same position are only computed once.
+        key = (xstart, ystart, width, height, channel, blur_level)
+        image = self._frame_cache.get(key)
+        if image is None:
+            image = self._create_image(
+                xstart, ystart, width, height, channel, blur_level
+            )
+            self._frame_cache[key] = image
+            if len(self._frame_cache) > _FRAME_CACHE_SIZE:
+                self._frame_cache.popitem(last=False)
+        else:
+            self._frame_cache.move_to_end(key)
+
+        self._sent += 1
+        return image
+
+    def _create_image(
+        self,
+        xstart: int,
+        ystart: int,
+        width: int,
+        height: int,
+        channel: int,
+        blur_level: int,
+    ) -> np.ndarray:
         xend = xstart + width
         yend = ystart + height
 
@@ -139,26 +307,30 @@ class StageAwareCamera(SimulatedCamera):
             sub_x1 = sub_x0 + (img_x1 - img_x0)
             sub_y1 = sub_y0 + (img_y1 - img_y0)
 
-            subsection[sub_y0:sub_y1, sub_x0:sub_x1] = self._image[
-                img_y0:img_y1, img_x0:img_x1, channel
-            ]
+            if img_x1 > img_x0 and img_y1 > img_y0:
+                subsection[sub_y0:sub_y1, sub_x0:sub_x1] = self._read_image(
+                    img_y0, img_y1, img_x0, img_x1, channel
+                )
         else:
-            subsection = self._image[ystart:yend, xstart:xend, channel]
+            subsection = self._read_image(ystart, yend, xstart, xend, channel)
 
-        # Gaussian filter on abs Z position to simulate being out of
-        # focus (Z position zero is in focus).
-        blur = abs((self._stage.position["z"]) / 10.0)
-        image = scipy.ndimage.gaussian_filter(subsection, blur)
+        image = self._blur(subsection, blur_level)
 
-        self._sent += 1
         # Not sure this flipping is correct but it's required to make
         # cockpit mosaic work.  This is probably related to not having
         # defined what the image origin should be (see issue #89).
-        return np.fliplr(np.flipud(image))
+        image = np.fliplr(np.flipud(image))
+        # The same image may be sent multiple times, maybe to a client
+        # on the same process, so make it read-only.
+        image.flags.writeable = False
+        return image
 
 
 def simulated_setup_from_image(
-    filepath: str, **kwargs
+    filepath: str,
+    shape: Optional[Tuple[int, int, int]] = None,
+    dtype: str = "uint8",
+    **kwargs,
 ) -> Dict[str, microscope.abc.Device]:
     """Create simulated devices given an image file.
 
@@ -168,17 +340,36 @@ def simulated_setup_from_image(
             device(simulated_setup_from_image, 'localhost', 8000,
                    conf={'filepath': path_to_image_file}),
         ]
+
+    Image files are read into memory.  For images too large for that,
+    use a NumPy ``.npy`` file or a raw file which are memory-mapped
+    instead.  Only the parts of the image under the camera field of
+    view are then read.
+
+    Args:
+        filepath: path to an image file, a NumPy ``.npy`` file, or a
+            raw file.  The image must have shape (height, width,
+            channels).
+        shape: shape of the image in a raw file.  If set, `filepath`
+            is read as a raw file.
+        dtype: data type of the image in a raw file.
+
     """
-    # PIL will error if trying to open very large images to avoid
-    # decompression bomb DOS attack.  However, this is used to fake a
-    # stage and will really have very very large images, so remove
-    # remove the PIL limit temporarily.
-    original_pil_max_image_pixels = PIL.Image.MAX_IMAGE_PIXELS
-    try:
-        PIL.Image.MAX_IMAGE_PIXELS = None
-        image = np.array(PIL.Image.open(filepath))
-    finally:
-        PIL.Image.MAX_IMAGE_PIXELS = original_pil_max_image_pixels
+    if shape is not None:
+        image = np.memmap(filepath, dtype=dtype, mode="r", shape=shape)
+    elif filepath.endswith(".npy"):
+        image = np.load(filepath, mmap_mode="r")
+    else:
+        # PIL will error if trying to open very large images to avoid
+        # decompression bomb DOS attack.  However, this is used to
+        # fake a stage and will really have very very large images,
+        # so remove remove the PIL limit temporarily.
+        original_pil_max_image_pixels = PIL.Image.MAX_IMAGE_PIXELS
+        try:
+            PIL.Image.MAX_IMAGE_PIXELS = None
+            image = np.array(PIL.Image.open(filepath))
+        finally:
+            PIL.Image.MAX_IMAGE_PIXELS = original_pil_max_image_pixels
 
     if len(image.shape) < 3:
         raise ValueError("not an RGB image")
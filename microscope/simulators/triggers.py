@@ -0,0 +1,523 @@
+#!/usr/bin/env python3
+
+## Copyright (C) 2020 David Miguel Susano Pinto <carandraug@gmail.com>
+##
+## This file is part of Microscope.
+##
+## Microscope is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## Microscope is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with Microscope.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Simulation of hardware triggers.
+
+A :class:`SimulatedTriggerBus` is a trigger line shared by simulated
+devices, possibly on different processes.  A
+:class:`SimulatedTriggerSource` device sends pulses on the bus, for
+example at a fixed rate, and the simulated devices that are set to
+:attr:`microscope.TriggerType.RISING_EDGE` act on them, according to
+their readout time, jitter, and probability of missing a trigger.
+
+For example, to have a camera and a light source on separate device
+servers triggered by the same source, the device server
+configuration would be:
+
+.. code-block:: python
+
+    from microscope.device_server import device
+    from microscope.simulators import SimulatedCamera, SimulatedLightSource
+    from microscope.simulators.triggers import (
+        SimulatedTriggerBus,
+        SimulatedTriggerSource,
+    )
+
+    # The name keeps the same bus when the configuration is reloaded.
+    bus = SimulatedTriggerBus(name="main")
+
+    DEVICES = [
+        device(SimulatedTriggerSource, "localhost", 8000, {"bus": bus}),
+        device(
+            SimulatedCamera,
+            "localhost",
+            8001,
+            {"trigger_bus": bus, "readout_time": 0.01},
+        ),
+        device(SimulatedLightSource, "localhost", 8002, {"trigger_bus": bus}),
+    ]
+
+"""
+
+import atexit
+import collections
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+import microscope
+import microscope.abc
+
+_logger = logging.getLogger(__name__)
+
+
+# Number of pulses kept on the bus.  A subscriber that is slower than
+# this number of pulses misses the older ones.
+_BUS_RING_SIZE = 1024
+
+# Size, in bytes, of the bus header which has the number of pulses
+# sent and the pulse width.
+_BUS_HEADER_SIZE = 16
+
+
+def _remove_bus_file(path: str, owner_pid: int) -> None:
+    # Forked processes inherit the atexit functions but they are not
+    # the owners of the bus.
+    if os.getpid() == owner_pid and os.path.exists(path):
+        os.remove(path)
+
+
+class SimulatedTriggerBus:
+    """Trigger line shared between simulated devices.
+
+    The state of the bus, i.e., the number of pulses sent and the
+    time of the most recent ones, is kept on a memory-mapped file so
+    that it is shared between processes.  Devices on other processes
+    can attach to the bus by its path.  A bus is also attached when
+    unpickled, so it can be passed as an argument to devices served
+    on different processes by the device server.
+
+    Pulses are read from the shared memory by a thread that calls the
+    subscribed functions.  Because the time of each pulse is part of
+    the shared state, the polling interval adds to the latency of the
+    simulated devices but does not change their timing model.
+
+    Time is measured with :func:`time.monotonic` which is the same
+    clock on all processes.
+
+    The file is removed when the bus is closed or when the process
+    that created it exits.  Buses are equal if they use the same
+    file.  A bus with a name always uses the same file, so that the
+    device server sees the same bus when its configuration is
+    reloaded.  Creating a bus with the name of an existing bus
+    attaches to it.
+
+    Args:
+        pulse_width: duration, in seconds, of each pulse.
+        poll_interval: time, in seconds, between checks for new
+            pulses.
+        name: name of the bus.  If `None`, the bus gets a new file
+            and so is different from all other buses.
+
+    """
+
+    def __init__(
+        self,
+        pulse_width: float = 0.001,
+        poll_interval: float = 0.0005,
+        name: Optional[str] = None,
+    ) -> None:
+        # On Linux, /dev/shm is backed by memory instead of disk.
+        shm_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+        prefix = "microscope-trigger-bus-"
+        if name is None:
+            fd, path = tempfile.mkstemp(prefix=prefix, dir=shm_dir)
+        else:
+            if os.sep in name or (os.altsep and os.altsep in name):
+                raise ValueError("name must not have path separators")
+            path = os.path.join(
+                shm_dir or tempfile.gettempdir(), prefix + name
+            )
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        with os.fdopen(fd, "r+b") as fh:
+            # Keep the pulses of an existing bus with the same name.
+            size = _BUS_HEADER_SIZE + 8 * _BUS_RING_SIZE
+            if os.fstat(fh.fileno()).st_size < size:
+                fh.truncate(size)
+        self._open(path, poll_interval)
+        self._pulse_width[0] = pulse_width
+        # Only the process that created the bus removes its file.
+        self._owner_pid = os.getpid()
+        atexit.register(_remove_bus_file, path, self._owner_pid)
+
+    @classmethod
+    def attach(
+        cls, path: str, poll_interval: float = 0.0005
+    ) -> "SimulatedTriggerBus":
+        """Attach to a bus created by another process."""
+        bus = cls.__new__(cls)
+        bus._open(path, poll_interval)
+        bus._owner_pid = None
+        return bus
+
+    def _open(self, path: str, poll_interval: float) -> None:
+        self._path = path
+        self._poll_interval = poll_interval
+        self._count = np.memmap(path, dtype=np.uint64, mode="r+", shape=(1,))
+        self._pulse_width = np.memmap(
+            path, dtype=np.float64, mode="r+", offset=8, shape=(1,)
+        )
+        self._times = np.memmap(
+            path,
+            dtype=np.float64,
+            mode="r+",
+            offset=_BUS_HEADER_SIZE,
+            shape=(_BUS_RING_SIZE,),
+        )
+        self._fire_lock = threading.Lock()
+        self._subscribers_lock = threading.Lock()
+        self._subscribers: List[Callable[[int, float, float], None]] = []
+        self._watcher: Optional[threading.Thread] = None
+
+    def __getstate__(self):
+        return {"path": self._path, "poll_interval": self._poll_interval}
+
+    def __setstate__(self, state) -> None:
+        self._open(state["path"], state["poll_interval"])
+        self._owner_pid = None
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, SimulatedTriggerBus):
+            return NotImplemented
+        return self._path == other._path
+
+    def __hash__(self) -> int:
+        return hash(self._path)
+
+    @property
+    def path(self) -> str:
+        """Path to the file with the state of the bus."""
+        return self._path
+
+    @property
+    def pulse_width(self) -> float:
+        return float(self._pulse_width[0])
+
+    @property
+    def count(self) -> int:
+        """Number of pulses sent on the bus."""
+        return int(self._count[0])
+
+    def fire(self, pulse_time: Optional[float] = None) -> None:
+        """Send a pulse on the bus.
+
+        Only one process should send pulses on a bus.
+
+        Args:
+            pulse_time: time of the pulse rising edge on the
+                :func:`time.monotonic` clock.  Defaults to now.
+        """
+        if pulse_time is None:
+            pulse_time = time.monotonic()
+        with self._fire_lock:
+            count = int(self._count[0])
+            # Write the time before incrementing the count so that a
+            # subscriber never reads the count of a pulse without
+            # its time.
+            self._times[count % _BUS_RING_SIZE] = pulse_time
+            self._count[0] = count + 1
+
+    def subscribe(self, callback: Callable[[int, float, float], None]) -> None:
+        """Call function on each new pulse.
+
+        The function is called, on a separate thread, with the index
+        of the pulse, its time, and its width.  Only pulses sent after
+        subscribing are passed to the function.
+        """
+        with self._subscribers_lock:
+            self._subscribers.append(callback)
+            if self._watcher is None or not self._watcher.is_alive():
+                self._watcher = threading.Thread(
+                    target=self._watch, args=(self.count,), daemon=True
+                )
+                self._watcher.start()
+
+    def unsubscribe(self, callback: Callable[[int, float, float], None]):
+        """Stop calling a function previously subscribed.
+
+        It is not an error if the function is not subscribed, such as
+        after the bus is closed.
+        """
+        with self._subscribers_lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def _watch(self, seen: int) -> None:
+        while True:
+            with self._subscribers_lock:
+                if not self._subscribers:
+                    self._watcher = None
+                    return
+                subscribers = list(self._subscribers)
+            count = int(self._count[0])
+            if count - seen > _BUS_RING_SIZE:
+                _logger.warning(
+                    "lost %d pulses on trigger bus",
+                    count - seen - _BUS_RING_SIZE,
+                )
+                seen = count - _BUS_RING_SIZE
+            for index in range(seen, count):
+                pulse_time = float(self._times[index % _BUS_RING_SIZE])
+                for callback in subscribers:
+                    try:
+                        callback(index, pulse_time, self.pulse_width)
+                    except Exception:
+                        _logger.exception("failed to handle trigger pulse")
+            seen = count
+            time.sleep(self._poll_interval)
+
+    def close(self) -> None:
+        """Stop calling the subscribers and remove the bus file.
+
+        The file is only removed if this is the process that created
+        the bus.
+        """
+        with self._subscribers_lock:
+            self._subscribers.clear()
+        if self._owner_pid is not None:
+            _remove_bus_file(self._path, self._owner_pid)
+
+
+class SimulatedTriggerSource(microscope.abc.Device):
+    """Device that sends pulses on a simulated trigger bus.
+
+    The pulses are scheduled at fixed times, so the rate does not
+    drift with the time it takes to send each pulse.
+
+    Args:
+        bus: the trigger bus to send pulses on.
+
+    """
+
+    def __init__(self, bus: SimulatedTriggerBus, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self._bus = bus
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def _do_shutdown(self) -> None:
+        self.stop()
+
+    def _do_disable(self):
+        self.stop()
+
+    def fire(self) -> None:
+        """Send a single pulse now."""
+        self._bus.fire()
+
+    def start(self, rate: float, count: Optional[int] = None) -> None:
+        """Start sending pulses at a fixed rate.
+
+        Args:
+            rate: number of pulses per second.
+            count: number of pulses to send.  If `None`, keeps
+                sending pulses until :meth:`stop` is called.
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.stop()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(1.0 / rate, count, self._stop_event),
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sending pulses."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def is_running(self) -> bool:
+        """Whether pulses are being sent."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(
+        self, period: float, count: Optional[int], stop: threading.Event
+    ) -> None:
+        start_time = time.monotonic()
+        index = 0
+        while count is None or index < count:
+            pulse_time = start_time + index * period
+            delay = pulse_time - time.monotonic()
+            if stop.wait(max(delay, 0.0)):
+                break
+            self._bus.fire(pulse_time)
+            index += 1
+
+
+class SimulatedTriggerTargetMixin(microscope.abc.TriggerTargetMixin):
+    """Mixin for simulated devices that can be triggered by a bus.
+
+    The device is triggered by software until :meth:`set_trigger` is
+    called with :attr:`microscope.TriggerType.RISING_EDGE`, after
+    which it acts on the pulses of its trigger bus.  Each pulse
+    follows a simple timing model:
+
+    1. the pulse may be missed, with a fixed probability;
+
+    2. the device acts after a random delay, between zero and the
+       trigger jitter;
+
+    3. the device is then busy, for example exposing and reading out
+       the sensor, and misses the pulses it receives until it is
+       ready again.
+
+    Classes using this mixin set `_simulated_trigger_mode` to their
+    only trigger mode and implement :meth:`_do_hardware_trigger`.
+
+    Args:
+        trigger_bus: the trigger bus used for hardware triggers.  If
+            `None`, the device only supports software triggers.
+        readout_time: time, in seconds, after acting on a trigger
+            during which the device is busy, such as the time to
+            read out a camera sensor or for a mirror to settle.
+        trigger_jitter: maximum delay, in seconds, between the
+            trigger and the device acting on it.
+        missed_trigger_probability: probability, between 0 and 1, of
+            the device missing a trigger.
+
+    """
+
+    _simulated_trigger_mode = microscope.TriggerMode.ONCE
+
+    def __init__(
+        self,
+        trigger_bus: Optional[SimulatedTriggerBus] = None,
+        readout_time: float = 0.0,
+        trigger_jitter: float = 0.0,
+        missed_trigger_probability: float = 0.0,
+        **kwargs,
+    ) -> None:
+        super().__init__(**kwargs)
+        if not 0.0 <= missed_trigger_probability <= 1.0:
+            raise ValueError("missed trigger probability must be in [0 1]")
+        self._trigger_bus = trigger_bus
+        self._readout_time = readout_time
+        self._trigger_jitter = trigger_jitter
+        self._missed_trigger_probability = missed_trigger_probability
+        self._trigger_type = microscope.TriggerType.SOFTWARE
+        self._trigger_lock = threading.Lock()
+        # Time, on the monotonic clock, until which the device is
+        # busy acting on the previous trigger.
+        self._busy_until = 0.0
+        self._trigger_counts = {"received": 0, "missed": 0}
+        # Index, pulse time, and action time of the most recent
+        # triggers that the device acted on.
+        self._trigger_log: Deque[Tuple[int, float, float]] = collections.deque(
+            maxlen=1024
+        )
+
+    @property
+    def trigger_type(self) -> microscope.TriggerType:
+        return self._trigger_type
+
+    @property
+    def trigger_mode(self) -> microscope.TriggerMode:
+        return self._simulated_trigger_mode
+
+    def set_trigger(
+        self, ttype: microscope.TriggerType, tmode: microscope.TriggerMode
+    ) -> None:
+        if tmode is not self._simulated_trigger_mode:
+            raise microscope.UnsupportedFeatureError(
+                "the only trigger mode supported is '%s'"
+                % self._simulated_trigger_mode.name.lower()
+            )
+        if ttype is microscope.TriggerType.SOFTWARE:
+            if self._trigger_type is not ttype:
+                self._trigger_bus.unsubscribe(self._handle_pulse)
+        elif ttype is microscope.TriggerType.RISING_EDGE:
+            if self._trigger_bus is None:
+                raise microscope.UnsupportedFeatureError(
+                    "hardware trigger requires a trigger bus"
+                )
+            if self._trigger_type is not ttype:
+                self._trigger_bus.subscribe(self._handle_pulse)
+        else:
+            raise microscope.UnsupportedFeatureError(
+                "the only trigger types supported are software and"
+                " rising edge"
+            )
+        self._trigger_type = ttype
+
+    def _disconnect_trigger_bus(self) -> None:
+        """Stop receiving triggers from the bus, e.g., on shutdown."""
+        if self._trigger_type is not microscope.TriggerType.SOFTWARE:
+            self._trigger_bus.unsubscribe(self._handle_pulse)
+            self._trigger_type = microscope.TriggerType.SOFTWARE
+
+    def _trigger_busy_time(self, pulse_width: float) -> float:
+        """Time, in seconds, that the device is busy after a trigger."""
+        return self._readout_time
+
+    def _handle_pulse(
+        self, index: int, pulse_time: float, pulse_width: float
+    ) -> None:
+        with self._trigger_lock:
+            self._trigger_counts["received"] += 1
+            if random.random() < self._missed_trigger_probability:
+                self._trigger_counts["missed"] += 1
+                _logger.debug("missed trigger %d (random)", index)
+                return
+            action_time = pulse_time + random.uniform(
+                0.0, self._trigger_jitter
+            )
+            if action_time < self._busy_until:
+                self._trigger_counts["missed"] += 1
+                _logger.debug("missed trigger %d (device busy)", index)
+                return
+            self._busy_until = action_time + self._trigger_busy_time(
+                pulse_width
+            )
+            self._trigger_log.append((index, pulse_time, action_time))
+        self._do_hardware_trigger(action_time, pulse_width)
+
+    def _do_hardware_trigger(
+        self, action_time: float, pulse_width: float
+    ) -> None:
+        """Act on a trigger from the bus.
+
+        This is called on the bus thread, so it should not block.  By
+        default, it calls :meth:`_do_trigger`.
+
+        Args:
+            action_time: time, on the :func:`time.monotonic` clock,
+                when the device acts on the trigger.  This may be in
+                the future, up to the trigger jitter.
+            pulse_width: duration, in seconds, of the trigger pulse.
+        """
+        self._do_trigger()
+
+    def get_trigger_statistics(self) -> Dict[str, int]:
+        """Number of hardware triggers received and missed.
+
+        This method is not part of the device ABC, it only exists on
+        simulated devices to help testing hardware-timed experiments.
+        """
+        with self._trigger_lock:
+            return dict(self._trigger_counts)
+
+    def get_trigger_log(self) -> List[Tuple[int, float, float]]:
+        """Index, pulse time, and action time of the recent triggers.
+
+        This method is not part of the device ABC, it only exists on
+        simulated devices to help testing hardware-timed experiments.
+        """
+        with self._trigger_lock:
+            return list(self._trigger_log)
@@ -1355,6 +1355,20 @@ class _LinkamMDSMixin:
         # Allow time for status structures to indicate stage is moving
         time.sleep(5 * self.get_data_rate())
 
+    def move_to_async(self, x=None, y=None, z=None):
+        """Move to co-ordinates given by x and y, returning a StageMove.
+
+        The returned :class:`microscope.abc.StageMove` can be used to
+        wait for the move to finish or to stop the motors."""
+        self.move_to(x, y, z)
+        return microscope.abc.StageMove(self, self.is_moving, self.stop_motors)
+
+    def stop_motors(self):
+        """Stop all motors where they are."""
+        for axis, flag in enumerate("XYZ"):
+            if getattr(self._stageconfig.flags, "motor" + flag):
+                self._process_msg(Msg.StartMotors, False, axis)
+
     def get_status(self, *args):
         """Includes MDSStatus in the get_status call."""
         return super().get_status(*args, self._mdsstatus)
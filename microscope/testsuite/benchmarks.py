@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+
+## Copyright (C) 2020 David Miguel Susano Pinto <carandraug@gmail.com>
+##
+## This file is part of Microscope.
+##
+## Microscope is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## Microscope is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with Microscope.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Benchmark of image acquisition and transport.
+
+This starts a device server with :class:`SimulatedCamera` devices,
+on the loopback interface, and acquires images with
+:class:`DataClient` for each combination of ROI size, data type,
+number of clients, and trigger rate.  It reports the number of
+frames and megabytes per second, the latency between acquisition and
+reception of each image, and the CPU time per frame.  Run it like
+so::
+
+    python -m microscope.testsuite.benchmarks --output results.json
+
+The results are saved in JSON so that different versions can be
+compared.  Each client gets images from its own camera because a
+:class:`DataDevice` only sends data to one client at a time.
+
+"""
+
+import argparse
+import dataclasses
+import datetime
+import itertools
+import json
+import logging
+import multiprocessing
+import platform
+import queue
+import sys
+import threading
+import time
+import urllib.request
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import Pyro4
+
+import microscope
+import microscope.clients
+import microscope.device_server
+import microscope.simulators
+
+try:
+    import importlib.metadata as importlib_metadata
+except ImportError:
+    # importlib.metadata is only available in Python 3.8 or later.
+    importlib_metadata = None
+
+_logger = logging.getLogger(__name__)
+
+
+# Must match the order of data types of the SimulatedCamera "image
+# data type" setting.
+_DTYPES = ("uint8", "uint16", "float")
+
+_HOST = "127.0.0.1"
+
+
+@dataclasses.dataclass(frozen=True)
+class BenchmarkCase:
+    """Parameters of a single benchmark.
+
+    Args:
+        roi_size: width and height of the images in pixels.
+        dtype: name of the image data type.
+        n_clients: number of clients, each receiving images from its
+            own camera.
+        trigger_rate: number of triggers per second sent to each
+            camera.  If `None`, a camera is triggered as soon as the
+            previous image is received.
+        frame_bank_size: number of images pre-rendered by the
+            cameras.  If zero, the cameras render each image, which
+            limits the frame rate.
+    """
+
+    roi_size: int
+    dtype: str
+    n_clients: int
+    trigger_rate: Optional[float]
+    frame_bank_size: int = 0
+
+
+@dataclasses.dataclass(frozen=True)
+class BenchmarkResult:
+    """Measurements of a single benchmark.
+
+    Frames and megabytes per second are the sum over all clients.
+    Latency is the time between the camera acquiring an image and the
+    client receiving it.  CPU time is divided by the number of frames
+    received.
+    """
+
+    case: BenchmarkCase
+    n_frames: int
+    duration: float
+    frames_per_second: float
+    megabytes_per_second: float
+    latency_p50: float
+    latency_p99: float
+    server_cpu_per_frame: float
+    client_cpu_per_frame: float
+
+
+class _TimingDataClient(microscope.clients.DataClient):
+    """DataClient that records the time of reception of each image.
+
+    Only the size of the image is kept, not the image itself.
+    """
+
+    @Pyro4.expose
+    @Pyro4.oneway
+    def receiveData(self, data, timestamp, *args):
+        del args
+        received = time.time()
+        nbytes = getattr(data, "nbytes", 0)
+        self._buffer.put((nbytes, timestamp, received))
+
+    def clear_buffer(self) -> None:
+        while True:
+            try:
+                self._buffer.get_nowait()
+            except queue.Empty:
+                break
+
+
+def _server_cpu_seconds(metrics_port: int) -> float:
+    """Read the CPU time of a device server from its metrics."""
+    url = "http://%s:%d/metrics" % (_HOST, metrics_port)
+    with urllib.request.urlopen(url, timeout=5) as response:
+        text = response.read().decode("utf-8")
+    for line in text.splitlines():
+        if line.startswith("process_cpu_seconds_total "):
+            return float(line.split()[1])
+    raise RuntimeError("no CPU time on metrics from %s" % url)
+
+
+def _acquire(
+    client: _TimingDataClient,
+    trigger_rate: Optional[float],
+    duration: float,
+    timeout: float,
+) -> List[tuple]:
+    """Trigger the camera for `duration` seconds and collect images."""
+    received = []
+    n_triggers = 0
+    start = time.monotonic()
+    end = start + duration
+    while time.monotonic() < end:
+        client.trigger()
+        n_triggers += 1
+        if trigger_rate is None:
+            try:
+                received.append(client._buffer.get(timeout=timeout))
+            except queue.Empty:
+                _logger.warning("image lost")
+        else:
+            delay = start + n_triggers / trigger_rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+    # Collect images that are still on their way.
+    while len(received) < n_triggers:
+        try:
+            received.append(client._buffer.get(timeout=timeout))
+        except queue.Empty:
+            _logger.warning("%d images lost", n_triggers - len(received))
+            break
+    return received
+
+
+class _BenchmarkServer:
+    """Device server with cameras for the benchmarks.
+
+    Args:
+        n_cameras: number of cameras to serve, each on its own device
+            server process.
+        sensor_size: width and height of the camera sensors.
+        port: port of the first camera.  The other cameras are served
+            on the following ports and their metrics on the ports
+            after those.
+    """
+
+    def __init__(self, n_cameras: int, sensor_size: int, port: int) -> None:
+        self.ports = [port + i for i in range(n_cameras)]
+        self.metrics_ports = [port + n_cameras + i for i in range(n_cameras)]
+        self._devices = [
+            microscope.device_server.device(
+                microscope.simulators.SimulatedCamera,
+                _HOST,
+                camera_port,
+                {"sensor_shape": (sensor_size, sensor_size)},
+                metrics_port=metrics_port,
+            )
+            for camera_port, metrics_port in zip(
+                self.ports, self.metrics_ports
+            )
+        ]
+        self._process: Optional[multiprocessing.Process] = None
+
+    def uri(self, index: int) -> str:
+        return "PYRO:SimulatedCamera@%s:%d" % (_HOST, self.ports[index])
+
+    def start(self, timeout: float = 30.0) -> None:
+        options = microscope.device_server.DeviceServerOptions(
+            config_fpath="",
+            logging_level=logging.WARNING,
+            logging_dir="",
+        )
+        self._process = multiprocessing.Process(
+            target=microscope.device_server.serve_devices,
+            args=(self._devices, options),
+        )
+        self._process.start()
+        end = time.monotonic() + timeout
+        for i in range(len(self.ports)):
+            while True:
+                try:
+                    Pyro4.Proxy(self.uri(i))._pyroBind()
+                    _server_cpu_seconds(self.metrics_ports[i])
+                except Exception:
+                    if time.monotonic() > end:
+                        self.stop()
+                        raise RuntimeError("device server did not start")
+                    time.sleep(0.1)
+                else:
+                    break
+
+    def stop(self) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+
+
+def run_benchmarks(
+    cases: Sequence[BenchmarkCase],
+    duration: float = 5.0,
+    port: int = 8000,
+    timeout: float = 5.0,
+) -> List[BenchmarkResult]:
+    """Run the benchmark cases on a new device server.
+
+    Args:
+        cases: the benchmarks to run.
+        duration: time, in seconds, triggering the cameras on each
+            benchmark.
+        port: first port for the device servers.  The ports for
+            twice the maximum number of clients are used.
+        timeout: time, in seconds, to wait for an image before
+            considering it lost.
+    """
+    if not cases:
+        return []
+    n_cameras = max(case.n_clients for case in cases)
+    sensor_size = max(case.roi_size for case in cases)
+    server = _BenchmarkServer(n_cameras, sensor_size, port)
+    server.start()
+    try:
+        clients = [_TimingDataClient(server.uri(i)) for i in range(n_cameras)]
+        for client in clients:
+            client.set_setting("image pattern", 4)  # black
+            client.set_setting("display image number", False)
+            client.set_exposure_time(0.0)
+        results = []
+        for case in cases:
+            _logger.info("Running %s", case)
+            results.append(_run_case(case, clients, server, duration, timeout))
+    finally:
+        server.stop()
+    return results
+
+
+def _run_case(
+    case: BenchmarkCase,
+    all_clients: Sequence[_TimingDataClient],
+    server: _BenchmarkServer,
+    duration: float,
+    timeout: float,
+) -> BenchmarkResult:
+    clients = all_clients[: case.n_clients]
+    metrics_ports = server.metrics_ports[: case.n_clients]
+    for client in clients:
+        client.set_setting("image data type", _DTYPES.index(case.dtype))
+        client.set_setting("frame bank size", case.frame_bank_size)
+        client.set_roi(microscope.ROI(0, 0, case.roi_size, case.roi_size))
+        client.enable()
+        # Warm up, and make sure the camera is acquiring.
+        client.trigger_and_wait()
+        client.clear_buffer()
+
+    received: Dict[int, List[tuple]] = {}
+
+    def acquire(index: int) -> None:
+        received[index] = _acquire(
+            clients[index], case.trigger_rate, duration, timeout
+        )
+
+    threads = [
+        threading.Thread(target=acquire, args=(i,))
+        for i in range(len(clients))
+    ]
+    server_cpu_start = sum(_server_cpu_seconds(p) for p in metrics_ports)
+    client_cpu_start = time.process_time()
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+    client_cpu = time.process_time() - client_cpu_start
+    server_cpu = (
+        sum(_server_cpu_seconds(p) for p in metrics_ports) - server_cpu_start
+    )
+
+    for client in clients:
+        client.disable()
+        # Remove this client from the camera clients stack.
+        client.set_client(None)
+
+    frames = list(itertools.chain.from_iterable(received.values()))
+    n_frames = len(frames)
+    nbytes = sum(frame[0] for frame in frames)
+    if n_frames:
+        latencies = np.array([frame[2] - frame[1] for frame in frames])
+        latency_p50, latency_p99 = np.percentile(latencies, [50, 99])
+    else:
+        latency_p50 = latency_p99 = float("nan")
+    return BenchmarkResult(
+        case=case,
+        n_frames=n_frames,
+        duration=elapsed,
+        frames_per_second=n_frames / elapsed,
+        megabytes_per_second=nbytes / elapsed / 1e6,
+        latency_p50=float(latency_p50),
+        latency_p99=float(latency_p99),
+        server_cpu_per_frame=server_cpu / max(n_frames, 1),
+        client_cpu_per_frame=client_cpu / max(n_frames, 1),
+    )
+
+
+def _microscope_version() -> Optional[str]:
+    if importlib_metadata is None:
+        return None
+    try:
+        return importlib_metadata.version("microscope")
+    except importlib_metadata.PackageNotFoundError:
+        return None
+
+
+def results_to_json(results: Sequence[BenchmarkResult]) -> dict:
+    """Convert results to JSON, with information about the system."""
+    return {
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "microscope_version": _microscope_version(),
+        "python_version": platform.python_version(),
+        "pyro4_version": Pyro4.__version__,
+        "numpy_version": np.__version__,
+        "platform": platform.platform(),
+        "results": [dataclasses.asdict(result) for result in results],
+    }
+
+
+def _format_results(results: Sequence[BenchmarkResult]) -> str:
+    header = "%6s %7s %7s %6s %9s %9s %10s %10s %18s %18s" % (
+        "roi",
+        "dtype",
+        "clients",
+        "rate",
+        "frames/s",
+        "MB/s",
+        "p50 (ms)",
+        "p99 (ms)",
+        "server CPU/fr (ms)",
+        "client CPU/fr (ms)",
+    )
+    lines = [header]
+    for result in results:
+        case = result.case
+        lines.append(
+            "%6d %7s %7d %6s %9.1f %9.1f %10.2f %10.2f %18.3f %18.3f"
+            % (
+                case.roi_size,
+                case.dtype,
+                case.n_clients,
+                "max" if case.trigger_rate is None else case.trigger_rate,
+                result.frames_per_second,
+                result.megabytes_per_second,
+                result.latency_p50 * 1000,
+                result.latency_p99 * 1000,
+                result.server_cpu_per_frame * 1000,
+                result.client_cpu_per_frame * 1000,
+            )
+        )
+    return "\n".join(lines)
+
+
+def _parse_cmd_line_args(args: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="microscope.testsuite.benchmarks")
+    parser.add_argument(
+        "--roi-sizes",
+        type=int,
+        nargs="+",
+        default=[256, 512, 1024, 2048],
+        help="Width and height of the images",
+    )
+    parser.add_argument(
+        "--dtypes",
+        nargs="+",
+        choices=_DTYPES,
+        default=["uint8", "uint16"],
+        help="Data types of the images",
+    )
+    parser.add_argument(
+        "--clients",
+        type=int,
+        nargs="+",
+        default=[1, 4],
+        help="Number of clients, each with its own camera",
+    )
+    parser.add_argument(
+        "--trigger-rates",
+        type=float,
+        nargs="+",
+        default=[0, 50],
+        help=(
+            "Triggers per second to each camera.  Zero means to trigger"
+            " as soon as the previous image is received"
+        ),
+    )
+    parser.add_argument(
+        "--frame-bank-size",
+        type=int,
+        default=16,
+        help=(
+            "Number of images pre-rendered by each camera.  Zero means"
+            " to render each image, which limits the frame rate"
+        ),
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=5.0,
+        help="Seconds to acquire on each benchmark",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8000,
+        help="First port to use for the device servers",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="File to write the results in JSON",
+    )
+    return parser.parse_args(args)
+
+
+def main(argv: Sequence[str]) -> int:
+    args = _parse_cmd_line_args(argv[1:])
+    logging.basicConfig(level=logging.INFO)
+    cases = [
+        BenchmarkCase(
+            roi_size=roi_size,
+            dtype=dtype,
+            n_clients=n_clients,
+            trigger_rate=(rate if rate > 0 else None),
+            frame_bank_size=args.frame_bank_size,
+        )
+        for roi_size, dtype, n_clients, rate in itertools.product(
+            args.roi_sizes, args.dtypes, args.clients, args.trigger_rates
+        )
+    ]
+    results = run_benchmarks(cases, duration=args.duration, port=args.port)
+    print(_format_results(results))
+    if args.output is not None:
+        with open(args.output, "w") as fh:
+            json.dump(results_to_json(results), fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
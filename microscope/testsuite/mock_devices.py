@@ -31,9 +31,18 @@ interface.
 
 import enum
 import io
+import logging
+import math
+import os
+import select
+import threading
+import time
+import typing
 
 import serial.serialutil
 
+_logger = logging.getLogger(__name__)
+
 
 class SerialMock(serial.serialutil.SerialBase):
     """Base class to mock devices controlled via serial.
@@ -96,6 +105,10 @@ class SerialMock(serial.serialutil.SerialBase):
     def readline(self, size=-1):
         return self._readx_wrapper(self.in_buffer.readline, size)
 
+    @property
+    def in_waiting(self):
+        return self.in_buffer.getbuffer().nbytes - self.in_read_bytes
+
     def reset_input_buffer(self):
         self.in_read_bytes = self.in_buffer.getbuffer().nbytes
         self.in_buffer.seek(0, 2)
@@ -104,6 +117,110 @@ class SerialMock(serial.serialutil.SerialBase):
         pass
 
 
+class SerialMockServer:
+    """Serve a mocked serial device on a pseudo-terminal.
+
+    The :class:`SerialMock` classes replace `serial.Serial` on the
+    same process and do not show the cost of real serial
+    communication.  This class serves the protocol of a mock on a
+    pseudo-terminal instead, so that an unmodified device can open it
+    with `serial.Serial`, like a real serial port, for example to
+    benchmark the throughput and latency of its commands:
+
+    .. code-block:: python
+
+        with SerialMockServer(CoboltLaserMock, baudrate=115200) as server:
+            laser = CoboltLaser(server.path)
+            laser.enable()
+            start = time.perf_counter()
+            for i in range(100):
+                laser.get_is_on()
+            latency = (time.perf_counter() - start) / 100
+
+    Pseudo-terminals are only available on Unix systems.
+
+    Args:
+        mock_cls: the :class:`SerialMock` class with the protocol of
+            the device.
+        baudrate: if not `None`, the data is sent and received at
+            this rate, with 10 bits per byte, i.e., one start bit and
+            one stop bit.  If `None`, data is sent as fast as the
+            pseudo-terminal allows.
+
+    """
+
+    def __init__(
+        self,
+        mock_cls: typing.Type[SerialMock],
+        baudrate: typing.Optional[int] = None,
+    ) -> None:
+        # tty is only available on Unix.
+        import tty
+
+        self.mock = mock_cls()
+        self._baudrate = baudrate
+        self._master_fd, self._slave_fd = os.openpty()
+        # No echo or line editing, like a serial port.  The device
+        # also configures the port when it opens it, but the mock may
+        # reply before that.  We keep the slave open so that the
+        # pseudo-terminal is not closed when the device closes it.
+        tty.setraw(self._slave_fd)
+        self._path = os.ttyname(self._slave_fd)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    @property
+    def path(self) -> str:
+        """Path to the pseudo-terminal that the device should open."""
+        return self._path
+
+    def _transmission_time(self, nbytes: int) -> float:
+        if self._baudrate is None:
+            return 0.0
+        return nbytes * 10.0 / self._baudrate
+
+    def _serve(self) -> None:
+        while not self._stop.is_set():
+            readable, _, _ = select.select([self._master_fd], [], [], 0.05)
+            if not readable:
+                continue
+            try:
+                data = os.read(self._master_fd, 4096)
+            except OSError:
+                break
+            # The mock receives the data only after it has been
+            # transmitted at the baud rate.
+            time.sleep(self._transmission_time(len(data)))
+            try:
+                self.mock.write(data)
+            except Exception:
+                _logger.exception("mock failed to handle %s", data)
+            reply = self.mock.read(self.mock.in_buffer.getbuffer().nbytes)
+            if self._baudrate is None:
+                os.write(self._master_fd, reply)
+            else:
+                # Send in small chunks so that the device may start
+                # reading before the whole reply is transmitted.
+                for i in range(0, len(reply), 16):
+                    chunk = reply[i : i + 16]
+                    time.sleep(self._transmission_time(len(chunk)))
+                    os.write(self._master_fd, chunk)
+
+    def close(self) -> None:
+        """Stop serving and close the pseudo-terminal."""
+        self._stop.set()
+        self._thread.join()
+        os.close(self._master_fd)
+        os.close(self._slave_fd)
+
+    def __enter__(self) -> "SerialMockServer":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
 class CoherentSapphireLaserMock(SerialMock):
     """Modelled after a Coherent Sapphire LP 561nm laser.
 
@@ -718,3 +835,327 @@ class OmicronDeepstarLaserMock(SerialMock):
             )
 
         self.in_buffer.write(answer + self.eol)
+
+
+class ZaberStageMock(SerialMock):
+    """Zaber stage, at address 1, with two linear axes.
+
+    Moves take the time to travel the distance at constant speed.
+    Only the commands needed to move the stage are implemented.  When
+    alerts are enabled, with ``set comm.alert 1``, the mock sends an
+    alert message when an axis finishes moving.
+
+    Like a real serial port, reads wait up to `timeout` for data and
+    the mock can be read and written from different threads.
+    """
+
+    eol = b"\n"
+
+    baudrate = 115200
+    parity = serial.PARITY_NONE
+    bytesize = serial.EIGHTBITS
+    stopbits = serial.STOPBITS_ONE
+    rtscts = False
+    dsrdtr = False
+
+    n_axes = 2
+    # In microsteps per second, and in the Zaber device units.
+    speed = 200000.0
+    maxspeed = int(speed * 1.6384)
+    # Whether the device accepts the command to enable alerts.
+    supports_alerts = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.alerts = False
+        self.positions = [0] * self.n_axes
+        # Map of axis index to the target and end time of its move.
+        self.moves: typing.Dict[int, typing.Tuple[int, float]] = {}
+        # Commands, without message ID, in the order received.
+        self.commands: typing.List[bytes] = []
+        # Map of command, as in `commands`, to the time in seconds to
+        # delay its reply.
+        self.reply_delays: typing.Dict[bytes, float] = {}
+        self._message_id: typing.Optional[bytes] = None
+        self._reply_delay = 0.0
+        self._condition = threading.Condition(threading.RLock())
+
+    def _write_line(self, line: bytes) -> None:
+        self.in_buffer.seek(0, 2)
+        self.in_buffer.write(line + b"\r\n")
+
+    def _finish_moves(self) -> None:
+        now = time.monotonic()
+        for idx, (target, end_time) in list(self.moves.items()):
+            if end_time <= now:
+                self.positions[idx] = target
+                del self.moves[idx]
+                if self.alerts:
+                    self._write_line(b"!01 %d IDLE --" % (idx + 1))
+
+    def _start_move(self, idx: int, target: int) -> None:
+        distance = abs(target - self.positions[idx])
+        self.moves[idx] = (target, time.monotonic() + distance / self.speed)
+
+    def _reply(self, axis: int, data: bytes, flag: bytes = b"OK") -> None:
+        if axis == 0:
+            busy = bool(self.moves)
+        else:
+            busy = (axis - 1) in self.moves
+        status = b"BUSY" if busy else b"IDLE"
+        if self._message_id is None:
+            header = b"@01 %d" % axis
+        else:
+            header = b"@01 %d %s" % (axis, self._message_id)
+        line = b"%s %s %s -- %s" % (header, flag, status, data)
+        if self._reply_delay:
+            threading.Timer(
+                self._reply_delay, self._write_late_line, [line]
+            ).start()
+        else:
+            self._write_line(line)
+
+    def _write_late_line(self, line: bytes) -> None:
+        with self._condition:
+            self._write_line(line)
+            self._condition.notify_all()
+
+    def handle(self, command):
+        self._finish_moves()
+        if command == b"/":
+            self._reply(0, b"0")
+            return
+        address, axis_str, *words = command[1:].strip().split(b" ")
+        if words and words[0].isdigit():
+            self._message_id = words.pop(0)
+        else:
+            self._message_id = None
+        command = b"/%s %s %s" % (address, axis_str, b" ".join(words))
+        self.commands.append(command)
+        self._reply_delay = self.reply_delays.get(command, 0.0)
+        axis = int(axis_str)
+        axes = range(self.n_axes) if axis == 0 else [axis - 1]
+        if not words:
+            self._reply(axis, b"0")
+        elif words == [b"get", b"system.axiscount"]:
+            self._reply(axis, b"%d" % self.n_axes)
+        elif words == [b"get", b"pos"]:
+            self._reply(
+                axis, b" ".join(b"%d" % self.positions[i] for i in axes)
+            )
+        elif words == [b"get", b"maxspeed"]:
+            self._reply(axis, b" ".join(b"%d" % self.maxspeed for i in axes))
+        elif words[:2] == [b"set", b"maxspeed"]:
+            self.maxspeed = int(words[2])
+            self._reply(axis, b"0")
+        elif words == [b"get", b"accel"]:
+            # No acceleration, moves start at maximum speed.
+            self._reply(axis, b" ".join(b"0" for i in axes))
+        elif words[:2] == [b"move", b"abs"]:
+            for i in axes:
+                self._start_move(i, int(words[2]))
+            self._reply(axis, b"0")
+        elif words[:2] == [b"move", b"rel"]:
+            for i in axes:
+                self._start_move(i, self.positions[i] + int(words[2]))
+            self._reply(axis, b"0")
+        elif not self.supports_alerts and b"comm.alert" in words:
+            self._reply(axis, b"BADCOMMAND", flag=b"RJ")
+        elif words == [b"get", b"comm.alert"]:
+            self._reply(axis, b"%d" % self.alerts)
+        elif words[:2] == [b"set", b"comm.alert"]:
+            self.alerts = words[2] == b"1"
+            self._reply(axis, b"0")
+        else:
+            raise NotImplementedError(
+                "no handling for command '%s'" % command.decode("utf-8")
+            )
+
+    def write(self, data):
+        with self._condition:
+            n_bytes = super().write(data)
+            self._condition.notify_all()
+        return n_bytes
+
+    def read(self, size=1):
+        if self.timeout is None:
+            deadline = math.inf
+        else:
+            deadline = time.monotonic() + self.timeout
+        with self._condition:
+            while True:
+                if self.in_waiting or time.monotonic() >= deadline:
+                    return super().read(size)
+                # Wake up when a move ends, to send its alert.
+                wake_time = min(
+                    [deadline] + [end for _, end in self.moves.values()]
+                )
+                self._condition.wait(
+                    min(max(0.0, wake_time - time.monotonic()), 1.0)
+                )
+
+    def readline(self, size=-1):
+        with self._condition:
+            self._finish_moves()
+            return super().readline(size)
+
+    @property
+    def in_waiting(self):
+        with self._condition:
+            self._finish_moves()
+            return self.in_buffer.getbuffer().nbytes - self.in_read_bytes
+
+
+class ASIMS2000Mock(SerialMock):
+    """ASI MS2000 controller with a linear stage with X and Y axes.
+
+    Moves take the time to travel the distance at constant speed.
+    Only the commands needed to construct the stage, move it, and use
+    the ring buffer are implemented.  There are no light sources.
+    Call :meth:`ttl_pulse` to simulate a pulse on the TTL input.
+    """
+
+    eol = b"\r"
+
+    baudrate = 9600
+    parity = serial.PARITY_NONE
+    bytesize = serial.EIGHTBITS
+    stopbits = serial.STOPBITS_ONE
+    rtscts = False
+    dsrdtr = False
+
+    axes = [b"X", b"Y"]
+    # In stage units per second.
+    speed = 100000.0
+    max_speed = 7.5
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.positions = {axis: 0 for axis in self.axes}
+        # Map of axis to the start, target, and start and end time of
+        # its move.
+        self.moves: typing.Dict[
+            bytes, typing.Tuple[int, int, float, float]
+        ] = {}
+        self.ring_buffer: typing.List[typing.Dict[bytes, int]] = []
+        self.ring_buffer_pointer = 0
+        self.ttl_ring_buffer = False
+        self.commands: typing.List[bytes] = []
+        self._lock = threading.RLock()
+
+    def _write(self, data: bytes) -> None:
+        self.in_buffer.seek(0, 2)
+        self.in_buffer.write(data)
+
+    def _position(self, axis: bytes, now: float) -> int:
+        if axis not in self.moves:
+            return self.positions[axis]
+        start, target, start_time, end_time = self.moves[axis]
+        fraction = (now - start_time) / (end_time - start_time)
+        return int(start + (target - start) * fraction)
+
+    def _finish_moves(self) -> None:
+        now = time.monotonic()
+        for axis, (_, target, _, end_time) in list(self.moves.items()):
+            if end_time <= now:
+                self.positions[axis] = target
+                del self.moves[axis]
+
+    def _start_move(self, axis: bytes, target: int) -> None:
+        distance = abs(target - self.positions[axis])
+        if distance == 0:
+            return
+        now = time.monotonic()
+        self.moves[axis] = (
+            self.positions[axis],
+            target,
+            now,
+            now + distance / self.speed,
+        )
+
+    def _parse_assignments(self, words) -> typing.Dict[bytes, int]:
+        return {
+            axis: int(value)
+            for axis, value in (word.split(b"=") for word in words)
+        }
+
+    def ttl_pulse(self) -> None:
+        """Pulse on the TTL input, to move to the next ring position."""
+        with self._lock:
+            self._finish_moves()
+            if not self.ttl_ring_buffer or not self.ring_buffer:
+                return
+            position = self.ring_buffer[self.ring_buffer_pointer]
+            for axis, target in position.items():
+                self._start_move(axis, target)
+            self.ring_buffer_pointer = (self.ring_buffer_pointer + 1) % len(
+                self.ring_buffer
+            )
+
+    def handle(self, command):
+        with self._lock:
+            self._handle(command)
+
+    def _handle(self, command):
+        self._finish_moves()
+        self.commands.append(command)
+        name, *words = command.split()
+        if name == b"INFO":
+            axis = words[0]
+            if axis in self.axes:
+                # Two columns of 33 characters, each with a setting.
+                self._write(
+                    b"%-33s%s\r"
+                    % (b"Axis Name : %s" % axis, b"Max Speed : 7.5 [S] mm/s")
+                )
+            # There is no reply for axes that are not present.
+        elif name == b"SPEED":
+            if words[0].endswith(b"?"):
+                self._write(
+                    b":A %s=%.1f\r\n" % (words[0][:-1], self.max_speed)
+                )
+            else:
+                self._write(b":A\r\n")
+        elif name == b"MOVE":
+            for axis, target in self._parse_assignments(words).items():
+                self._start_move(axis, target)
+            self._write(b":A\r\n")
+        elif name == b"MOVREL":
+            for axis, delta in self._parse_assignments(words).items():
+                self._start_move(axis, self.positions[axis] + delta)
+            self._write(b":A\r\n")
+        elif name == b"WHERE":
+            now = time.monotonic()
+            self._write(
+                b":A %s\r\n"
+                % b" ".join(b"%d" % self._position(a, now) for a in words)
+            )
+        elif name == b"STATUS":
+            self._write(b"B\r\n" if self.moves else b"N\r\n")
+        elif name == b"RDSTAT":
+            self._write(b":A %d\r\n" % (1 if words[0] in self.moves else 0))
+        elif name == b"HALT":
+            now = time.monotonic()
+            for axis in list(self.moves.keys()):
+                self.positions[axis] = self._position(axis, now)
+            self.moves.clear()
+            self._write(b":A\r\n")
+        elif name == b"RM":
+            if words == [b"X=0"]:
+                self.ring_buffer.clear()
+                self.ring_buffer_pointer = 0
+                self._write(b":A\r\n")
+            elif words == [b"Z?"]:
+                self._write(b":A Z=%d\r\n" % self.ring_buffer_pointer)
+            else:
+                self._write(b":A\r\n")
+        elif name == b"LD":
+            self.ring_buffer.append(self._parse_assignments(words))
+            self._write(b":A\r\n")
+        elif name == b"TTL":
+            self.ttl_ring_buffer = words == [b"X=1"]
+            self._write(b":A\r\n")
+        else:
+            raise NotImplementedError(
+                "no handling for command '%s'" % command.decode("utf-8")
+            )
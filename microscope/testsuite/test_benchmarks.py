@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+## Copyright (C) 2020 David Miguel Susano Pinto <carandraug@gmail.com>
+##
+## This file is part of Microscope.
+##
+## Microscope is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## Microscope is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with Microscope.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+import tempfile
+import unittest
+
+from microscope.testsuite import benchmarks
+from microscope.testsuite.test_device_server import (
+    _patch_out_device_server_logs,
+)
+
+
+class TestBenchmarks(unittest.TestCase):
+    @_patch_out_device_server_logs
+    def test_run_benchmarks(self):
+        cases = [
+            benchmarks.BenchmarkCase(
+                roi_size=64, dtype="uint16", n_clients=2, trigger_rate=None
+            ),
+            benchmarks.BenchmarkCase(
+                roi_size=32, dtype="uint8", n_clients=1, trigger_rate=20.0
+            ),
+        ]
+        results = benchmarks.run_benchmarks(cases, duration=0.5, port=8101)
+        self.assertEqual([r.case for r in results], cases)
+        for result in results:
+            self.assertGreater(result.n_frames, 0)
+            self.assertGreater(result.frames_per_second, 0)
+            self.assertLessEqual(result.latency_p50, result.latency_p99)
+
+        # 64x64 images of 2 bytes each.
+        self.assertAlmostEqual(
+            results[0].megabytes_per_second,
+            results[0].frames_per_second * 64 * 64 * 2 / 1e6,
+        )
+        # The second benchmark only triggers 20 images per second.
+        self.assertLessEqual(results[1].n_frames, 11)
+
+        with tempfile.TemporaryDirectory() as dirpath:
+            fpath = os.path.join(dirpath, "results.json")
+            with open(fpath, "w") as fh:
+                json.dump(benchmarks.results_to_json(results), fh)
+            with open(fpath, "r") as fh:
+                saved = json.load(fh)
+        self.assertEqual(len(saved["results"]), 2)
+        self.assertEqual(saved["results"][0]["case"]["roi_size"], 64)
+        self.assertIsNone(saved["results"][0]["case"]["trigger_rate"])
+
+    def test_format_results(self):
+        result = benchmarks.BenchmarkResult(
+            case=benchmarks.BenchmarkCase(
+                roi_size=64, dtype="uint8", n_clients=1, trigger_rate=None
+            ),
+            n_frames=10,
+            duration=1.0,
+            frames_per_second=10.0,
+            megabytes_per_second=0.04,
+            latency_p50=0.001,
+            latency_p99=0.002,
+            server_cpu_per_frame=0.003,
+            client_cpu_per_frame=0.004,
+        )
+        header, line = benchmarks._format_results([result]).splitlines()
+        self.assertIn("server CPU/fr (ms)", header)
+        self.assertIn("client CPU/fr (ms)", header)
+        self.assertEqual(line.split()[-2:], ["3.000", "4.000"])
+
+
+if __name__ == "__main__":
+    unittest.main()
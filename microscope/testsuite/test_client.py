@@ -18,6 +18,7 @@
 ## along with Microscope.  If not, see <http://www.gnu.org/licenses/>.
 
 import threading
+import time
 import unittest
 
 import Pyro4
@@ -48,6 +49,20 @@ class PyroService:
         self._value = value
 
 
+@Pyro4.expose
+class BlockingService:
+    """Service with a method that blocks until it is released."""
+
+    def __init__(self):
+        self.release_event = threading.Event()
+
+    def block(self):
+        return self.release_event.wait(timeout=5.0)
+
+    def ping(self):
+        return "pong"
+
+
 @Pyro4.expose
 class ExposedDeformableMirror(dummies.TestDeformableMirror):
     """
@@ -99,6 +114,77 @@ class TestClient(unittest.TestCase):
         self.assertTrue(client.attr, 10)
         self.assertTrue(obj.attr, 10)
 
+    def test_property_is_not_cached(self):
+        """Remote properties are read each time"""
+        obj = PyroService()
+        client = (self._serve_objs([obj]))[0]
+        self.assertEqual(client.attr, 42)
+        obj.attr = 10
+        self.assertEqual(client.attr, 10)
+        client.attr = 5
+        self.assertEqual(obj.attr, 5)
+
+    def test_metadata_is_cached(self):
+        """Second client to the same device makes no request"""
+        client = (self._serve_objs([PyroService()]))[0]
+        self.assertIsNotNone(client._proxy._pyroConnection)
+        another_client = microscope.clients.Client(client._url)
+        self.assertIsNone(another_client._proxy._pyroConnection)
+        self.assertEqual(another_client.attr, 42)
+
+    def test_client_pool(self):
+        objs = [PyroService(), PyroService()]
+        uris = [self.daemon.register(obj) for obj in objs]
+        self.thread.start()
+        with microscope.clients.ClientPool(uris) as pool:
+            clients = [pool.get(uri) for uri in uris]
+            self.assertIs(pool.get(uris[0]), clients[0])
+            objs[1].attr = 10
+            self.assertEqual(clients[1].attr, 10)
+        self.assertIsNone(clients[1]._get_proxy()._pyroConnection)
+
+    def test_client_pool_releases_worker_proxies(self):
+        """Proxies of the threads that created the clients are released"""
+        uris = [self.daemon.register(PyroService())]
+        self.thread.start()
+        with microscope.clients.ClientPool(uris) as pool:
+            client = pool.get(uris[0])
+            self.assertEqual(len(client._proxies), 0)
+            self.assertIsNone(client._proxy._pyroConnection)
+            self.assertEqual(client.attr, 42)
+            self.assertEqual(
+                list(client._proxies.keys()), [threading.current_thread()]
+            )
+
+    def test_concurrent_calls_from_threads(self):
+        """Calls from different threads do not wait for each other"""
+        obj = BlockingService()
+        client = (self._serve_objs([obj]))[0]
+        results = []
+        blocked = threading.Thread(
+            target=lambda: results.append(client.block())
+        )
+        blocked.start()
+        try:
+            time.sleep(0.1)
+            self.assertEqual(client.ping(), "pong")
+            self.assertTrue(blocked.is_alive())
+        finally:
+            obj.release_event.set()
+            blocked.join()
+        self.assertEqual(results, [True])
+
+    def test_proxy_per_thread(self):
+        client = (self._serve_objs([PyroService()]))[0]
+        proxies = []
+        thread = threading.Thread(
+            target=lambda: proxies.append(client._get_proxy())
+        )
+        thread.start()
+        thread.join()
+        self.assertIsNot(proxies[0], client._get_proxy())
+        self.assertIs(client._get_proxy(), client._get_proxy())
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -17,19 +17,24 @@
 ## You should have received a copy of the GNU General Public License
 ## along with Microscope.  If not, see <http://www.gnu.org/licenses/>.
 
+import json
 import logging
 import multiprocessing
 import os
 import os.path
 import signal
+import socket
 import tempfile
 import time
 import unittest
 import unittest.mock
+import urllib.request
 
+import numpy as np
 import Pyro4
 import Pyro4.errors
 
+import microscope._utils
 import microscope.abc
 import microscope.clients
 import microscope.device_server
@@ -51,6 +56,21 @@ class ExposePIDDevice(microscope.abc.Device):
         return os.getpid()
 
 
+class ExposeNameDevice(microscope.abc.Device):
+    """Test device with other methods than `ExposePIDDevice`."""
+
+    def _do_shutdown(self) -> None:
+        pass
+
+    def get_name(self) -> str:
+        return type(self).__name__
+
+
+def construct_with_fixed_id(cls_name: str):
+    """Construct a device, by class name, always with the same ID."""
+    return {"RemoteDevice": globals()[cls_name]()}
+
+
 class DeviceServerExceptionQueue(microscope.device_server.DeviceServer):
     """`DeviceServer` that queues an exception during `run`.
 
@@ -389,6 +409,540 @@ class TestCopyOfDeviceConf(BaseTestServeDevices):
         )
 
 
+class TestMetricsEndpoint(BaseTestServeDevices):
+    DEVICES = [
+        microscope.device_server.device(
+            TestFilterWheel,
+            "127.0.0.1",
+            8001,
+            {"positions": 3},
+            metrics_port=8101,
+        ),
+    ]
+
+    def _get_metrics(self) -> str:
+        url = "http://127.0.0.1:8101/metrics"
+        with urllib.request.urlopen(url) as response:
+            return response.read().decode("utf-8")
+
+    def test_rpc_metrics(self):
+        filterwheel = Pyro4.Proxy("PYRO:SimulatedFilterWheel@127.0.0.1:8001")
+        filterwheel.set_position(2)
+        filterwheel.set_position(1)
+        metrics = self._get_metrics()
+        self.assertIn(
+            'microscope_rpc_calls_total{device="SimulatedFilterWheel",'
+            'method="set_position"} 2.0',
+            metrics,
+        )
+        self.assertIn(
+            "microscope_rpc_duration_seconds_count"
+            '{device="SimulatedFilterWheel",method="set_position"} 2',
+            metrics,
+        )
+        self.assertIn("microscope_device_server_restarts_total 0.0", metrics)
+
+
+class TestMetricsPortInUse(BaseTestServeDevices):
+    DEVICES = [
+        microscope.device_server.device(
+            TestFilterWheel,
+            "127.0.0.1",
+            8001,
+            {"positions": 3},
+            metrics_port=8101,
+        ),
+    ]
+
+    @_patch_out_device_server_logs
+    def setUp(self):
+        self.metrics_socket = socket.socket()
+        self.addCleanup(self.metrics_socket.close)
+        self.metrics_socket.setsockopt(
+            socket.SOL_SOCKET, socket.SO_REUSEADDR, 1
+        )
+        self.metrics_socket.bind(("127.0.0.1", 8101))
+        self.metrics_socket.listen()
+        super().setUp()
+
+    def test_device_served(self):
+        """Device is served even if metrics port is already in use"""
+        filterwheel = Pyro4.Proxy("PYRO:SimulatedFilterWheel@127.0.0.1:8001")
+        filterwheel.set_position(2)
+        self.assertEqual(filterwheel.get_position(), 2)
+
+
+class TestPayloadSize(unittest.TestCase):
+    def test_image_size(self):
+        image = np.zeros((512, 256), dtype=np.uint16)
+        self.assertEqual(
+            microscope.device_server._payload_size(image), image.nbytes
+        )
+
+    def test_nested_arguments(self):
+        args = ((b"abcd", [1, 2.0]), {"name": "xy"})
+        # 4 bytes, two 8 byte numbers, and 6 characters on the dict.
+        self.assertEqual(microscope.device_server._payload_size(args), 26)
+
+
+class TestRemoteCallTracing(unittest.TestCase):
+    @_patch_out_device_server_logs
+    def setUp(self):
+        trace_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(trace_dir.cleanup)
+        self.trace_dir = trace_dir.name
+        self.exit_event = multiprocessing.Event()
+        self.process = microscope.device_server.DeviceServer(
+            microscope.device_server.device(
+                TestFilterWheel, "127.0.0.1", 8001, {"positions": 3}
+            ),
+            microscope.device_server.DeviceServerOptions(
+                config_fpath="",
+                logging_level=logging.INFO,
+                logging_dir="",
+                rpc_trace_dir=self.trace_dir,
+            ),
+            {},
+            {},
+            self.exit_event,
+        )
+        self.process.start()
+        time.sleep(1)
+
+    def tearDown(self):
+        self.exit_event.set()
+        self.process.join(10)
+        if self.process.is_alive():
+            self.process.terminate()
+
+    def test_trace_files(self):
+        filterwheel = Pyro4.Proxy("PYRO:SimulatedFilterWheel@127.0.0.1:8001")
+        filterwheel.set_position(2)
+        filterwheel._pyroRelease()
+
+        # The trace and metrics files are only complete after the
+        # device server exits, which may take up to 5 seconds.
+        self.exit_event.set()
+        self.process.join(10)
+
+        basepath = os.path.join(
+            self.trace_dir,
+            "SimulatedFilterWheel_127.0.0.1_8001_%d" % self.process.pid,
+        )
+        with open(basepath + ".trace.json", "r") as fh:
+            events = json.load(fh)
+        self.assertEqual([e["name"] for e in events], ["set_position"])
+        self.assertEqual(events[0]["cat"], "SimulatedFilterWheel")
+        self.assertEqual(events[0]["args"]["concurrency"], 1)
+
+        with open(basepath + ".metrics.txt", "r") as fh:
+            metrics = fh.read()
+        self.assertIn(
+            "microscope_rpc_request_bytes_count"
+            '{device="SimulatedFilterWheel",method="set_position"} 1',
+            metrics,
+        )
+
+
+class TestDaemonOptions(unittest.TestCase):
+    def test_unknown_option(self):
+        """Unknown daemon options are rejected in the device definition"""
+        with self.assertRaises(TypeError):
+            microscope.device_server.device(
+                TestFilterWheel,
+                "127.0.0.1",
+                8001,
+                {"positions": 3},
+                daemon_options={"no_such_option": 1},
+            )
+
+    def test_socket_buffer_sizes(self):
+        daemon = microscope._utils.create_pyro_daemon(
+            "127.0.0.1", sndbuf=2**20, rcvbuf=2**20
+        )
+        self.addCleanup(daemon.close)
+        # Linux doubles the requested value to account for
+        # bookkeeping overhead so only check that it is not smaller.
+        for option in [socket.SO_SNDBUF, socket.SO_RCVBUF]:
+            self.assertGreaterEqual(
+                daemon.sock.getsockopt(socket.SOL_SOCKET, option), 2**20
+            )
+
+
+class TestServingWithDaemonOptions(BaseTestServeDevices):
+    DEVICES = [
+        microscope.device_server.device(
+            TestFilterWheel,
+            "127.0.0.1",
+            8001,
+            {"positions": 3},
+            daemon_options={"servertype": "multiplex", "sock_nodelay": True},
+        ),
+    ]
+
+    def test_multiplex_server(self):
+        filterwheel = Pyro4.Proxy("PYRO:SimulatedFilterWheel@127.0.0.1:8001")
+        filterwheel.set_position(2)
+        self.assertEqual(filterwheel.get_position(), 2)
+        daemon = Pyro4.Proxy("PYRO:Pyro.Daemon@127.0.0.1:8001")
+        self.assertIn("SocketServer_Multiplex", daemon.info())
+
+
+class TestDeviceDefinitionByName(unittest.TestCase):
+    def test_not_imported(self):
+        """Device class given by name is not imported on definition"""
+        definition = microscope.device_server.device(
+            "microscope.no_such_module.NoSuchDevice", "127.0.0.1", 8001
+        )
+        self.assertEqual(
+            definition["cls"], "microscope.no_such_module.NoSuchDevice"
+        )
+
+    def test_requires_module(self):
+        with self.assertRaises(ValueError):
+            microscope.device_server.device("NoSuchDevice", "127.0.0.1", 8001)
+
+
+class TestServeDeviceByName(BaseTestServeDevices):
+    DEVICES = [
+        microscope.device_server.device(
+            "microscope.simulators.SimulatedFilterWheel",
+            "127.0.0.1",
+            8001,
+            {"positions": 3},
+        ),
+        microscope.device_server.device(
+            "microscope.testsuite.devices.TestFloatingDevice",
+            "127.0.0.1",
+            8002,
+            {"uid": "foo"},
+            uid="foo",
+        ),
+    ]
+
+    def test_serve_device_by_name(self):
+        filterwheel = Pyro4.Proxy("PYRO:SimulatedFilterWheel@127.0.0.1:8001")
+        self.assertEqual(filterwheel.n_positions, 3)
+
+    def test_serve_floating_device_by_name(self):
+        floating = Pyro4.Proxy("PYRO:TestFloatingDevice@127.0.0.1:8002")
+        self.assertEqual(floating.get_index(), 0)
+
+
+class TestServeFloatingDeviceByNameWithoutUID(BaseTestDeviceServer):
+    args = [
+        microscope.device_server.device(
+            "microscope.testsuite.devices.TestFloatingDevice",
+            "127.0.0.1",
+            8001,
+            {"uid": "foo", "index": 0},
+        ),
+        microscope.device_server.DeviceServerOptions(
+            config_fpath="",
+            logging_level=logging.INFO,
+            logging_dir="",
+        ),
+        {},
+        {},
+        multiprocessing.Event(),
+    ]
+
+    def test_fail_without_uid(self):
+        """DeviceServer fails if floating device given by name has no uid"""
+        self.assertFalse(self.process.is_alive())
+        self.assertEqual(
+            self.process.exitcode,
+            microscope.device_server._INVALID_DEVICE_DEF_EXITCODE,
+        )
+
+
+class TestServeInvalidDeviceByName(BaseTestServeDevices):
+    DEVICES = [
+        microscope.device_server.device(
+            "microscope.no_such_module.NoSuchDevice", "127.0.0.1", 8001
+        ),
+    ]
+
+    def test_not_restarted(self):
+        """DeviceServer that can't import its device is not restarted"""
+        # The device server checks every 5 seconds for a crashed
+        # device server, and exits if there are none left.
+        self.p.join(10)
+        self.assertFalse(self.p.is_alive())
+
+
+class TestServeDeviceFailingImport(unittest.TestCase):
+    def test_exit_and_log(self):
+        """DeviceServer logs any import error and exits to not restart"""
+        with tempfile.TemporaryDirectory() as logging_dir:
+            server = microscope.device_server.DeviceServer(
+                microscope.device_server.device(
+                    "microscope.testsuite.devices.TestCamera",
+                    "127.0.0.1",
+                    8001,
+                ),
+                microscope.device_server.DeviceServerOptions(
+                    config_fpath="",
+                    logging_level=logging.INFO,
+                    logging_dir=logging_dir,
+                ),
+                {},
+                {},
+                multiprocessing.Event(),
+            )
+            # A missing vendor library raises OSError on import.
+            with unittest.mock.patch(
+                "microscope.device_server._import_cls",
+                side_effect=OSError("no vendor library"),
+            ), unittest.mock.patch(
+                "microscope.device_server.StreamHandler",
+                lambda *args: logging.NullHandler(),
+            ):
+                server.start()
+            server.join(5)
+            self.assertEqual(
+                server.exitcode,
+                microscope.device_server._INVALID_DEVICE_DEF_EXITCODE,
+            )
+            log_fpath = os.path.join(
+                logging_dir, "TestCamera_127.0.0.1_8001.log"
+            )
+            with open(log_fpath) as fh:
+                log = fh.read()
+        self.assertIn("Invalid definition", log)
+        self.assertIn("no vendor library", log)
+
+
+class TestSameClassByName(unittest.TestCase):
+    def test_floating_device_index(self):
+        """Same class given by object and by name share device indices"""
+        servers_args = microscope.device_server._device_servers_args(
+            [
+                microscope.device_server.device(
+                    TestFloatingDevice, "127.0.0.1", 8001, uid="foo"
+                ),
+                microscope.device_server.device(
+                    "microscope.testsuite.devices.TestFloatingDevice",
+                    "127.0.0.1",
+                    8002,
+                    uid="bar",
+                ),
+            ]
+        )
+        self.assertEqual(
+            [args[0]["conf"]["index"] for args in servers_args], [0, 1]
+        )
+        self.assertEqual(servers_args[1][2], {"foo": 8001, "bar": 8002})
+
+
+class TestSameDeviceServerArgs(unittest.TestCase):
+    def make_server(self, conf):
+        args = microscope.device_server._device_servers_args(
+            [
+                microscope.device_server.device(
+                    TestFilterWheel, "127.0.0.1", 8001, conf
+                )
+            ]
+        )[0]
+        options = microscope.device_server.DeviceServerOptions(
+            config_fpath="", logging_level=logging.INFO, logging_dir=""
+        )
+        device_def, uid_to_host, uid_to_port = args
+        server = microscope.device_server.DeviceServer(
+            device_def, options, uid_to_host, uid_to_port
+        )
+        return server, args
+
+    def test_same_args(self):
+        server, args = self.make_server({"positions": 3})
+        self.assertTrue(
+            microscope.device_server._same_device_server_args(server, args)
+        )
+
+    def test_changed_conf(self):
+        server, (device_def, *maps) = self.make_server({"positions": 3})
+        device_def = dict(device_def, conf={"positions": 4})
+        self.assertFalse(
+            microscope.device_server._same_device_server_args(
+                server, (device_def, *maps)
+            )
+        )
+
+    def test_uncomparable_conf(self):
+        """Values that can't be compared are the same if same object"""
+        server, args = self.make_server({"positions": np.arange(3)})
+        self.assertTrue(
+            microscope.device_server._same_device_server_args(server, args)
+        )
+        device_def = dict(args[0], conf={"positions": np.arange(3)})
+        self.assertFalse(
+            microscope.device_server._same_device_server_args(
+                server, (device_def, *args[1:])
+            )
+        )
+
+
+@unittest.skipUnless(
+    hasattr(signal, "SIGHUP"), "no SIGHUP to reload config (windows)"
+)
+class TestReloadConfig(unittest.TestCase):
+    CONFIG = """
+from microscope.device_server import device
+
+DEVICES = [
+    device(
+        "microscope.testsuite.test_device_server.ExposePIDDevice",
+        "127.0.0.1",
+        8001,
+    ),
+    device(
+        "microscope.simulators.SimulatedFilterWheel",
+        "127.0.0.1",
+        8002,
+        {"positions": %d},
+    ),
+]
+"""
+
+    def _write_config(self, n_positions: int) -> None:
+        with open(self.config_fpath, "w") as fh:
+            fh.write(self.CONFIG % n_positions)
+
+    @_patch_out_device_server_logs
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config_fpath = os.path.join(self.tmp_dir.name, "config.py")
+        self._write_config(3)
+        options = microscope.device_server.DeviceServerOptions(
+            config_fpath=self.config_fpath,
+            logging_level=logging.INFO,
+            logging_dir="",
+        )
+        self.p = multiprocessing.Process(
+            target=microscope.device_server.serve_devices,
+            args=(
+                microscope.device_server.validate_devices(self.config_fpath),
+                options,
+            ),
+        )
+        self.p.start()
+        time.sleep(1)
+
+    def tearDown(self):
+        self.p.terminate()
+        self.p.join(10)
+        self.tmp_dir.cleanup()
+        self.assertFalse(self.p.is_alive())
+
+    def test_only_changed_devices_restart(self):
+        unchanged = Pyro4.Proxy("PYRO:ExposePIDDevice@127.0.0.1:8001")
+        filterwheel = Pyro4.Proxy("PYRO:SimulatedFilterWheel@127.0.0.1:8002")
+        initial_pid = unchanged.get_pid()
+        self.assertEqual(filterwheel.n_positions, 3)
+
+        self._write_config(5)
+        os.kill(self.p.pid, signal.SIGHUP)
+
+        # The changed device server checks every 5 seconds if it
+        # should stop, and then the new one needs to start.
+        for i in range(15):
+            time.sleep(1)
+            try:
+                filterwheel._pyroReconnect(tries=1)
+                n_positions = filterwheel.n_positions
+            except Pyro4.errors.CommunicationError:
+                continue
+            if n_positions == 5:
+                break
+        self.assertEqual(filterwheel.n_positions, 5)
+        self.assertEqual(unchanged.get_pid(), initial_pid)
+
+    def test_invalid_config_keeps_devices(self):
+        filterwheel = Pyro4.Proxy("PYRO:SimulatedFilterWheel@127.0.0.1:8002")
+        filterwheel.set_position(2)
+
+        with open(self.config_fpath, "w") as fh:
+            fh.write("DEVICES = [")
+        os.kill(self.p.pid, signal.SIGHUP)
+        time.sleep(2)
+
+        self.assertEqual(filterwheel.get_position(), 2)
+
+
+@unittest.skipUnless(
+    hasattr(signal, "SIGHUP"), "no SIGHUP to reload config (windows)"
+)
+class TestClientAfterReload(unittest.TestCase):
+    CONFIG = """
+from microscope.device_server import device
+
+DEVICES = [
+    device(
+        "microscope.testsuite.test_device_server.construct_with_fixed_id",
+        "127.0.0.1",
+        8001,
+        {"cls_name": "%s"},
+    ),
+]
+"""
+
+    def _write_config(self, cls_name: str) -> None:
+        with open(self.config_fpath, "w") as fh:
+            fh.write(self.CONFIG % cls_name)
+
+    @_patch_out_device_server_logs
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config_fpath = os.path.join(self.tmp_dir.name, "config.py")
+        self._write_config("ExposePIDDevice")
+        options = microscope.device_server.DeviceServerOptions(
+            config_fpath=self.config_fpath,
+            logging_level=logging.INFO,
+            logging_dir="",
+        )
+        self.p = multiprocessing.Process(
+            target=microscope.device_server.serve_devices,
+            args=(
+                microscope.device_server.validate_devices(self.config_fpath),
+                options,
+            ),
+        )
+        self.p.start()
+        time.sleep(1)
+
+    def tearDown(self):
+        self.p.terminate()
+        self.p.join(10)
+        self.tmp_dir.cleanup()
+        self.assertFalse(self.p.is_alive())
+
+    def test_other_class_on_same_uri(self):
+        """Clients get the members of a new device on the same URI"""
+        uri = "PYRO:RemoteDevice@127.0.0.1:8001"
+        client = microscope.clients.Client(uri)
+        client.get_pid()
+
+        self._write_config("ExposeNameDevice")
+        os.kill(self.p.pid, signal.SIGHUP)
+
+        # The changed device server checks every 5 seconds if it
+        # should stop, and then the new one needs to start.  The
+        # first calls fail until the client reconnects to it.
+        for i in range(15):
+            time.sleep(1)
+            try:
+                client.get_pid()
+            except AttributeError:
+                break
+            except Pyro4.errors.CommunicationError:
+                continue
+        self.assertFalse(hasattr(client, "get_pid"))
+        self.assertEqual(client.get_name(), "ExposeNameDevice")
+        another_client = microscope.clients.Client(uri)
+        self.assertFalse(hasattr(another_client, "get_pid"))
+        self.assertEqual(another_client.get_name(), "ExposeNameDevice")
+
+
 class TestKeepDeviceServerAlive(BaseTestServeDevices):
     DEVICES = [
         microscope.device_server.device(
@@ -35,16 +35,28 @@ constructs the device instance required to run the tests.
 
 """
 
+import logging
+import multiprocessing
+import os.path
+import pickle
+import tempfile
+import threading
+import time
 import unittest
 import unittest.mock
 from queue import Queue
 
 import numpy as np
+import Pyro4
+import scipy.ndimage
 
 import microscope
+import microscope.abc
 import microscope.testsuite.devices as dummies
 import microscope.testsuite.mock_devices as mocks
 from microscope import simulators
+from microscope.controllers import asi, zaber
+from microscope.simulators import injection, stage_aware_camera, triggers
 from microscope.simulators.stage_aware_camera import StageAwareCamera
 
 
@@ -158,6 +170,11 @@ class SerialDeviceTests:
         self.assertEqual(self.device.connection.rtscts, self.fake.rtscts)
         self.assertEqual(self.device.connection.dsrdtr, self.fake.dsrdtr)
 
+    def test_serial_stats(self):
+        stats = self.device.get_serial_stats()
+        self.assertGreater(sum(s["count"] for s in stats.values()), 0)
+        self.assertGreater(sum(s["bytes_read"] for s in stats.values()), 0)
+
 
 class LightSourceTests(DeviceTests):
     """Base class for :class:`LightSource` tests.
@@ -251,7 +268,24 @@ class CameraTests(DeviceTests):
 
 
 class ControllerTests(DeviceTests):
-    pass
+    def test_execute_batch(self):
+        names = list(self.device.devices.keys())
+        results = self.device.execute_batch(
+            [(name, "get_is_enabled", ()) for name in names]
+        )
+        self.assertEqual(
+            results,
+            [self.device.devices[name].get_is_enabled() for name in names],
+        )
+
+    def test_execute_batch_private(self):
+        name = list(self.device.devices.keys())[0]
+        with self.assertRaisesRegex(ValueError, "private"):
+            self.device.execute_batch([(name, "_do_shutdown", ())])
+
+    def test_execute_batch_unknown_device(self):
+        with self.assertRaises(KeyError):
+            self.device.execute_batch([("not a device name", "enable", ())])
 
 
 class FilterWheelTests(DeviceTests):
@@ -369,6 +403,9 @@ class TestCoherentSapphireLaser(
 
         self.fake = CoherentSapphireLaserMock
 
+    def test_faults_in_status(self):
+        self.assertIn("Fault(s): None", self.device.get_status())
+
 
 class TestCoboltLaser(unittest.TestCase, LightSourceTests, SerialDeviceTests):
     def setUp(self):
@@ -384,6 +421,37 @@ class TestCoboltLaser(unittest.TestCase, LightSourceTests, SerialDeviceTests):
         self.fake = CoboltLaserMock
 
 
+@unittest.skipUnless(os.name == "posix", "requires pseudo-terminals")
+class TestSerialMockServer(unittest.TestCase):
+    def _start_laser(self, baudrate=None):
+        from microscope.lights.cobolt import CoboltLaser
+
+        server = mocks.SerialMockServer(mocks.CoboltLaserMock, baudrate)
+        self.addCleanup(server.close)
+        laser = CoboltLaser(server.path)
+        # Cleanups run in reverse order, so the device is shutdown
+        # before the server is closed.
+        self.addCleanup(laser.connection.close)
+        self.addCleanup(laser.shutdown)
+        return server, laser
+
+    def test_unmodified_device(self):
+        server, laser = self._start_laser()
+        laser.enable()
+        laser.power = 0.5
+        self.assertTrue(laser.get_is_on())
+        self.assertTrue(server.mock.light)
+        self.assertEqual(server.mock.power, 300.0)
+
+    def test_baudrate(self):
+        server, laser = self._start_laser(baudrate=9600)
+        start = time.monotonic()
+        for i in range(5):
+            laser.get_is_on()
+        # Each query is "l?\r" and the reply "0\r\n".
+        self.assertGreaterEqual(time.monotonic() - start, 5 * 6 * 10 / 9600)
+
+
 class TestOmicronDeepstarLaser(
     unittest.TestCase, LightSourceTests, SerialDeviceTests
 ):
@@ -441,6 +509,991 @@ class TestImageGenerator(unittest.TestCase):
                 # and N rows, so a shape of (N, M)
                 self.assertEqual(image.shape, (height, width))
 
+    def test_patterns_data_type(self):
+        generator = simulators._ImageGenerator()
+        for dtype_idx, dtype_name in enumerate(generator.get_data_types()):
+            generator.set_data_type(dtype_idx)
+            for method_idx, name in enumerate(generator.get_methods()):
+                generator.set_method(method_idx)
+                with self.subTest(pattern=name, dtype=dtype_name):
+                    image = generator.get_image(24, 16, 10, 200, index=7)
+                    self.assertEqual(image.dtype, np.dtype(dtype_name))
+                    self.assertEqual(image.shape, (16, 24))
+
+    def test_gradient_values(self):
+        generator = simulators._ImageGenerator()
+        generator.set_method(list(generator.get_methods()).index("gradient"))
+        image = generator.get_image(8, 4, 10, 100)
+        self.assertEqual(image[0, 0], 10)
+        self.assertEqual(image[-1, -1], 110)
+        self.assertTrue(np.all(np.diff(image.astype(int), axis=1) >= 0))
+
+    def test_number_larger_than_image(self):
+        """Numbers are clipped if they do not fit in the image"""
+        generator = simulators._ImageGenerator()
+        generator.set_method(list(generator.get_methods()).index("white"))
+        image = generator.get_image(4, 4, index=123456)
+        self.assertEqual(image.shape, (4, 4))
+        self.assertTrue(np.all(image[0, :] == 0))
+
+
+class TestDataDeviceLogging(unittest.TestCase):
+    def test_rate_limit_per_device(self):
+        """Messages of a device do not suppress those of another"""
+        cameras = [simulators.SimulatedCamera() for i in range(2)]
+        with self.assertLogs("microscope.abc", logging.DEBUG) as logs:
+            for camera in cameras:
+                for i in range(3):
+                    camera._hot_logger.debug("dropped frame")
+        self.assertEqual(
+            logs.output, ["DEBUG:microscope.abc:dropped frame"] * 2
+        )
+
+
+class TestSimulatedCameraFrameBank(unittest.TestCase):
+    def setUp(self):
+        self.camera = simulators.SimulatedCamera(sensor_shape=(64, 32))
+        self.camera.set_setting("frame bank size", 3)
+        self.camera.set_exposure_time(0.01)
+        self.buffer = Queue()
+        self.camera.set_client(self.buffer)
+        self.camera.enable()
+
+    def tearDown(self):
+        self.camera.disable()
+
+    def _acquire(self, n_images):
+        for i in range(n_images):
+            self.camera.trigger()
+        return [self.buffer.get(timeout=5) for i in range(n_images)]
+
+    def test_cycle_through_bank(self):
+        images = self._acquire(9)
+        for i in range(3):
+            np.testing.assert_array_equal(images[i], images[i + 3])
+            np.testing.assert_array_equal(images[i], images[i + 6])
+        self.assertFalse(np.array_equal(images[0], images[1]))
+
+    def test_frame_rate(self):
+        start = time.monotonic()
+        self._acquire(20)
+        elapsed = time.monotonic() - start
+        # The exposure time sets the frame rate, not the rendering.
+        self.assertGreaterEqual(elapsed, 0.19)
+        self.assertLess(elapsed, 0.5)
+
+    def test_render_bank_on_roi_change(self):
+        self.assertEqual(self._acquire(1)[0].shape, (32, 64))
+        self.camera.set_roi(microscope.ROI(0, 0, 32, 16))
+        self.assertEqual(self._acquire(1)[0].shape, (16, 32))
+
+    def test_render_bank_on_data_type_change(self):
+        for idx, name in self.camera.describe_setting("image data type")[
+            "values"
+        ]:
+            with self.subTest(name):
+                self.camera.set_setting("image data type", idx)
+                self.assertEqual(self._acquire(1)[0].dtype, np.dtype(name))
+
+    def test_disable_frame_bank(self):
+        self.camera.set_setting("frame bank size", 0)
+        images = self._acquire(4)
+        self.assertFalse(np.array_equal(images[0], images[3]))
+
+
+def _create_bus(paths):
+    paths.put(triggers.SimulatedTriggerBus().path)
+
+
+def _fire_pulses(bus, n_pulses):
+    for i in range(n_pulses):
+        bus.fire()
+        time.sleep(0.002)
+
+
+class TestSimulatedTriggerBus(unittest.TestCase):
+    def setUp(self):
+        self.bus = triggers.SimulatedTriggerBus()
+        self.pulses = Queue()
+
+    def tearDown(self):
+        self.bus.close()
+
+    def _receive(self, n_pulses):
+        return [self.pulses.get(timeout=5) for i in range(n_pulses)]
+
+    def test_subscribe(self):
+        self.bus.subscribe(lambda *args: self.pulses.put(args))
+        times = [time.monotonic() + i for i in range(3)]
+        for pulse_time in times:
+            self.bus.fire(pulse_time)
+        pulses = self._receive(3)
+        self.assertEqual([p[0] for p in pulses], [0, 1, 2])
+        self.assertEqual([p[1] for p in pulses], times)
+        self.assertEqual(self.bus.count, 3)
+
+    def test_unsubscribe(self):
+        callback = lambda *args: self.pulses.put(args)
+        self.bus.subscribe(callback)
+        self.bus.fire()
+        self._receive(1)
+        self.bus.unsubscribe(callback)
+        self.bus.fire()
+        time.sleep(0.05)
+        self.assertTrue(self.pulses.empty())
+
+    def test_other_process(self):
+        """Pulses from a bus on another process are received"""
+        self.bus.subscribe(lambda *args: self.pulses.put(args))
+        # Spawn, instead of fork, so that the bus is pickled.
+        context = multiprocessing.get_context("spawn")
+        process = context.Process(target=_fire_pulses, args=(self.bus, 5))
+        process.start()
+        process.join()
+        self.assertEqual([p[0] for p in self._receive(5)], list(range(5)))
+
+    def test_close_removes_file(self):
+        self.bus.close()
+        self.assertFalse(os.path.exists(self.bus.path))
+
+    def test_same_name_same_bus(self):
+        bus = triggers.SimulatedTriggerBus(name="test-same-name")
+        self.addCleanup(bus.close)
+        again = triggers.SimulatedTriggerBus(name="test-same-name")
+        self.assertEqual(bus, again)
+        self.assertNotEqual(bus, self.bus)
+        bus.fire()
+        self.assertEqual(again.count, 1)
+
+    def test_pickled_bus_is_equal(self):
+        self.assertEqual(pickle.loads(pickle.dumps(self.bus)), self.bus)
+
+    def test_exit_removes_file(self):
+        """File is removed when the process that created the bus exits"""
+        context = multiprocessing.get_context("spawn")
+        paths = context.Queue()
+        process = context.Process(target=_create_bus, args=(paths,))
+        process.start()
+        path = paths.get(timeout=10)
+        process.join()
+        self.assertFalse(os.path.exists(path))
+
+
+class TestSimulatedTriggerSource(unittest.TestCase):
+    def setUp(self):
+        self.bus = triggers.SimulatedTriggerBus()
+        self.source = triggers.SimulatedTriggerSource(self.bus)
+        self.source.enable()
+
+    def tearDown(self):
+        self.source.shutdown()
+        self.bus.close()
+
+    def test_fixed_rate(self):
+        pulses = Queue()
+        self.bus.subscribe(lambda *args: pulses.put(args))
+        self.source.start(200.0, 10)
+        times = [pulses.get(timeout=5)[1] for i in range(10)]
+        np.testing.assert_allclose(np.diff(times), 0.005)
+
+    def test_stop(self):
+        self.source.start(100.0)
+        self.assertTrue(self.source.is_running())
+        self.source.stop()
+        self.assertFalse(self.source.is_running())
+        count = self.bus.count
+        time.sleep(0.05)
+        self.assertEqual(self.bus.count, count)
+
+
+class TestHardwareTriggeredSimulatedDevices(unittest.TestCase):
+    def setUp(self):
+        self.bus = triggers.SimulatedTriggerBus()
+        self.source = triggers.SimulatedTriggerSource(self.bus)
+        self.source.enable()
+
+    def tearDown(self):
+        self.source.shutdown()
+        self.bus.close()
+
+    def _camera(self, **kwargs):
+        camera = simulators.SimulatedCamera(
+            sensor_shape=(32, 32), trigger_bus=self.bus, **kwargs
+        )
+        camera.set_trigger(
+            microscope.TriggerType.RISING_EDGE, microscope.TriggerMode.ONCE
+        )
+        buffer = Queue()
+        camera.set_client(buffer)
+        camera.enable()
+        self.addCleanup(camera.shutdown)
+        return camera, buffer
+
+    def test_requires_bus(self):
+        camera = simulators.SimulatedCamera()
+        with self.assertRaises(microscope.UnsupportedFeatureError):
+            camera.set_trigger(
+                microscope.TriggerType.RISING_EDGE,
+                microscope.TriggerMode.ONCE,
+            )
+
+    def test_no_software_trigger(self):
+        camera, buffer = self._camera()
+        with self.assertRaises(microscope.IncompatibleStateError):
+            camera.trigger()
+
+    def test_camera(self):
+        camera, buffer = self._camera(readout_time=0.002)
+        camera.set_exposure_time(0.003)
+        self.source.start(100.0, 10)
+        for i in range(10):
+            buffer.get(timeout=5)
+        self.assertEqual(
+            camera.get_trigger_statistics(), {"received": 10, "missed": 0}
+        )
+
+    def test_camera_busy(self):
+        """Triggers during exposure and readout are missed"""
+        camera, buffer = self._camera(readout_time=0.01)
+        camera.set_exposure_time(0.015)
+        self.source.start(100.0, 9)
+        for i in range(3):
+            buffer.get(timeout=5)
+        self.source.stop()
+        time.sleep(0.05)
+        self.assertTrue(buffer.empty())
+        self.assertEqual(
+            camera.get_trigger_statistics(), {"received": 9, "missed": 6}
+        )
+        log = camera.get_trigger_log()
+        self.assertEqual([entry[0] for entry in log], [0, 3, 6])
+
+    def test_camera_jitter(self):
+        camera, buffer = self._camera(trigger_jitter=0.002)
+        camera.set_exposure_time(0.0)
+        self.source.start(100.0, 5)
+        for i in range(5):
+            buffer.get(timeout=5)
+        for index, pulse_time, action_time in camera.get_trigger_log():
+            self.assertGreaterEqual(action_time, pulse_time)
+            self.assertLessEqual(action_time, pulse_time + 0.002)
+
+    def test_missed_trigger_probability(self):
+        camera, buffer = self._camera(missed_trigger_probability=1.0)
+        self.source.start(200.0, 5)
+        self.source._thread.join()
+        time.sleep(0.05)
+        self.assertTrue(buffer.empty())
+        self.assertEqual(
+            camera.get_trigger_statistics(), {"received": 5, "missed": 5}
+        )
+
+    def test_light_source(self):
+        light = simulators.SimulatedLightSource(trigger_bus=self.bus)
+        self.addCleanup(light.shutdown)
+        light.set_trigger(
+            microscope.TriggerType.HIGH, microscope.TriggerMode.BULB
+        )
+        self.bus.fire()
+        time.sleep(0.05)
+        light.enable()
+        for i in range(3):
+            self.bus.fire()
+        time.sleep(0.05)
+        self.assertEqual(light.get_trigger_statistics()["received"], 4)
+        self.assertEqual(light.get_emitted_pulses(), 3)
+
+    def test_deformable_mirror(self):
+        dm = simulators.SimulatedDeformableMirror(4, trigger_bus=self.bus)
+        self.addCleanup(dm.shutdown)
+        dm.set_trigger(
+            microscope.TriggerType.RISING_EDGE, microscope.TriggerMode.ONCE
+        )
+        patterns = np.random.rand(3, 4)
+        dm.queue_patterns(patterns)
+        self.source.start(100.0, 2)
+        self.source._thread.join()
+        time.sleep(0.05)
+        np.testing.assert_array_equal(dm.get_current_pattern(), patterns[1])
+
+
+class TestInjection(unittest.TestCase):
+    def _timed(self, function, *args):
+        start = time.monotonic()
+        function(*args)
+        return time.monotonic() - start
+
+    def test_latency(self):
+        filterwheel = simulators.SimulatedFilterWheel(positions=6)
+        injection.inject(filterwheel, injection.CallProfile(latency=0.05))
+        self.assertGreaterEqual(
+            self._timed(setattr, filterwheel, "position", 2), 0.05
+        )
+        self.assertEqual(filterwheel.position, 2)
+
+    def test_only_instance(self):
+        filterwheel = simulators.SimulatedFilterWheel(positions=6)
+        injection.inject(filterwheel, injection.CallProfile(latency=0.05))
+        other = simulators.SimulatedFilterWheel(positions=6)
+        self.assertLess(self._timed(setattr, other, "position", 2), 0.05)
+
+    def test_errors(self):
+        light = simulators.SimulatedLightSource()
+        injection.inject(
+            light,
+            injection.CallProfile(error_probability=1.0),
+            methods=["_do_set_power"],
+        )
+        light.enable()
+        with self.assertRaises(microscope.DeviceError):
+            light.power = 0.5
+        self.assertEqual(light.power, 0.0)
+
+    def test_busy_time(self):
+        light = simulators.SimulatedLightSource()
+        injection.inject(light, injection.CallProfile(busy_time=0.05))
+        light.enable()
+        self.assertGreaterEqual(self._timed(setattr, light, "power", 1), 0.04)
+
+    def test_serialize(self):
+        light = simulators.SimulatedLightSource()
+        injection.inject(light, injection.CallProfile(latency=0.05))
+        threads = [
+            threading.Thread(target=setattr, args=(light, "power", 0.5))
+            for i in range(3)
+        ]
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+
+    def test_serial_profile(self):
+        profile = injection.SerialProfile(
+            baudrate=9600, message_size=12, processing_time=0.01
+        )
+        self.assertAlmostEqual(profile.latency, 0.035)
+
+    def test_motion_profile(self):
+        stage = simulators.SimulatedStage(
+            {
+                "x": microscope.AxisLimits(0, 2000),
+                "y": microscope.AxisLimits(0, 2000),
+            }
+        )
+        stage.enable()
+        profile = injection.MotionProfile(speed=5000.0, acceleration=50000.0)
+        injection.inject(stage, profile)
+        # Accelerates for 0.1s over 250 units, moves 500 units at full
+        # speed for 0.1s, and decelerates for 0.1s over 250 units.
+        self.assertAlmostEqual(
+            profile.call_latency(stage, "move_to", ({"x": 2000},), {}), 0.3
+        )
+        self.assertGreaterEqual(
+            self._timed(stage.move_by, {"x": 100, "y": -200}), 0.12
+        )
+        self.assertEqual(stage.position, {"x": 1100, "y": 800})
+
+    def test_async_moves(self):
+        """Async moves take the latency, not the travel time"""
+        stage = simulators.SimulatedStage(
+            {"x": microscope.AxisLimits(0, 2000)}
+        )
+        stage.enable()
+        injection.inject(
+            stage, injection.MotionProfile(speed=5000.0, latency=0.05)
+        )
+        move_time = self._timed(stage.move_to_async, {"x": 2000})
+        self.assertGreaterEqual(move_time, 0.05)
+        self.assertLess(move_time, 0.3)
+        move_time = self._timed(stage.axes["x"].move_by_async, -1000)
+        self.assertGreaterEqual(move_time, 0.05)
+        self.assertLess(move_time, 0.2)
+        self.assertEqual(stage.position, {"x": 1000})
+
+    def test_hardware_trigger_not_injected(self):
+        bus = triggers.SimulatedTriggerBus()
+        self.addCleanup(bus.close)
+        light = simulators.SimulatedLightSource(trigger_bus=bus)
+        names = injection._default_method_names(light)
+        self.assertIn("_do_enable", names)
+        self.assertNotIn("_do_hardware_trigger", names)
+        self.assertNotIn("_do_shutdown", names)
+
+    def test_injected_class(self):
+        cls = injection.injected(
+            simulators.SimulatedFilterWheel, injection.CallProfile(0.05)
+        )
+        filterwheel = cls(positions=6)
+        self.assertIsInstance(filterwheel, simulators.SimulatedFilterWheel)
+        self.assertGreaterEqual(
+            self._timed(setattr, filterwheel, "position", 2), 0.05
+        )
+
+    def test_injected_class_pickle(self):
+        cls = injection.injected(
+            simulators.SimulatedFilterWheel, injection.CallProfile(0.05)
+        )
+        self.assertEqual(pickle.loads(pickle.dumps(cls)), cls)
+
+    def test_injected_class_equality(self):
+        """Classes injected with the same arguments are equal"""
+        args = (simulators.SimulatedFilterWheel, injection.SERIAL_LASER)
+        self.assertEqual(injection.injected(*args), injection.injected(*args))
+        self.assertEqual(
+            injection.injected(
+                simulators.SimulatedFilterWheel, injection.CallProfile(0.05)
+            ),
+            injection.injected(
+                simulators.SimulatedFilterWheel, injection.CallProfile(0.05)
+            ),
+        )
+        self.assertNotEqual(
+            injection.injected(*args),
+            injection.injected(
+                simulators.SimulatedFilterWheel, injection.CallProfile(0.05)
+            ),
+        )
+
+    def test_stage_axes(self):
+        """Stage axes are injected, without adding to stage moves"""
+        stage = simulators.SimulatedStage(
+            {"x": microscope.AxisLimits(0, 2000)}
+        )
+        stage.enable()
+        injection.inject(stage, injection.CallProfile(latency=0.05))
+        self.assertGreaterEqual(self._timed(stage.axes["x"].move_by, 10), 0.05)
+        self.assertLess(self._timed(stage.move_by, {"x": 10}), 0.09)
+        self.assertEqual(stage.position, {"x": 1020})
+
+
+class TestSimulatedStage(unittest.TestCase):
+    def setUp(self):
+        self.limits = {
+            "x": microscope.AxisLimits(0, 1000),
+            "y": microscope.AxisLimits(0, 1000),
+        }
+
+    def test_move_immediately(self):
+        stage = simulators.SimulatedStage(self.limits)
+        stage.enable()
+        stage.move_to({"x": 100, "y": 900})
+        self.assertEqual(stage.position, {"x": 100, "y": 900})
+        self.assertFalse(stage.is_moving())
+
+    def test_move_in_background(self):
+        stage = simulators.SimulatedStage(self.limits, speed=2000.0)
+        stage.enable()
+        stage.move_to({"x": 1000})
+        self.assertTrue(stage.is_moving())
+        self.assertLess(stage.position["x"], 1000)
+        time.sleep(0.3)
+        self.assertFalse(stage.is_moving())
+        self.assertEqual(stage.position["x"], 1000)
+
+    def test_interpolated_position(self):
+        move = simulators._AxisMove(
+            100.0,
+            0.0,
+            start_time=10.0,
+            speed=100.0,
+            acceleration=1000.0,
+            settle_time=0.5,
+        )
+        # Accelerates for 0.1s over 5 units, moves at full speed for
+        # 0.9s over 90 units, and decelerates for 0.1s over 5 units.
+        for now, position in [
+            (9.0, 100.0),
+            (10.1, 95.0),
+            (10.5, 55.0),
+            (11.0, 5.0),
+            (11.1, 0.0),
+            (12.0, 0.0),
+        ]:
+            with self.subTest(now=now):
+                self.assertAlmostEqual(move.position(now), position)
+        self.assertAlmostEqual(move.end_time, 11.6)
+
+    def test_short_move(self):
+        """A short move never reaches the maximum speed"""
+        move = simulators._AxisMove(
+            0.0,
+            10.0,
+            start_time=0.0,
+            speed=100.0,
+            acceleration=1000.0,
+            settle_time=0.0,
+        )
+        self.assertAlmostEqual(move.end_time, 0.2)
+        self.assertAlmostEqual(move.position(0.1), 5.0)
+
+    def test_settle_time(self):
+        stage = simulators.SimulatedStage(
+            self.limits, speed=100000.0, settle_time=0.1
+        )
+        stage.enable()
+        stage.move_by({"x": 10})
+        time.sleep(0.05)
+        self.assertEqual(stage.position["x"], 510)
+        self.assertTrue(stage.is_moving())
+
+    def test_per_axis_speed(self):
+        stage = simulators.SimulatedStage(
+            self.limits, speed={"x": 100000.0, "y": 100.0}
+        )
+        stage.enable()
+        stage.move_by({"x": 100, "y": 100})
+        time.sleep(0.05)
+        self.assertFalse(stage.axes["x"].is_moving())
+        self.assertTrue(stage.axes["y"].is_moving())
+
+    def test_new_move_starts_from_current_position(self):
+        stage = simulators.SimulatedStage(self.limits, speed=1000.0)
+        stage.enable()
+        stage.move_to({"x": 1000})
+        time.sleep(0.1)
+        stage.move_to({"x": 0})
+        position = stage.position["x"]
+        self.assertGreater(position, 500)
+        self.assertLess(position, 1000)
+
+    def test_limits(self):
+        stage = simulators.SimulatedStage(self.limits, speed=100000.0)
+        stage.enable()
+        stage.move_to({"x": 2000})
+        time.sleep(0.05)
+        self.assertEqual(stage.position["x"], 1000)
+
+    def test_move_to_async(self):
+        stage = simulators.SimulatedStage(self.limits, speed=2000.0)
+        stage.enable()
+        move = stage.move_to_async({"x": 1000, "y": 0})
+        self.assertFalse(move.done())
+        self.assertFalse(move.wait(timeout=0.01))
+        self.assertTrue(move.wait(timeout=1.0))
+        self.assertTrue(move.done())
+        self.assertFalse(move.cancelled())
+        self.assertEqual(stage.position, {"x": 1000, "y": 0})
+
+    def test_axis_move_by_async(self):
+        stage = simulators.SimulatedStage(self.limits, speed=2000.0)
+        stage.enable()
+        move = stage.axes["x"].move_by_async(-500)
+        self.assertTrue(stage.axes["x"].is_moving())
+        self.assertTrue(move.wait(timeout=1.0))
+        self.assertEqual(stage.position["x"], 0)
+
+    def test_cancel_move(self):
+        stage = simulators.SimulatedStage(self.limits, speed=1000.0)
+        stage.enable()
+        move = stage.move_to_async({"x": 1000})
+        time.sleep(0.1)
+        self.assertTrue(move.cancel())
+        self.assertTrue(move.cancelled())
+        self.assertTrue(move.done())
+        self.assertFalse(stage.is_moving())
+        position = stage.position["x"]
+        self.assertGreater(position, 500)
+        self.assertLess(position, 1000)
+        time.sleep(0.05)
+        self.assertEqual(stage.position["x"], position)
+
+    def test_cancel_finished_move(self):
+        stage = simulators.SimulatedStage(self.limits)
+        stage.enable()
+        move = stage.move_to_async({"x": 100})
+        self.assertTrue(move.done())
+        self.assertFalse(move.cancel())
+        self.assertFalse(move.cancelled())
+
+    def test_run_positions(self):
+        stage = simulators.SimulatedStage(self.limits, speed=100000.0)
+        stage.enable()
+        positions = [{"x": 100.0 * i, "y": 50.0} for i in range(5)]
+        sequence = stage.run_positions(positions, dwell=0.01)
+        self.assertEqual(sequence.n_positions, 5)
+        self.assertTrue(sequence.wait(timeout=2.0))
+        self.assertEqual(sequence.n_reached, 5)
+        progress = sequence.get_progress()
+        self.assertEqual([index for index, _ in progress], list(range(5)))
+        self.assertEqual(
+            [t for _, t in progress], sorted(t for _, t in progress)
+        )
+        # Progress already reported is not reported again.
+        self.assertEqual(sequence.get_progress(), [])
+        self.assertEqual(stage.position, {"x": 400.0, "y": 50.0})
+
+    def test_run_positions_software_trigger(self):
+        stage = simulators.SimulatedStage(self.limits)
+        stage.enable()
+        positions = [{"x": 10.0}, {"x": 20.0}, {"x": 30.0}]
+        sequence = stage.run_positions(
+            positions, trigger_type=microscope.TriggerType.SOFTWARE
+        )
+        time.sleep(0.05)
+        self.assertEqual(sequence.n_reached, 0)
+        self.assertEqual(stage.position["x"], 500.0)
+        sequence.trigger()
+        time.sleep(0.05)
+        self.assertEqual(sequence.n_reached, 1)
+        self.assertEqual(stage.position["x"], 10.0)
+        # Triggers sent before the stage is ready are queued.
+        sequence.trigger()
+        sequence.trigger()
+        self.assertTrue(sequence.wait(timeout=1.0))
+        self.assertEqual(stage.position["x"], 30.0)
+
+    def test_run_positions_hardware_trigger(self):
+        bus = triggers.SimulatedTriggerBus()
+        self.addCleanup(bus.close)
+        stage = simulators.SimulatedStage(self.limits, trigger_bus=bus)
+        stage.enable()
+        sequence = stage.run_positions(
+            [{"x": 10.0}, {"x": 20.0}],
+            trigger_type=microscope.TriggerType.RISING_EDGE,
+        )
+        with self.assertRaises(microscope.IncompatibleStateError):
+            sequence.trigger()
+        bus.fire()
+        bus.fire()
+        self.assertTrue(sequence.wait(timeout=1.0))
+        self.assertEqual(stage.position["x"], 20.0)
+
+    def test_run_positions_no_hardware_trigger(self):
+        stage = simulators.SimulatedStage(self.limits)
+        with self.assertRaises(microscope.UnsupportedFeatureError):
+            stage.run_positions(
+                [{"x": 10.0}],
+                trigger_type=microscope.TriggerType.RISING_EDGE,
+            )
+
+    def test_cancel_run_positions(self):
+        stage = simulators.SimulatedStage(self.limits, speed=1000.0)
+        stage.enable()
+        sequence = stage.run_positions([{"x": 0.0}, {"x": 1000.0}])
+        time.sleep(0.1)
+        self.assertTrue(sequence.cancel())
+        self.assertTrue(sequence.cancelled())
+        self.assertFalse(stage.is_moving())
+        self.assertLess(sequence.n_reached, 2)
+
+
+class BlockingStageAxis(microscope.abc.StageAxis):
+    """Stage axis without asynchronous moves, that moves when released."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self._position = 0.0
+
+    def move_by(self, delta):
+        self.move_to(self._position + delta)
+
+    def move_to(self, pos):
+        if not self.release.wait(timeout=5.0):
+            raise microscope.DeviceError("move was never released")
+        if pos < 0:
+            raise microscope.DeviceError("can't move to negative position")
+        self._position = pos
+
+    @property
+    def position(self):
+        return self._position
+
+    @property
+    def limits(self):
+        return microscope.AxisLimits(-100, 100)
+
+
+class TestStageMove(unittest.TestCase):
+    def test_threaded_fallback(self):
+        axis = BlockingStageAxis()
+        move = axis.move_to_async(10)
+        self.assertFalse(move.done())
+        # The blocking move can't be stopped.
+        self.assertFalse(move.cancel())
+        axis.release.set()
+        self.assertTrue(move.wait(timeout=1.0))
+        self.assertEqual(axis.position, 10)
+
+    def test_threaded_fallback_error(self):
+        axis = BlockingStageAxis()
+        axis.release.set()
+        move = axis.move_by_async(-10)
+        with self.assertRaises(microscope.DeviceError):
+            move.wait(timeout=1.0)
+
+    def test_registered_with_pyro_daemon(self):
+        stage = simulators.SimulatedStage(
+            {"x": microscope.AxisLimits(0, 1000)}
+        )
+        daemon = Pyro4.Daemon()
+        self.addCleanup(daemon.close)
+        daemon.register(stage)
+        first = stage.move_to_async({"x": 0.0})
+        first_id = first._pyroId
+        self.assertIn(first_id, daemon.objectsById)
+        for i in range(microscope.abc.StageMove._max_registered):
+            last = stage.move_to_async({"x": float(i)})
+        self.assertIn(last._pyroId, daemon.objectsById)
+        # Older moves are unregistered.
+        self.assertNotIn(first_id, daemon.objectsById)
+        self.assertLessEqual(
+            len(daemon.objectsById),
+            microscope.abc.StageMove._max_registered + 2,
+        )
+
+    def test_not_registered_without_daemon(self):
+        axis = simulators.SimulatedStageAxis(microscope.AxisLimits(0, 10))
+        move = axis.move_to_async(5)
+        self.assertFalse(hasattr(move, "_pyroId"))
+
+
+class TestASIStage(unittest.TestCase):
+    def setUp(self):
+        with unittest.mock.patch(
+            "microscope.controllers.asi.serial.Serial",
+            new=mocks.ASIMS2000Mock,
+        ):
+            self.controller = asi.ASIMS2000("/dev/null", lights=[])
+        self.stage = self.controller.devices["stage"]
+        self.mock = self.controller._conn._serial._serial
+
+    def test_axes(self):
+        self.assertEqual(sorted(self.stage.axes.keys()), ["X", "Y"])
+
+    def test_move_to_async(self):
+        move = self.stage.move_to_async({"X": 5000, "Y": 1000})
+        self.assertFalse(move.done())
+        self.assertTrue(move.wait(timeout=1.0))
+        self.assertEqual(self.stage.position, {"X": 5000, "Y": 1000})
+
+    def test_move_by_async(self):
+        self.mock.positions[b"X"] = 1000
+        move = self.stage.axes["X"].move_by_async(-500)
+        self.assertTrue(move.wait(timeout=1.0))
+        self.assertEqual(self.stage.axes["X"].position, 500)
+
+    def test_cancel_move(self):
+        move = self.stage.move_to_async({"X": 100000})
+        self.assertTrue(move.cancel())
+        self.assertTrue(move.done())
+        self.assertIn(b"HALT", self.mock.commands)
+        self.assertLess(self.stage.position["X"], 100000)
+
+    def test_axis_position_during_move(self):
+        """Axis position, like the stage position, does not wait"""
+        move = self.stage.move_to_async({"X": 50000})
+        self.addCleanup(move.cancel)
+        time.sleep(0.1)
+        axis_position = self.stage.axes["X"].position
+        stage_position = self.stage.position["X"]
+        self.assertFalse(move.done())
+        self.assertGreater(axis_position, 0)
+        self.assertLess(stage_position, 50000)
+        self.assertLessEqual(axis_position, stage_position)
+
+    def test_ring_buffer(self):
+        positions = [{"X": 100, "Y": 200}, {"X": 300, "Y": 400}]
+        sequence = self.stage.run_positions(
+            positions, trigger_type=microscope.TriggerType.RISING_EDGE
+        )
+        self.assertEqual(
+            self.mock.ring_buffer,
+            [{b"X": 100, b"Y": 200}, {b"X": 300, b"Y": 400}],
+        )
+        self.assertTrue(self.mock.ttl_ring_buffer)
+        # Pulse right away, the follower thread may not have started.
+        self.mock.ttl_pulse()
+        for _ in range(100):
+            if sequence.n_reached == 1:
+                break
+            time.sleep(0.01)
+        self.assertEqual(sequence.n_reached, 1)
+        self.mock.ttl_pulse()
+        self.assertTrue(sequence.wait(timeout=2.0))
+        self.assertEqual(sequence.n_reached, 2)
+        self.assertEqual([p[0] for p in sequence.get_progress()], [0, 1])
+        self.assertEqual(self.stage.position, {"X": 300, "Y": 400})
+        self.assertFalse(self.mock.ttl_ring_buffer)
+
+    def test_ring_buffer_one_position(self):
+        sequence = self.stage.run_positions(
+            [{"X": 10000}], trigger_type=microscope.TriggerType.RISING_EDGE
+        )
+        time.sleep(0.05)
+        self.assertEqual(sequence.n_reached, 0)
+        self.mock.ttl_pulse()
+        self.assertTrue(sequence.wait(timeout=2.0))
+        self.assertEqual([p[0] for p in sequence.get_progress()], [0])
+        self.assertEqual(self.stage.position["X"], 10000)
+
+    def test_ring_buffer_wraps_between_reads(self):
+        positions = [{"X": 10000 * (i + 1)} for i in range(3)]
+        sequence = self.stage.run_positions(
+            positions, trigger_type=microscope.TriggerType.RISING_EDGE
+        )
+        # All pulses before the pointer is read again, so the pointer
+        # is back at the start.
+        for _ in positions:
+            self.mock.ttl_pulse()
+        self.assertTrue(sequence.wait(timeout=2.0))
+        self.assertEqual([p[0] for p in sequence.get_progress()], [0, 1, 2])
+        self.assertEqual(self.stage.position["X"], 30000)
+
+    def test_ring_buffer_dwell(self):
+        with self.assertRaisesRegex(ValueError, "dwell"):
+            self.stage.run_positions(
+                [{"X": 100}],
+                dwell=0.1,
+                trigger_type=microscope.TriggerType.RISING_EDGE,
+            )
+
+    def test_ring_buffer_invalid_axis(self):
+        self.controller._conn.axis_list.append("A")
+        with self.assertRaisesRegex(ValueError, "ring buffer"):
+            self.stage.run_positions(
+                [{"A": 100}], trigger_type=microscope.TriggerType.RISING_EDGE
+            )
+
+    def test_ring_buffer_too_many_positions(self):
+        with self.assertRaises(microscope.UnsupportedFeatureError):
+            self.stage.run_positions(
+                [{"X": i} for i in range(51)],
+                trigger_type=microscope.TriggerType.RISING_EDGE,
+            )
+
+
+class TestZaberStage(unittest.TestCase):
+    def setUp(self):
+        with unittest.mock.patch(
+            "microscope.controllers.zaber.serial.Serial",
+            new=mocks.ZaberStageMock,
+        ):
+            self.conn = zaber._ZaberConnection(
+                "/dev/null", baudrate=115200, timeout=0.5
+            )
+        self.addCleanup(self.conn.close)
+        self.mock = self.conn._serial
+        self.dev_conn = zaber._ZaberDeviceConnection(self.conn, 1)
+
+    def count_commands(self, command):
+        return self.mock.commands.count(command)
+
+    def test_all_axes_in_one_command(self):
+        self.mock.positions = [100, -200]
+        self.assertEqual(self.dev_conn.get_absolute_positions(), [100, -200])
+        self.assertEqual(self.mock.commands, [b"/01 0 get pos"])
+
+    def test_coalesce_position_reads(self):
+        for _ in range(5):
+            self.dev_conn.get_absolute_positions()
+        self.assertEqual(self.count_commands(b"/01 0 get pos"), 1)
+
+    def test_move_invalidates_positions(self):
+        self.dev_conn.get_absolute_positions()
+        # Let the cached positions expire, so that reading them before
+        # the move would need another command.
+        time.sleep(0.01)
+        self.dev_conn.move_to_absolute_position(1, 50)
+        self.dev_conn.get_absolute_positions()
+        self.assertEqual(
+            [c for c in self.mock.commands if b"comm.alert" not in c],
+            [b"/01 0 get pos", b"/01 1 move abs 50", b"/01 0 get pos"],
+        )
+
+    def test_axis_position_during_move(self):
+        """Axis position, like the stage position, does not wait"""
+        axis = zaber._ZaberStageAxis(self.dev_conn, 1)
+        move = axis.move_to_async(40000)
+        self.addCleanup(move.wait)
+        self.assertEqual(axis.position, 0.0)
+        self.assertFalse(move.done())
+        self.assertTrue(move.wait(timeout=1.0))
+        self.assertEqual(axis.position, 40000.0)
+
+    def test_restore_alerts(self):
+        self.dev_conn.wait_until_idle()
+        self.assertTrue(self.mock.alerts)
+        self.dev_conn.restore_alerts()
+        self.assertFalse(self.mock.alerts)
+
+    def test_keep_enabled_alerts(self):
+        """Alerts that were already enabled are left enabled"""
+        self.mock.alerts = True
+        self.dev_conn.wait_until_idle()
+        self.dev_conn.restore_alerts()
+        self.assertTrue(self.mock.alerts)
+        self.assertEqual(self.count_commands(b"/01 0 set comm.alert 1"), 0)
+
+    def test_motion_settings_changed(self):
+        self.mock.supports_alerts = False
+        self.dev_conn.move_by_relative_position(1, 400)
+        self.dev_conn.command(b"set maxspeed 1000", 1)
+        self.dev_conn.move_by_relative_position(1, 400)
+        self.assertEqual(self.count_commands(b"/01 1 get maxspeed"), 2)
+
+    def test_short_move_without_alerts(self):
+        """Short moves finish in their physical time, not 100ms"""
+        self.mock.supports_alerts = False
+        self.dev_conn.wait_until_idle()
+        start = time.monotonic()
+        self.dev_conn.move_by_relative_position(1, 400)
+        self.dev_conn.wait_until_idle()
+        self.assertLess(time.monotonic() - start, 0.05)
+        self.assertEqual(self.mock.positions[0], 400)
+
+    def test_long_move_without_alerts(self):
+        """Long moves are not polled until they are expected to end"""
+        self.mock.supports_alerts = False
+        self.dev_conn.wait_until_idle()
+        self.dev_conn.move_to_absolute_position(1, 40000)
+        start = time.monotonic()
+        self.dev_conn.wait_until_idle()
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+        self.assertEqual(self.mock.positions[0], 40000)
+        self.assertLessEqual(self.count_commands(b"/01 0 "), 5)
+
+    def test_move_with_alerts(self):
+        self.dev_conn.wait_until_idle()
+        self.assertTrue(self.mock.alerts)
+        start = time.monotonic()
+        self.dev_conn.move_by_relative_position(1, 20000)
+        self.dev_conn.move_by_relative_position(2, 400)
+        self.dev_conn.wait_until_idle()
+        self.assertLess(time.monotonic() - start, 0.2)
+        self.assertEqual(self.mock.positions, [20000, 400])
+        # Alerts are not confused with replies to commands.
+        self.assertEqual(self.dev_conn.get_absolute_positions(), [20000, 400])
+
+    def test_commands_in_flight(self):
+        """Commands are sent without waiting for previous replies"""
+        self.mock.positions = [100, -200]
+        futures = [
+            self.dev_conn.command_async(b"get pos", axis) for axis in (1, 2)
+        ]
+        self.assertEqual(
+            [f.result().response for f in futures], [b"100", b"-200"]
+        )
+
+    def test_late_reply(self):
+        """Reply after its command timed out is not taken by the next"""
+        self.mock.reply_delays[b"/01 1 get pos"] = 0.6
+        self.mock.reply_delays[b"/01 1 get maxspeed"] = 0.2
+        with self.assertRaisesRegex(microscope.DeviceError, "no reply"):
+            self.dev_conn.command(b"get pos", 1)
+        # The late reply to get pos arrives while waiting for this one.
+        self.assertEqual(
+            self.dev_conn.command(b"get maxspeed", 1).response,
+            b"%d" % self.mock.maxspeed,
+        )
+
+    def test_rejected_command_async(self):
+        self.mock.supports_alerts = False
+        with self.assertRaisesRegex(RuntimeError, "BADCOMMAND"):
+            self.dev_conn.command_async(b"set comm.alert 1").result()
+
 
 class TestStageAwareCamera(unittest.TestCase, CameraTests):
     def setUp(self):
@@ -477,6 +1530,138 @@ class TestStageAwareCamera(unittest.TestCase, CameraTests):
                 self.assertEqual(img.shape, self.sensor_shape)
 
 
+class TestStageAwareCameraBlur(unittest.TestCase):
+    def setUp(self):
+        self.image = np.random.randint(0, 256, size=(500, 400, 1)).astype(
+            np.uint8
+        )
+        self.stage = simulators.SimulatedStage(
+            {
+                "x": microscope.AxisLimits(0, self.image.shape[1]),
+                "y": microscope.AxisLimits(0, self.image.shape[0]),
+                "z": microscope.AxisLimits(-50, 50),
+            }
+        )
+        self.stage.enable()
+        self.filterwheel = simulators.SimulatedFilterWheel(positions=1)
+        self.device = StageAwareCamera(
+            self.image, self.stage, self.filterwheel, sensor_shape=(64, 64)
+        )
+        self.buffer = Queue()
+        self.device.set_client(self.buffer)
+        self.device.enable()
+        self.stage.move_to({"x": 200, "y": 250, "z": 0})
+
+    def acquire(self):
+        self.device.trigger()
+        return self.buffer.get(timeout=5.0)
+
+    def test_in_focus(self):
+        expected = self.image[218:282, 168:232, 0]
+        np.testing.assert_array_equal(
+            self.acquire(), np.fliplr(np.flipud(expected))
+        )
+
+    def test_out_of_focus(self):
+        self.stage.move_to({"z": 10})
+        expected = scipy.ndimage.gaussian_filter(
+            self.image[218:282, 168:232, 0], 1.0
+        )
+        np.testing.assert_array_equal(
+            self.acquire(), np.fliplr(np.flipud(expected))
+        )
+
+    def test_same_position_is_cached(self):
+        self.stage.move_to({"z": 10})
+        with unittest.mock.patch.object(
+            self.device, "_create_image", wraps=self.device._create_image
+        ) as create_image:
+            first = self.acquire()
+            second = self.acquire()
+        create_image.assert_called_once()
+        np.testing.assert_array_equal(first, second)
+
+    def test_new_image_on_move(self):
+        with unittest.mock.patch.object(
+            self.device, "_create_image", wraps=self.device._create_image
+        ) as create_image:
+            in_focus = self.acquire()
+            self.stage.move_to({"z": 20})
+            blurred = self.acquire()
+            self.stage.move_to({"x": 100})
+            moved = self.acquire()
+        self.assertEqual(create_image.call_count, 3)
+        self.assertFalse(np.array_equal(in_focus, blurred))
+        self.assertFalse(np.array_equal(moved, blurred))
+
+
+class TestTileCache(unittest.TestCase):
+    def test_read_regions(self):
+        image = np.random.randint(0, 2**16, size=(1000, 700, 2)).astype(
+            np.uint16
+        )
+        cache = stage_aware_camera._TileCache(
+            image, tile_size=128, max_tiles=4
+        )
+        for y0, y1, x0, x1, channel in [
+            (0, 10, 0, 10, 0),
+            (100, 300, 120, 140, 1),
+            (127, 129, 127, 129, 0),
+            (900, 1000, 600, 700, 1),
+            (0, 1000, 0, 700, 0),
+        ]:
+            with self.subTest(region=(y0, y1, x0, x1, channel)):
+                np.testing.assert_array_equal(
+                    cache.read(y0, y1, x0, x1, channel),
+                    image[y0:y1, x0:x1, channel],
+                )
+                self.assertLessEqual(len(cache._tiles), 4)
+
+
+class TestSimulatedSetupFromFile(unittest.TestCase):
+    def setUp(self):
+        self.image = np.random.randint(0, 256, size=(600, 400, 2)).astype(
+            np.uint8
+        )
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _check_setup(self, devices):
+        camera = devices["camera"]
+        stage = devices["stage"]
+        self.assertIsInstance(camera._image, np.memmap)
+        devices["filterwheel"].position = 1
+        stage.enable()
+        stage.move_to({"x": 200, "y": 300, "z": 0})
+        camera.set_roi(microscope.ROI(0, 0, 64, 32))
+        buffer = Queue()
+        camera.set_client(buffer)
+        camera.enable()
+        camera.set_exposure_time(0.0)
+        camera.trigger()
+        np.testing.assert_array_equal(
+            buffer.get(timeout=5),
+            np.fliplr(np.flipud(self.image[284:316, 168:232, 1])),
+        )
+        camera.disable()
+
+    def test_npy_file(self):
+        filepath = os.path.join(self.tmp_dir.name, "image.npy")
+        np.save(filepath, self.image)
+        devices = stage_aware_camera.simulated_setup_from_image(filepath)
+        self._check_setup(devices)
+
+    def test_raw_file(self):
+        filepath = os.path.join(self.tmp_dir.name, "image.raw")
+        self.image.tofile(filepath)
+        devices = stage_aware_camera.simulated_setup_from_image(
+            filepath, shape=self.image.shape, dtype="uint8"
+        )
+        self._check_setup(devices)
+
+
 class TestDummyController(unittest.TestCase, ControllerTests):
     def setUp(self):
         self.laser = simulators.SimulatedLightSource()
@@ -495,6 +1680,31 @@ class TestDummyController(unittest.TestCase, ControllerTests):
         self.device.devices["filterwheel"].position = 2
         self.assertEqual(self.device.devices["filterwheel"].position, 2)
 
+    def test_execute_batch_properties_and_methods(self):
+        self.laser.enable()
+        results = self.device.execute_batch(
+            [
+                ("filterwheel", "position", [2]),
+                ("laser", "power", [0.5]),
+                ("filterwheel", "position", []),
+                ("laser", "power", ()),
+                ("filterwheel", "n_positions", ()),
+            ]
+        )
+        self.assertEqual(results, [None, None, 2, 0.5, 6])
+        self.assertEqual(self.filterwheel.position, 2)
+        self.assertEqual(self.laser.power, 0.5)
+
+    def test_execute_batch_stops_on_error(self):
+        with self.assertRaisesRegex(Exception, "can't move to position"):
+            self.device.execute_batch(
+                [
+                    ("filterwheel", "position", [10]),
+                    ("filterwheel", "position", [1]),
+                ]
+            )
+        self.assertEqual(self.filterwheel.position, 0)
+
     def test_control_laser(self):
         self.assertEqual(self.device.devices["laser"].power, 0.0)
         self.device.devices["laser"].enable()
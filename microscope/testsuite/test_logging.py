@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+## Copyright (C) 2020 David Miguel Susano Pinto <carandraug@gmail.com>
+##
+## This file is part of Microscope.
+##
+## Microscope is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## Microscope is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with Microscope.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import unittest
+import unittest.mock
+
+import microscope._logging
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class TestRateLimitedLogger(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger("microscope.testsuite.ratelimited")
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+        self.handler = ListHandler()
+        self.logger.addHandler(self.handler)
+        self.addCleanup(self.logger.removeHandler, self.handler)
+        self.limited = microscope._logging.RateLimitedLogger(
+            self.logger, interval=1.0
+        )
+
+    def test_suppress_within_interval(self):
+        with unittest.mock.patch("time.monotonic", side_effect=[0.0, 0.5]):
+            self.limited.debug("frame %d", 1)
+            self.limited.debug("frame %d", 2)
+        self.assertEqual(self.handler.messages, ["frame 1"])
+
+    def test_report_suppressed(self):
+        times = [0.0, 0.2, 0.4, 1.5]
+        with unittest.mock.patch("time.monotonic", side_effect=times):
+            for i in range(4):
+                self.limited.debug("frame %d", i)
+        self.assertEqual(
+            self.handler.messages,
+            ["frame 0", "frame 3 (2 similar messages suppressed)"],
+        )
+
+    def test_messages_limited_independently(self):
+        with unittest.mock.patch("time.monotonic", side_effect=[0.0, 0.1]):
+            self.limited.debug("foo")
+            self.limited.debug("bar")
+        self.assertEqual(self.handler.messages, ["foo", "bar"])
+
+    def test_disabled_level(self):
+        self.logger.setLevel(logging.INFO)
+        self.limited.debug("foo")
+        self.logger.setLevel(logging.DEBUG)
+        self.limited.debug("foo")
+        self.assertEqual(self.handler.messages, ["foo"])
+
+
+class TestQueueLogging(unittest.TestCase):
+    def test_records_written_on_stop(self):
+        logger = logging.getLogger("microscope.testsuite.queuelogging")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        queue_logging = microscope._logging.QueueLogging()
+        logger.addHandler(queue_logging.handler)
+        self.addCleanup(logger.removeHandler, queue_logging.handler)
+
+        handler = ListHandler()
+        queue_logging.add_handler(handler)
+        logger.info("foo")
+        second_handler = ListHandler()
+        queue_logging.add_handler(second_handler)
+        logger.info("bar")
+        queue_logging.stop()
+
+        self.assertEqual(handler.messages, ["foo", "bar"])
+        self.assertEqual(second_handler.messages, ["bar"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+
+## Copyright (C) 2020 David Miguel Susano Pinto <carandraug@gmail.com>
+##
+## This file is part of Microscope.
+##
+## Microscope is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## Microscope is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with Microscope.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+import urllib.request
+
+import microscope._metrics
+
+
+class TestRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = microscope._metrics.Registry()
+
+    def test_counter(self):
+        counter = self.registry.counter("foo_total", "Foo.", ["method"])
+        counter.labels("enable").inc()
+        counter.labels("enable").inc(2)
+        self.assertEqual(
+            self.registry.exposition(),
+            "# HELP foo_total Foo.\n"
+            "# TYPE foo_total counter\n"
+            'foo_total{method="enable"} 3.0\n',
+        )
+
+    def test_gauge_function(self):
+        values = [1, 5]
+        gauge = self.registry.gauge("queue_length", "Queue.")
+        gauge.labels().set_function(lambda: values.pop(0))
+        self.assertIn("\nqueue_length 1.0\n", self.registry.exposition())
+        self.assertIn("\nqueue_length 5.0\n", self.registry.exposition())
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = self.registry.histogram(
+            "latency_seconds", "Latency.", buckets=[0.1, 1.0]
+        )
+        for value in [0.05, 0.5, 0.7, 5.0]:
+            histogram.labels().observe(value)
+        lines = self.registry.exposition().splitlines()
+        self.assertIn('latency_seconds_bucket{le="0.1"} 1', lines)
+        self.assertIn('latency_seconds_bucket{le="1.0"} 3', lines)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 4', lines)
+        self.assertIn("latency_seconds_sum 6.25", lines)
+        self.assertIn("latency_seconds_count 4", lines)
+
+    def test_label_escaping(self):
+        counter = self.registry.counter("foo_total", "Foo.", ["name"])
+        counter.labels('a"b\\c').inc()
+        self.assertIn(
+            'foo_total{name="a\\"b\\\\c"} 1.0', self.registry.exposition()
+        )
+
+    def test_duplicated_name(self):
+        self.registry.counter("foo_total", "Foo.")
+        with self.assertRaises(ValueError):
+            self.registry.gauge("foo_total", "Foo.")
+
+    def test_failing_function_does_not_break_others(self):
+        def fail():
+            raise RuntimeError()
+
+        self.registry.gauge("broken", "Broken.").labels().set_function(fail)
+        self.registry.counter("foo_total", "Foo.").labels().inc()
+        self.assertIn("\nfoo_total 1.0\n", self.registry.exposition())
+
+
+class TestMetricsServer(unittest.TestCase):
+    def setUp(self):
+        self.registry = microscope._metrics.Registry()
+        self.registry.counter("foo_total", "Foo.").labels().inc()
+        self.server = microscope._metrics.MetricsServer(
+            self.registry, "127.0.0.1", 0
+        )
+        self.server.start()
+        self.addCleanup(self.server.shutdown)
+
+    def test_get_metrics(self):
+        url = "http://%s:%d/metrics" % self.server.address
+        with urllib.request.urlopen(url) as response:
+            self.assertTrue(
+                response.headers["Content-Type"].startswith("text/plain")
+            )
+            body = response.read().decode("utf-8")
+        self.assertEqual(body, self.registry.exposition())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+
+## Copyright (C) 2020 David Miguel Susano Pinto <carandraug@gmail.com>
+##
+## This file is part of Microscope.
+##
+## Microscope is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## Microscope is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with Microscope.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+import time
+import unittest
+
+import serial
+
+import microscope
+import microscope._serial
+
+
+class FakeSerial:
+    """Serial port where the test sends the replies with `reply`."""
+
+    def __init__(self, timeout=0.01):
+        self.timeout = timeout
+        self.written = []
+        self._data = bytearray()
+        self._condition = threading.Condition()
+
+    @property
+    def in_waiting(self):
+        with self._condition:
+            return len(self._data)
+
+    def write(self, data):
+        self.written.append(data)
+        return len(data)
+
+    def read(self, size=1):
+        with self._condition:
+            if not self._data:
+                self._condition.wait(self.timeout)
+            data = bytes(self._data[:size])
+            del self._data[:size]
+            return data
+
+    def reply(self, data):
+        with self._condition:
+            self._data.extend(data)
+            self._condition.notify_all()
+
+
+class TestSerialEngine(unittest.TestCase):
+    def setUp(self):
+        self.serial = FakeSerial()
+        self.unsolicited = []
+
+        def unsolicited(line):
+            if line.startswith(b"!"):
+                self.unsolicited.append(line)
+                return True
+            return False
+
+        self.engine = microscope._serial.SerialEngine(
+            self.serial,
+            terminator=b"\r\n",
+            reply_key=lambda line: line[1:3],
+            unsolicited=unsolicited,
+            timeout=0.2,
+        )
+        self.addCleanup(self.engine.close)
+
+    def test_commands_in_flight(self):
+        futures = [
+            self.engine.submit(b"/01 get\n", key=b"01"),
+            self.engine.submit(b"/01 get\n", key=b"01"),
+        ]
+        self.assertEqual(self.engine.n_pending(), 2)
+        self.assertEqual(self.serial.written, [b"/01 get\n"] * 2)
+        self.serial.reply(b"@01 first\r\n@01 second\r\n")
+        self.assertEqual(
+            [f.result(timeout=1.0) for f in futures],
+            [b"@01 first\r\n", b"@01 second\r\n"],
+        )
+        self.assertEqual(self.engine.n_pending(), 0)
+        stats = self.engine.stats.as_dict()["/01"]
+        self.assertEqual(stats["count"], 2)
+        self.assertEqual(stats["bytes_read"], 23)
+        self.assertEqual(stats["timeouts"], 0)
+
+    def test_match_replies_by_key(self):
+        """Replies for different keys can arrive out of order"""
+        first = self.engine.submit(b"/01 get\n", key=b"01")
+        second = self.engine.submit(b"/02 get\n", key=b"02")
+        self.serial.reply(b"@02 two\r\n")
+        self.assertEqual(second.result(timeout=1.0), b"@02 two\r\n")
+        self.assertFalse(first.done())
+        self.serial.reply(b"@01 one\r\n")
+        self.assertEqual(first.result(timeout=1.0), b"@01 one\r\n")
+
+    def test_replies_split_across_reads(self):
+        future = self.engine.submit(b"/01 get\n", key=b"01")
+        self.serial.reply(b"@01 o")
+        time.sleep(0.05)
+        self.assertFalse(future.done())
+        self.serial.reply(b"ne\r\n")
+        self.assertEqual(future.result(timeout=1.0), b"@01 one\r\n")
+
+    def test_unsolicited(self):
+        future = self.engine.submit(b"/01 get\n", key=b"01")
+        self.serial.reply(b"!01 IDLE\r\n@01 one\r\n")
+        self.assertEqual(future.result(timeout=1.0), b"@01 one\r\n")
+        self.assertEqual(self.unsolicited, [b"!01 IDLE\r\n"])
+
+    def test_no_reply(self):
+        future = self.engine.submit(b"/01 get\n", key=b"01")
+        with self.assertRaisesRegex(microscope.DeviceError, "no reply"):
+            future.result(timeout=1.0)
+        self.assertEqual(self.engine.n_pending(), 0)
+        stats = self.engine.stats.as_dict()["/01"]
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertGreaterEqual(stats["timeout_time"], 0.2)
+
+    def test_no_expected_reply(self):
+        future = self.engine.submit(b"/01 stop\n", expect_reply=False)
+        self.assertTrue(future.done())
+        self.assertEqual(self.engine.n_pending(), 0)
+
+    def test_command(self):
+        self.serial.reply(b"@01 one\r\n")
+        # The reply arrived before the command so it is discarded.
+        time.sleep(0.05)
+        threading.Timer(0.05, self.serial.reply, [b"@01 two\r\n"]).start()
+        self.assertEqual(
+            self.engine.command(b"/01 get\n", key=b"01"), b"@01 two\r\n"
+        )
+
+    def test_close(self):
+        future = self.engine.submit(b"/01 get\n", key=b"01")
+        self.engine.close()
+        with self.assertRaisesRegex(microscope.DeviceError, "closed"):
+            future.result(timeout=1.0)
+        with self.assertRaisesRegex(microscope.DeviceError, "closed"):
+            self.engine.submit(b"/01 get\n", key=b"01")
+
+
+class TestInstrumentedSerial(unittest.TestCase):
+    def setUp(self):
+        # Everything written is read back as the reply.
+        self.serial = serial.serial_for_url("loop://", timeout=0.05)
+        self.addCleanup(self.serial.close)
+        self.instrumented = microscope._serial.InstrumentedSerial(self.serial)
+
+    def get_stats(self, command):
+        return self.instrumented.stats.as_dict()[command]
+
+    def test_command(self):
+        self.instrumented.write(b"pos=2\r")
+        self.assertEqual(self.instrumented.read_until(b"\r"), b"pos=2\r")
+        stats = self.get_stats("pos")
+        self.assertEqual(stats["count"], 1)
+        self.assertEqual(stats["bytes_written"], 6)
+        self.assertEqual(stats["bytes_read"], 6)
+        self.assertEqual(stats["timeouts"], 0)
+        self.assertLess(stats["round_trip_time"], 0.05)
+
+    def test_read_timeout(self):
+        self.instrumented.write(b"WHERE X\r")
+        self.assertEqual(self.instrumented.readline(), b"WHERE X\r")
+        stats = self.get_stats("WHERE")
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertGreaterEqual(stats["timeout_time"], 0.04)
+        self.assertLessEqual(stats["timeout_time"], 0.05)
+        self.assertGreaterEqual(stats["round_trip_time"], 0.04)
+
+    def test_readlines(self):
+        self.instrumented.write(b"a\nb\n")
+        self.assertEqual(self.instrumented.readlines(), [b"a\n", b"b\n"])
+        stats = self.get_stats("a")
+        self.assertEqual(stats["bytes_read"], 4)
+        self.assertEqual(stats["timeouts"], 1)
+
+    def test_commands_separately(self):
+        for command in [b"l?\r", b"p?\r", b"l?\r"]:
+            self.instrumented.write(command)
+            self.instrumented.read_until(b"\r")
+        self.assertEqual(self.get_stats("l?")["count"], 2)
+        self.assertEqual(self.get_stats("p?")["count"], 1)
+
+    def test_serial_attributes(self):
+        self.assertEqual(self.instrumented.timeout, 0.05)
+        self.instrumented.timeout = 0.01
+        self.assertEqual(self.serial.timeout, 0.01)
+        self.assertEqual(self.instrumented.in_waiting, 0)
+
+
+class TestResponseFormat(unittest.TestCase):
+    def setUp(self):
+        self.serial = serial.serial_for_url("loop://", timeout=1.0)
+        self.addCleanup(self.serial.close)
+
+    def assertReadsQuickly(self, response_format, expected):
+        start = time.monotonic()
+        self.assertEqual(response_format.read(self.serial), expected)
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_n_lines(self):
+        self.serial.write(b"a\r\nb\r\nc\r\n")
+        self.assertReadsQuickly(
+            microscope._serial.ResponseFormat(n_lines=2), [b"a", b"b"]
+        )
+        self.assertEqual(self.serial.read_until(b"\n"), b"c\r\n")
+
+    def test_end_line(self):
+        self.serial.write(b"x\r:A\rextra\r")
+        response_format = microscope._serial.ResponseFormat(
+            terminator=b"\r", end=lambda line: line.startswith(b":A")
+        )
+        self.assertReadsQuickly(response_format, [b"x", b":A"])
+
+    def test_idle_timeout(self):
+        self.serial.write(b"a\r\nb\r\n")
+        response_format = microscope._serial.ResponseFormat(idle_timeout=0.02)
+        self.assertReadsQuickly(response_format, [b"a", b"b", b""])
+        self.assertEqual(self.serial.timeout, 1.0)
+
+    def test_no_response(self):
+        self.serial.timeout = 0.05
+        response_format = microscope._serial.ResponseFormat(idle_timeout=0.02)
+        self.assertEqual(response_format.read(self.serial), [b""])
+
+    def test_read_until_idle(self):
+        self.serial.write(b"junk\r\nmore junk")
+        start = time.monotonic()
+        self.assertEqual(
+            microscope._serial.read_until_idle(self.serial, 0.02),
+            b"junk\r\nmore junk",
+        )
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(self.serial.timeout, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+
+## Copyright (C) 2020 David Miguel Susano Pinto <carandraug@gmail.com>
+##
+## This file is part of Microscope.
+##
+## Microscope is free software: you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation, either version 3 of the License, or
+## (at your option) any later version.
+##
+## Microscope is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with Microscope.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+import time
+import unittest
+import unittest.mock
+
+import Pyro4
+
+import microscope._utils
+
+
+class TestExpiringCache(unittest.TestCase):
+    def setUp(self):
+        self.read = unittest.mock.Mock(side_effect=range(100))
+
+    def test_reuse_value(self):
+        cache = microscope._utils.ExpiringCache(self.read, max_age=10.0)
+        self.assertEqual(cache.get(), 0)
+        self.assertEqual(cache.get(), 0)
+        self.assertEqual(self.read.call_count, 1)
+
+    def test_expire_value(self):
+        cache = microscope._utils.ExpiringCache(self.read, max_age=0.01)
+        self.assertEqual(cache.get(), 0)
+        time.sleep(0.02)
+        self.assertEqual(cache.get(), 1)
+
+    def test_invalidate(self):
+        cache = microscope._utils.ExpiringCache(self.read, max_age=10.0)
+        self.assertEqual(cache.get(), 0)
+        cache.invalidate()
+        self.assertEqual(cache.get(), 1)
+
+    def test_coalesce_concurrent_reads(self):
+        """Reads while the value is being read wait for that value"""
+
+        def slow_read():
+            time.sleep(0.05)
+            return self.read()
+
+        cache = microscope._utils.ExpiringCache(slow_read, max_age=0.005)
+        values = []
+        threads = [
+            threading.Thread(target=lambda: values.append(cache.get()))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(values, [0] * 8)
+        self.assertEqual(self.read.call_count, 1)
+
+
+class TestCreatePyroDaemon(unittest.TestCase):
+    def create_daemon(self, **kwargs):
+        daemon = microscope._utils.create_pyro_daemon("127.0.0.1", **kwargs)
+        self.addCleanup(daemon.close)
+        return daemon
+
+    def test_options_not_global(self):
+        """Daemon options do not change the Pyro configuration"""
+        previous = Pyro4.config.asDict()
+        daemon = self.create_daemon(servertype="multiplex", sock_nodelay=True)
+        self.assertIn("Multiplex", type(daemon.transportServer).__name__)
+        self.assertEqual(Pyro4.config.asDict(), previous)
+
+    def test_threadpool_size(self):
+        previous = Pyro4.config.asDict()
+        daemon = self.create_daemon(
+            servertype="thread", threadpool_size=3, threadpool_size_min=2
+        )
+        pool = daemon.transportServer.pool
+        self.assertEqual((pool.size, pool.size_min), (3, 2))
+        self.assertEqual(pool.num_workers(), 2)
+        self.assertEqual(Pyro4.config.asDict(), previous)
+
+    def test_threadpool_sizing(self):
+        """The pool grows to its maximum and keeps its minimum"""
+        pool = microscope._utils._ThreadPool(3, 1)
+        self.addCleanup(pool.close)
+        release = threading.Event()
+        for i in range(3):
+            pool.process(release.wait)
+        self.assertEqual(len(pool.busy), 3)
+        with self.assertRaises(
+            Pyro4.socketserver.threadpool.NoFreeWorkersError
+        ):
+            pool.process(release.wait)
+        release.set()
+        for i in range(100):
+            if not pool.busy:
+                break
+            time.sleep(0.01)
+        self.assertEqual((len(pool.busy), len(pool.idle)), (0, 1))
+
+    def test_pyro_threadpool_internals(self):
+        """Pyro's pool still has what _ThreadPool relies on"""
+        # _ThreadPool only overrides the sizing of Pyro's pool.  If
+        # this fails, a new Pyro version changed the pool and
+        # _ThreadPool needs to be updated.
+        pool = Pyro4.socketserver.threadpool.Pool()
+        self.addCleanup(pool.close)
+        for name in ["idle", "busy", "closed"]:
+            self.assertTrue(hasattr(pool, name), name)
+        self.assertIsInstance(pool.idle, set)
+        self.assertIsInstance(pool.busy, set)
+        for name in ["process", "notify_done", "num_workers", "close"]:
+            self.assertTrue(callable(getattr(pool, name)), name)
+        worker = Pyro4.socketserver.threadpool.Worker(pool)
+        self.assertTrue(callable(worker.process))
+
+
+if __name__ == "__main__":
+    unittest.main()